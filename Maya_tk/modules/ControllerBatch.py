@@ -0,0 +1,213 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: ControllerBatch.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Make one controller of a shape of the catalog (ShapeCatalog.py) for every target joint, in one pass:
+
+        ControllerBatch.createControllers('Circle Arrow 2D', cmds.ls(sl=True, type='joint'), color=17)
+
+    The curves are made with OpenMaya.MFnNurbsCurve, the control points and knots of a shape are converted once
+    for all targets. Every controller is named, matched to its target (world matrix) and coloured while it is
+    made. The work runs in the command damgControllerBatch (plugin Maya_tk/plugins/controllerBatchCmd.py), so the
+    whole batch is one undo step.
+
+    Shapes which are a maya command (Circle Nurbs, Square Nurbs) are made with cmds. The batch and the selection of
+    the new controllers are in one undo chunk.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, logging
+
+from maya import cmds
+import maya.api.OpenMaya as om
+
+from Maya_tk.modules import ShapeCatalog
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+PLUGINPTH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'plugins',
+                         'controllerBatchCmd.py')
+COMMAND = 'damgControllerBatch'
+
+# Name of the controller of a target
+NAMEFORMAT = '%s_ctrl'
+
+# Jobs waiting for the command, the command takes the first one
+_PENDING = []
+
+def loadPlugin(*args):
+    if not cmds.pluginInfo(os.path.basename(PLUGINPTH), query=True, loaded=True):
+        cmds.loadPlugin(PLUGINPTH, quiet=True)
+
+def take(*args):
+    """
+    :return: job of the command which is running, called by damgControllerBatch
+    """
+    if not _PENDING:
+        # called by repeat last or by hand, there is no job to run
+        raise RuntimeError('%s is not meant to be called directly, use ControllerBatch.createControllers' % COMMAND)
+    return _PENDING.pop(0)
+
+def controllerName(target, *args):
+    # short name without namespace
+    return NAMEFORMAT % target.split('|')[-1].split(':')[-1]
+
+def curveData(curve, *args):
+    """
+    :return: arguments of MFnNurbsCurve.create for a curve of a shape
+    """
+    cvs = om.MPointArray([om.MPoint(point[0], point[1], point[2]) for point in curve['points']])
+    knots = om.MDoubleArray(curve['knots'])
+    form = om.MFnNurbsCurve.kPeriodic if curve['periodic'] else om.MFnNurbsCurve.kOpen
+    return cvs, knots, curve['degree'], form
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                 MAIN CLASS: BATCH JOB - CONTROLLERS OF ONE COMMAND                       """
+# ----------------------------------------------------------------------------------------------------------- #
+class BatchJob( object ):
+
+    def __init__(self, shape, targets, names, color=None, match=True):
+
+        super(BatchJob, self).__init__()
+
+        self.targets = list(targets)
+        self.names = list(names)
+        self.color = color
+        self.match = match
+
+        # curves of every transform of the shape, converted once for every controller
+        self.nodes = [(node['parent'], [curveData(curve) for curve in node['curves']]) for node in shape['nodes']]
+        self.created = []
+        self.result = []
+
+    def redo(self):
+        self.created = []
+        self.result = []
+        targets = om.MSelectionList()
+        for target in self.targets:
+            targets.add(target)
+
+        for i, name in enumerate(self.names):
+            root = self.build(name)
+            if self.match:
+                matrix = targets.getDagPath(i).inclusiveMatrix()
+                om.MFnTransform(root).setTransformation(om.MTransformationMatrix(matrix))
+            self.result.append(om.MFnDagNode(root).fullPathName())
+
+    def build(self, name):
+        """
+        Make the transforms and curves of one controller
+        :return: MObject of its root transform
+        """
+        curveFn = om.MFnNurbsCurve()
+        transforms = []
+        modifier = om.MDagModifier()
+        for index, (parent, curves) in enumerate(self.nodes):
+            shapes = []
+            transform = None
+            for cvs, knots, degree, form in curves:
+                if transform is None:
+                    # a transform is made with the first curve
+                    transform = curveFn.create(cvs, knots, degree, form, False, False)
+                    shapes.append(om.MFnDagNode(transform).child(0))
+                else:
+                    shapes.append(curveFn.create(cvs, knots, degree, form, False, False, transform))
+
+            nodeName = name if index == 0 else '%s_%s' % (name, index)
+            om.MFnDependencyNode(transform).setName(nodeName)
+            for i, shape in enumerate(shapes):
+                om.MFnDependencyNode(shape).setName('%sShape%s' % (nodeName, i or ''))
+                if self.color is not None:
+                    self.setColor(shape)
+
+            if parent >= 0:
+                modifier.reparentNode(transform, transforms[parent])
+            transforms.append(transform)
+
+        modifier.doIt()
+        self.created.append(om.MObjectHandle(transforms[0]))
+        return transforms[0]
+
+    def setColor(self, shape):
+        fn = om.MFnDependencyNode(shape)
+        fn.findPlug('overrideEnabled', False).setBool(True)
+        fn.findPlug('overrideColor', False).setInt(self.color)
+
+    def undo(self):
+        modifier = om.MDagModifier()
+        for handle in reversed(self.created):
+            if handle.isValid():
+                modifier.deleteNode(handle.object())
+        modifier.doIt()
+        self.created = []
+
+# ------------------------------------------------------
+# BATCH CREATION
+# ------------------------------------------------------
+def createControllers(nurbsType, targets, names=None, color=None, match=True, *args):
+    """
+    Make a controller of a shape for every target, in one undo step
+    :param nurbsType: name of a shape of the catalog
+    :param targets: joints (or any transform) to make controllers for
+    :param names: name of every controller, NAMEFORMAT of the target by default
+    :param color: override colour index of the curves, None keeps the default colour
+    :param match: put every controller at the world matrix of its target
+    :return: full path of the controllers, they are selected
+    """
+    targets = list(targets)
+    if not targets:
+        return []
+    names = list(names) if names else [controllerName(target) for target in targets]
+    if len(names) != len(targets):
+        raise ValueError('%s names for %s targets' % (len(names), len(targets)))
+
+    shape = ShapeCatalog.getCatalog()[nurbsType]
+    if not shape['command']:
+        loadPlugin()
+
+    cmds.undoInfo(openChunk=True, chunkName=COMMAND)
+    try:
+        if shape['command']:
+            result = createWithCommand(shape['command'], targets, names, color, match)
+        else:
+            _PENDING.append(BatchJob(shape, targets, names, color, match))
+            try:
+                result = getattr(cmds, COMMAND)()
+            finally:
+                # the command did not take its job when it failed
+                del _PENDING[:]
+        cmds.select(result, replace=True)
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+    logger.debug('Made %s controllers %s' % (len(result), nurbsType))
+    return result
+
+def createWithCommand(command, targets, names, color=None, match=True, *args):
+    """
+    Controllers of a shape which is a maya command, made one by one with cmds
+    """
+    result = []
+    for target, name in zip(targets, names):
+        getattr(cmds, command)()
+        node = cmds.rename(cmds.ls(sl=True)[0], name)
+        if match:
+            cmds.xform(node, worldSpace=True, matrix=cmds.xform(target, query=True, worldSpace=True, matrix=True))
+        if color is not None:
+            for shape in cmds.listRelatives(node, shapes=True, fullPath=True) or []:
+                cmds.setAttr(shape + '.overrideEnabled', 1)
+                cmds.setAttr(shape + '.overrideColor', color)
+        result.append(cmds.ls(node, long=True)[0])
+    return result
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
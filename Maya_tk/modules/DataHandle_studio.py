@@ -9,7 +9,12 @@
 import maya.cmds as cmds
 import maya.OpenMaya as om
 import maya.OpenMayaUI as omui
-import os, json, shutil, logging
+import os, json, logging
+
+from Maya_tk.modules import ThumbService
+from Maya_tk.modules import VersionRegistry
+from Maya_tk.modules import PublishTransaction
+from Maya_tk.modules import SceneStore
 
 # -------------------------------------------------------------------------------------------------------------
 # MAKE MAYA UNDERSTAND QT UI AS MAYA WINDOW,  FIX VERSION CONVENTION
@@ -69,41 +74,30 @@ class DataHandle( object ):
         self.assetName = (self.curPth.split( "work" )[ 0 ]).split( "/" )[ (numOfSectInPth - 3) ]
         self.taskName = (self.curPth.split( "work" )[ 0 ]).split( "/" )[ (numOfSectInPth - 2) ]
         self.baseFileName = self.assetName + "_" + self.taskName
-        # get file save
-        saveFilesList = [ f.split( '.ma' )[ 0 ] for f in os.listdir(self.workPth ) if self.baseFileName in f ]
-        if (len(saveFilesList)==0):
+        # snapshot and publish copies are linked from one object per content instead of full copies
+        self.store = SceneStore.getStore( self.snapShotPth )
+
+        # get max version and revision from version registry of task, folders are only listed when they changed
+        self.registry = VersionRegistry.getRegistry( self.curPth.split( "work" )[ 0 ],
+                                                     dict( scenes=self.workPth, snapShot=self.snapShotPth,
+                                                           publish=self.publishPth ) )
+        maxVer = self.registry.maxVersion( self.baseFileName )
+        if maxVer == 0:
+            maxVer = 1
             cmds.file( rename=self.baseFileName + "_v001" )
             cmds.file( save=True, type='mayaAscii' )
-        else:
-            for file in saveFilesList:
-                num = file.split( "_v" )[-1]
-                if "." in num or "-" in num or "_" in num:
-                    saveFilesList.remove( file )
-
-        fileVersion = [f.split( self.baseFileName + '_v' )[ -1 ] for f in saveFilesList ]
-
-        if fileVersion == []:
-            self.maxVer = '001'
-        else:
-            self.maxVer = (str(max([int(f) for f in fileVersion]))).zfill( 3 )
-
-        self.verFileName = self.baseFileName + '_v' + self.maxVer + '.ma'
+            self.registry.record( 'scenes', self.baseFileName + "_v001.ma" )
 
-        ssFilesList = [f for f in os.listdir( self.snapShotPth ) if f.endswith('.ma') and self.verFileName.split('.ma')[0] in f]
+        self.maxVer = str( maxVer ).zfill( 3 )
 
-        if (len( ssFilesList ) == 0):
-            reversion = [ "001" ]
-        elif (len( ssFilesList ) == 1):
-            reversion = [ "002" ]
-        else:
-            reversion = [ ((f.split( '_v' )[ -1 ]).split( '_r' )[ -1 ]).split( '.ma' )[ 0 ] for f in ssFilesList ]
+        self.verFileName = VersionRegistry.fileName( self.baseFileName, maxVer )
 
-        self.maxRever = (str(max([int(f) for f in reversion])+1)).zfill( 3 )
+        # revision 001 is taken by the copy made when publishing, snapshot revisions start from 002
+        self.maxRever = str( max( self.registry.maxRevision( self.baseFileName, maxVer ), 1 ) + 1 ).zfill( 3 )
 
-        self.reverFileName = self.verFileName.split( '.ma' )[ 0 ] + "_r" + self.maxRever + '.ma'
+        self.reverFileName = VersionRegistry.fileName( self.baseFileName, maxVer, self.maxRever )
 
-        self.publishNameFile = self.verFileName.split( "_v" )[ 0 ] + "_v" + str(
-            int( (self.verFileName.split( "." )[ 0 ]).split( "_v" )[ -1 ] ) + 1 ).zfill( 3 ) + ".ma"
+        self.publishNameFile = VersionRegistry.fileName( self.baseFileName, maxVer + 1 )
 
         self.filePublishPth = os.path.join( self.publishPth, self.verFileName )
 
@@ -270,7 +264,7 @@ class DataHandle( object ):
             imageVisible = True
             textVisible = False
 
-        self.imageDisplay = cmds.image(i=imgPth, vis=imageVisible)
+        self.imageDisplay = cmds.image(i=self.getThumbPth(imgPth), vis=imageVisible)
         self.viewText = cmds.text( l="No data to show", align='center', w=IMAGESIZE[0], h=IMAGESIZE[1], vis=textVisible)
 
         cmds.setParent( self.loaderMainLayout )
@@ -288,6 +282,12 @@ class DataHandle( object ):
 
         return pth
 
+    def getThumbPth(self, imgPth):
+        # Show local cached copy of snapshot, the share is only read the first time
+        if not imgPth:
+            return ""
+        return ThumbService.thumbnail(imgPth, IMAGESIZE) or imgPth
+
     def headerLayout(self, name, w1, w2):
         self.bts.makeSeparator( h=5, w=W )
         nc = 2
@@ -306,22 +306,42 @@ class DataHandle( object ):
 
     def publishFile(self, *args, **info):
         cmds.file(save=True, type='mayaAscii')
-        shutil.copy2(self.fileSavePth, self.filePublishPth)
-        cmds.file(rename=str(self.publishNameFile + ".ma"))
-        cmds.file(save=True, type='mayaAscii')
-
-        name = self.publishNameFile.split('.ma')[0] + "_r001"
-        infoFile = os.path.join( self.snapShotPth, '%s.comment' % name )
-
-        info['Name'] = name + ".ma"
-        info['Comment'] = cmds.textField('plComment', q=True, tx=True)
-        info['SnapShot'] = self.fileSnapShotPth
-        info['Image'] = self.imageSnapShotPth
 
-        with open(infoFile, 'w') as f:
-            json.dump(info, f, indent=4)
+        # version is allocated under the task lock, files are copied to temp then renamed, comment is written last
+        try:
+            # does not wait for another publish of the task, maya main thread would hang, the artist is told instead
+            with PublishTransaction.PublishTransaction(self.registry, timeout=0) as publish:
+                version = publish.allocate(self.baseFileName, int(self.maxVer))
+                name = VersionRegistry.fileName(self.baseFileName, version + 1, 1, ext='')
+                infoFile = os.path.join( self.snapShotPth, '%s.comment' % name )
+                imagePth = os.path.join( self.snapShotPth, '%s.jpg' % name )
+
+                publishPth = os.path.join( self.publishPth, VersionRegistry.fileName(self.baseFileName, version) )
+
+                # maya saves over the publish file, it is never linked to an object shared with the snapshots
+                publish.copy(self.fileSavePth, publishPth, 'publish', self.store, share=False)
+                publish.copy(self.fileSavePth, os.path.join(self.snapShotPth, name + ".ma"), 'snapShot', self.store)
+                if imagePth != self.imagepublishPth and os.path.exists(self.imagepublishPth):
+                    # someone published first, image follows the version we got
+                    publish.move(self.imagepublishPth, imagePth)
+
+                info['Name'] = name + ".ma"
+                info['Comment'] = cmds.textField('plComment', q=True, tx=True)
+                info['SnapShot'] = os.path.join(self.snapShotPth, name + ".ma")
+                info['Image'] = imagePth
+
+                publish.writeJson(infoFile, info)
+        except (PublishTransaction.LockTimeout, IOError, OSError) as e:
+            message = 'Publish failed: %s' % e
+            cmds.warning(message)
+            cmds.confirmDialog(t='Warning', m=message, b='OK')
+            return
+
+        self.publishNameFile = VersionRegistry.fileName(self.baseFileName, version + 1)
+        cmds.file(rename=str(self.publishNameFile))
+        cmds.file(save=True, type='mayaAscii')
+        self.registry.record('scenes', self.publishNameFile)
 
-        shutil.copy2(self.fileSavePth, self.snapShotPth + "/" + name + ".ma")
         if cmds.window('plWinID', exists=True):
             cmds.deleteUI('plWinID')
     
@@ -344,7 +364,8 @@ class DataHandle( object ):
 
         cmds.file(rename=self.verFileName)
         cmds.file(save=True, type='mayaAscii')
-        shutil.copy2(self.fileSavePth, self.fileSnapShotPth)
+        self.store.put(self.fileSavePth, self.fileSnapShotPth)
+        self.registry.record('snapShot', self.reverFileName)
 
         with open(infoFile, 'w') as f:
             json.dump(info, f, indent=4)
@@ -366,7 +387,7 @@ class DataHandle( object ):
             cmds.image(self.imageDisplay, e=True, vis=False)
             cmds.text(self.viewText, e=True, vis=False)
         else:
-            cmds.image(self.imageDisplay, e=True, image=imgPth, vis=True)
+            cmds.image(self.imageDisplay, e=True, image=self.getThumbPth(imgPth), vis=True)
             cmds.text(self.viewText, e=True, vis=False)
 
         infoPth = (imgPth.split('.jpg')[0]) + '.comment'
@@ -0,0 +1,277 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: FolderPlan.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Plan and create a folder tree in bulk. The whole set of folders is worked out first from a template, then it
+    is created by a pool of threads. Every job makes all the sub folders of one parent folder, and a folder's own
+    sub folders are queued as soon as it exists, so many parents are made in parallel. A folder made by the plan
+    is not listed or checked again.
+
+    A template is a nested structure:
+        dict    {name: template of its content}
+        list    several templates in the same folder
+        str     a folder name
+        None    nothing
+
+    dryRun() reports how many folders would be made and an estimate of the time it takes, without making any.
+    create() raises FolderPlanError with the folders which could not be made.
+
+    This module does not use maya.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, time, errno, logging, tempfile, threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+WORKERS = 16
+# Number of mkdir used to measure latency of the file system in dry run
+PROBES = 3
+# Folders named in the message of a FolderPlanError
+SHOWERRORS = 10
+
+class FolderPlanError(Exception):
+    """
+    Some folders of a plan could not be made, errors is a list of (path, error)
+    """
+    def __init__(self, root, created, errors):
+        self.root = root
+        self.created = created
+        self.errors = errors
+        lines = ['%s: %s' % (pth, e) for pth, e in errors[:SHOWERRORS]]
+        if len(errors) > SHOWERRORS:
+            lines.append('... %s more' % (len(errors) - SHOWERRORS))
+        super(FolderPlanError, self).__init__('%s folders of %s could not be made (%s made)\n%s' % (
+            len(errors), root, created, '\n'.join(lines)))
+
+def expand(template, *args):
+    """
+    Expand a template to a list of relative folder paths, parents come before their content
+    """
+    paths = []
+    if template is None:
+        return paths
+
+    if isinstance(template, dict):
+        for name in template:
+            paths.append(name)
+            paths += [os.path.join(name, p) for p in expand(template[name])]
+    elif isinstance(template, (list, tuple, set)):
+        for item in template:
+            paths += expand(item)
+    else:
+        paths.append(template)
+
+    return paths
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                 MAIN CLASS: FOLDER PLAN - WHOLE TREE FIRST                              """
+# ----------------------------------------------------------------------------------------------------------- #
+class FolderPlan( object ):
+
+    def __init__(self, root, template=None):
+
+        super(FolderPlan, self).__init__()
+
+        self.root = os.path.normpath(root)
+        # parent folder: set of sub folder names
+        self._children = {}
+        self._count = 0
+
+        if template is not None:
+            self.add(template)
+
+    def add(self, template):
+        """
+        Add a template to the plan, folders in several templates are only made once
+        """
+        for pth in expand(template):
+            self.addPath(pth)
+
+    def addPath(self, pth):
+        """
+        Add a folder path relative to root, its parent folders are added too
+        """
+        parts = [p for p in os.path.normpath(pth).split(os.sep) if p and p != '.']
+        parent = self.root
+        for name in parts:
+            children = self._children.setdefault(parent, set())
+            if name not in children:
+                children.add(name)
+                self._count += 1
+            parent = os.path.join(parent, name)
+
+    def count(self):
+        return self._count
+
+    def paths(self):
+        """
+        :return: sorted list of every folder in the plan
+        """
+        found = []
+        for parent in self._children:
+            found += [os.path.join(parent, name) for name in self._children[parent]]
+        return sorted(found)
+
+    def missing(self):
+        """
+        Find which folders of the plan do not exist, every existing parent is listed once
+        """
+        missing = []
+        todo = [self.root]
+        while todo:
+            parent = todo.pop()
+            names = self._children.get(parent)
+            if not names:
+                continue
+            try:
+                existing = set(os.listdir(parent))
+            except OSError:
+                existing = set()
+            for name in names:
+                pth = os.path.join(parent, name)
+                if name in existing:
+                    todo.append(pth)
+                else:
+                    missing += [pth] + [p for p in self.subPaths(pth)]
+        return sorted(missing)
+
+    def subPaths(self, parent):
+        for name in self._children.get(parent, ()):
+            pth = os.path.join(parent, name)
+            yield pth
+            for sub in self.subPaths(pth):
+                yield sub
+
+    def latency(self, probes=PROBES):
+        """
+        Measure how long one mkdir takes next to root, on a network share this is the cost which matters
+        """
+        folder = self.root
+        while not os.path.isdir(folder):
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                return 0.0
+            folder = parent
+
+        start = time.time()
+        for i in range(probes):
+            probe = tempfile.mkdtemp(prefix='.folderPlan', dir=folder)
+            os.rmdir(probe)
+        # mkdtemp and rmdir are both one round trip
+        return (time.time() - start) / (2.0 * probes)
+
+    def dryRun(self, workers=WORKERS):
+        """
+        Report what create() would do without making any folder
+        :return: dictionary of count, missing, latency and estimate (seconds)
+        """
+        missing = self.missing()
+        try:
+            latency = self.latency()
+        except OSError:
+            latency = 0.0
+
+        report = dict(count=self._count, missing=len(missing), latency=latency,
+                      estimate=len(missing) * latency / max(1, min(workers, len(missing) or 1)))
+        logger.info('Plan %s: %s folders, %s to create, about %.1f seconds' % (self.root, report['count'],
+                                                                                 report['missing'], report['estimate']))
+        return report
+
+    def create(self, workers=WORKERS):
+        """
+        Make every folder of the plan which does not exist
+        :return: number of folders made, FolderPlanError is raised if some could not be made
+        """
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root)
+
+        jobs = queue.Queue()
+        lock = threading.Lock()
+        result = dict(created=0, errors=[])
+
+        # parent folder, True if it has just been made by this plan so it is known to be empty
+        jobs.put((self.root, False))
+
+        def work():
+            while True:
+                job = jobs.get()
+                if job is None:
+                    jobs.task_done()
+                    return
+                try:
+                    self.createChildren(job[0], job[1], jobs, lock, result)
+                except Exception as e:
+                    with lock:
+                        result['errors'].append((job[0], e))
+                jobs.task_done()
+
+        threads = []
+        for i in range(max(1, workers)):
+            thread = threading.Thread(target=work, name='FolderPlan-%s' % i)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        jobs.join()
+        for thread in threads:
+            jobs.put(None)
+        for thread in threads:
+            thread.join()
+
+        if result['errors']:
+            for pth, e in result['errors']:
+                logger.error('Can not create folder in %s: %s' % (pth, e))
+            raise FolderPlanError(self.root, result['created'], sorted(result['errors'], key=lambda error: error[0]))
+
+        return result['created']
+
+    def createChildren(self, parent, new, jobs, lock, result):
+        names = self._children.get(parent)
+        if not names:
+            return
+
+        existing = set()
+        if not new:
+            try:
+                existing = set(os.listdir(parent))
+            except OSError:
+                pass
+
+        created = 0
+        for name in sorted(names):
+            pth = os.path.join(parent, name)
+            made = False
+            if name not in existing:
+                try:
+                    os.mkdir(pth)
+                    made = True
+                    created += 1
+                except OSError as e:
+                    if e.errno != errno.EEXIST:
+                        # content of a folder which could not be made is skipped
+                        with lock:
+                            result['errors'].append((pth, e))
+                        continue
+            if self._children.get(pth):
+                jobs.put((pth, made))
+
+        with lock:
+            result['created'] += created
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,236 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: LibraryIndex.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Manifest of a library folder (controller library, light library): every item is a .ma scene with an optional
+    .json info sidecar and .jpg screenshot. The info of every item is kept in one manifest file in the library
+    folder, so a library of thousands of items is loaded with one read instead of one read per sidecar.
+
+        - the manifest is read once, and read again only when the mtime of the library folder changed
+        - when the folder changed it is listed again, a sidecar is only read again when its (mtime, size) changed
+        - save and remove update the manifest at once
+
+    The manifest is written atomically (temp file then rename), artists who share a library never see half of it.
+
+    This module does not use maya.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, json, time, logging, threading
+
+from Maya_tk.modules.VersionRegistry import writeJson
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+# The manifest is in a sub folder, writing it does not change the mtime of the library folder
+MANIFESTNAME = os.path.join('.libraryIndex', 'manifest.json')
+MANIFESTVERSION = 1
+
+SCENEEXT = '.ma'
+INFOEXT = '.json'
+IMAGEEXT = '.jpg'
+
+# A folder modified less than this many seconds before it was listed may have changed again in the same mtime
+# tick, it is listed again on next query.
+RACY = 2.0
+
+def fileStamp(pth, *args):
+    try:
+        st = os.stat(pth)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size]
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                MAIN CLASS: LIBRARY INDEX - MANIFEST OF A LIBRARY FOLDER                 """
+# ----------------------------------------------------------------------------------------------------------- #
+class LibraryIndex( object ):
+
+    def __init__(self, directory):
+
+        super(LibraryIndex, self).__init__()
+
+        self.directory = directory
+        self.manifestPth = os.path.join(directory, MANIFESTNAME)
+        self._lock = threading.RLock()
+        # sidecars read since the index was made
+        self.reads = 0
+        self._data = self.read()
+
+    def read(self):
+        data = None
+        try:
+            with open(self.manifestPth, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            pass
+
+        if not isinstance(data, dict) or data.get('version') != MANIFESTVERSION:
+            data = dict(version=MANIFESTVERSION, mtime=None, checked=0, items={})
+        return data
+
+    def write(self):
+        if not os.path.isdir(self.directory):
+            return
+        try:
+            self.createFolder()
+            writeJson(self.manifestPth, self._data)
+        except (IOError, OSError) as e:
+            logger.error('Can not write library manifest %s: %s' % (self.manifestPth, e))
+
+    def createFolder(self):
+        folder = os.path.dirname(self.manifestPth)
+        if os.path.isdir(self.directory) and not os.path.isdir(folder):
+            os.mkdir(folder)
+
+    def mtime(self):
+        try:
+            return os.stat(self.directory).st_mtime
+        except OSError:
+            return None
+
+    def fresh(self, data, mtime):
+        if mtime is None:
+            return data['mtime'] is None
+        return data['mtime'] == mtime and data['checked'] - mtime >= RACY
+
+    def entry(self, name, files, old):
+        """
+        Item of a listing, its sidecar is read only when it is new or its (mtime, size) changed
+        """
+        entry = dict(info=None, stamp=None, screenshot=None)
+        if name + INFOEXT in files:
+            stamp = fileStamp(os.path.join(self.directory, name + INFOEXT))
+            if old is not None and old['stamp'] == stamp and stamp is not None:
+                entry['info'] = old['info']
+            else:
+                entry['info'] = self.readInfo(name)
+            entry['stamp'] = stamp
+        if name + IMAGEEXT in files:
+            entry['screenshot'] = os.path.join(self.directory, name + IMAGEEXT)
+        return entry
+
+    def readInfo(self, name):
+        self.reads += 1
+        try:
+            with open(os.path.join(self.directory, name + INFOEXT), 'r') as f:
+                info = json.load(f)
+        except (IOError, OSError, ValueError) as e:
+            logger.error('Can not read info of %s: %s' % (name, e))
+            return None
+        return info if isinstance(info, dict) else None
+
+    def scan(self, mtime):
+        """
+        List the folder, items which are known keep their info unless their sidecar changed
+        """
+        now = time.time()
+        try:
+            files = set(os.listdir(self.directory))
+        except OSError:
+            files = set()
+
+        old = self._data['items']
+        reads = self.reads
+        items = {}
+        for f in files:
+            name, ext = os.path.splitext(f)
+            if ext == SCENEEXT:
+                items[name] = self.entry(name, files, old.get(name))
+
+        self._data.update(mtime=mtime, checked=now, items=items)
+        logger.debug('Indexed library %s (%s items, %s sidecars read)' % (self.directory, len(items),
+                                                                           self.reads - reads))
+
+    def refresh(self, force=False):
+        """
+        Check mtime of library folder, it is only listed again when it changed
+        :param force: list it and stat every sidecar even if the folder did not change (a sidecar edited in place
+                      does not change the mtime of the folder)
+        """
+        with self._lock:
+            try:
+                # made before the folder mtime is taken, it changes the mtime once
+                self.createFolder()
+            except OSError:
+                pass
+            mtime = self.mtime()
+            if not force and self.fresh(self._data, mtime):
+                return
+
+            # another artist may have written the manifest since it was read
+            if not force:
+                data = self.read()
+                if self.fresh(data, mtime):
+                    self._data = data
+                    return
+
+            self.scan(mtime)
+            self.write()
+
+    def items(self, force=False):
+        """
+        :return: dictionary {name: info} like the sidecars, with name, path and screenshot
+        """
+        with self._lock:
+            self.refresh(force)
+            result = {}
+            for name, entry in self._data['items'].items():
+                info = dict(entry['info'] or {})
+                if entry['screenshot']:
+                    info['screenshot'] = entry['screenshot']
+                info['name'] = name
+                info['path'] = os.path.join(self.directory, name + SCENEEXT)
+                result[name] = info
+            return result
+
+    def record(self, name, info):
+        """
+        Add or update an item which has just been saved, manifest is written straight away
+        """
+        with self._lock:
+            infoPth = os.path.join(self.directory, name + INFOEXT)
+            screenshot = os.path.join(self.directory, name + IMAGEEXT)
+            self._data['items'][name] = dict(info=dict(info), stamp=fileStamp(infoPth),
+                                             screenshot=screenshot if os.path.exists(screenshot) else None)
+            # the folder mtime is not taken, what other artists saved since it was last listed is picked up by the
+            # next query
+            self.write()
+
+    def forget(self, name):
+        with self._lock:
+            if self._data['items'].pop(name, None) is not None:
+                self.write()
+
+    def invalidate(self):
+        with self._lock:
+            self._data.update(mtime=None, checked=0, items={})
+
+# ------------------------------------------------------
+# ONE INDEX PER LIBRARY FOLDER
+# ------------------------------------------------------
+_INDEXES = {}
+_INDEXLOCK = threading.Lock()
+
+def getIndex(directory, *args):
+    """
+    Get the index of a library folder, it is created the first time a folder is asked for.
+    :return: LibraryIndex
+    """
+    key = os.path.normcase(os.path.normpath(directory))
+    with _INDEXLOCK:
+        if key not in _INDEXES:
+            _INDEXES[key] = LibraryIndex(directory)
+        return _INDEXES[key]
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -6,7 +6,6 @@
 """
 
 from maya import cmds, mel
-import maya.OpenMaya as om
 from functools import partial
 
 import os, sys, logging, shutil, subprocess
@@ -89,14 +88,6 @@ def refreshCamList(name, *args):
     for cam in camLst:
         cmds.menuItem(l=cam, parent=menuOption)
 
-def resizeImage(sourceImage, outputImage, width, height):
-
-    image = om.MImage()
-    image.readFromFile(sourceImage)
-
-    image.resize( width, height )
-    image.writeToFile( outputImage, 'png')
-
 def importCamTemp(*args):
     tempPth = os.path.join(cmds.internalVar(usd=True), 'templateData')
     if not os.path.exists(tempPth):
@@ -9,14 +9,19 @@
 from maya import cmds
 import maya.mel as mel
 from functools import partial
-import maya.OpenMaya as om
 import maya.OpenMayaUI as omui
+import maya.utils
 import os, sys, time, datetime, json, logging
 
 # ------------------------------------------------------
 # VARIALBES ARE USED BY ALL CLASSES
 # ------------------------------------------------------
 from Maya_tk.modules import MayaVariables as var
+from Maya_tk.modules import ProjIndex
+from Maya_tk.modules import ProjWatcher
+from Maya_tk.modules import ThumbService
+from Maya_tk.modules import ProdTemplate
+from Maya_tk.modules import ProdTree
 NAMES = var.MAINVAR
 MESSAGE = var.MESSAGE
 TITLE = var.TITLE
@@ -26,6 +31,12 @@ SCRPTH = os.path.join(os.getenv('PROGRAMDATA'), 'PipelineTool/scrInfo')
 # Icon directory:
 ICONS = var.ICONS
 
+# Detail lists of main UI and the task sub folder each of them shows
+DETAILLIST = dict( snapShot='snapShotList', review='reviewList', publish='publishList' )
+
+# Size of snapshot thumbnail in info detail viewer
+THUMBSIZE = (205, 115)
+
 # Main width of UI
 WIDTH = 450
 ICONWIDTH = 30
@@ -143,6 +154,8 @@ class MayaMainUI( QtWidgets.QWidget ):
                 logger.debug('No previous UI exists')
 
             parent = QtWidgets.QDialog(parent=getMayaMainWindow())
+            # closing the dialog deletes the UI, so its watcher is stopped
+            parent.setAttribute(QtCore.Qt.WA_DeleteOnClose)
             parent.setObjectName('Pipeline Tool')
             parent.setWindowTitle('Pipeline Tool')
             dialogLayout = QtWidgets.QVBoxLayout(parent)
@@ -153,6 +166,14 @@ class MayaMainUI( QtWidgets.QWidget ):
 
         logger.info('get mode: %s' % self.curMode.upper())
 
+        self.detailPth = {}
+        self.watcher = ProjWatcher.getWatcher(self.prodPth, self.onFolderChanged)
+        # watcher thread stops with the UI, unless a UI made again took it over
+        self.destroyed.connect(partial(ProjWatcher.release, self.prodPth, self.onFolderChanged))
+
+        self.curThumb = None
+        self.thumbs = ThumbService.getService()
+
         self.buildUI()
 
         if not dock:
@@ -174,48 +195,39 @@ class MayaMainUI( QtWidgets.QWidget ):
         self.projPth = self.curPth
         self.assetsPth = self.curPth + 'scenes/assets/'
         self.projPthParts = self.projPth.split('/')
+        self.index = ProjIndex.getIndex(self.prodPth)
 
         if not os.path.exists(self.assetsPth):
             cmds.sysFile(self.assetsPth, md=True)
 
-        self.assetsList = [ f for f in os.listdir( self.assetsPth ) if os.path.isdir( self.assetsPth + f ) ]
+        self.assetsList = self.index.folders( self.assetsPth )
+
+        # Demo content of an empty project, see Maya_tk/templates/groupMode.json
+        demo = ProdTemplate.getPlan('groupMode')
 
         if self.assetsList == []:
-            # Create demo assets
-            assetsSection = ['character', 'environment','props']
-            assetsItem = 'assets001'
-            task = ['art', 'modeling', 'rigging', 'surfacing']
-            for i in assetsSection:
-                assetsSectionPth = os.path.join(self.assetsPth, i)
-                cmds.sysFile(assetsSectionPth, md=True)
-                assetsItemPth = os.path.join(assetsSectionPth, assetsItem)
-                cmds.sysFile(assetsItemPth, md=True)
-                for i in task:
-                    assetsItemTaskPth = os.path.join(assetsItemPth, i)
-                    cmds.sysFile(assetsItemTaskPth, md=True)
-
-            self.assetsList = [f for f in os.listdir(self.assetsPth) if os.path.isdir(self.assetsPth + f)]
+            demo.subPlan('scenes/assets').create(self.curPth)
+            self.index.invalidate(self.assetsPth)
+            self.assetsList = self.index.folders( self.assetsPth )
 
         self.assetsTaskPth = os.path.join(self.assetsPth, self.assetsList[0])
 
-        self.assetsTaskList = [ f for f in os.listdir( self.assetsTaskPth ) if os.path.isdir(self.assetsTaskPth + f)]
+        self.assetsTaskList = self.index.folders( self.assetsTaskPth )
         self.sequencesPth = self.curPth + 'scenes/sequences/'
 
         if not os.path.exists( self.sequencesPth ):
             cmds.sysFile( self.sequencesPth, md=True )
 
-        self.sequencesList = [ f for f in os.listdir( self.sequencesPth ) if
-                               os.path.isdir( self.sequencesPth + f ) ]
+        self.sequencesList = self.index.folders( self.sequencesPth )
         if self.sequencesList == [ ]:
-            self.sequencesTaskPth = self.sequencesPth + 'shot_01/'
-            cmds.sysFile( self.sequencesTaskPth, md=True )
-            self.sequencesTaskList = [ 'lighting', 'FX', 'layout', 'animation', 'comp' ]
-            for i in self.sequencesTaskList:
-                cmds.sysFile( self.sequencesTaskPth + i, md=True )
+            demoShot = demo.children('scenes/sequences')[0]
+            self.sequencesTaskPth = self.sequencesPth + demoShot + '/'
+            self.sequencesTaskList = demo.children('scenes/sequences/' + demoShot)
+            demo.subPlan('scenes/sequences').create(self.curPth)
+            self.index.invalidate( self.sequencesPth )
         else:
             self.sequencesTaskPth = self.sequencesPth + self.sequencesList[ 0 ] + '/'
-            self.sequencesTaskList = [ f for f in os.listdir( self.sequencesTaskPth ) if
-                                       os.path.isdir( self.sequencesTaskPth + f ) ]
+            self.sequencesTaskList = self.index.folders( self.sequencesTaskPth )
         self.stageText = "NA"
         self.stageName = "MA"
         self.curTask = "NA"
@@ -225,29 +237,22 @@ class MayaMainUI( QtWidgets.QWidget ):
         self.curStage = self.projPthParts[1]
 
     def studioModeVar(self):
-        if 'assets' in self.curPthParts:
-            self.stageIndex = self.curPthParts.index( 'assets' )
-        elif 'sequences' in self.curPthParts:
-            self.stageIndex = self.curPthParts.index( 'sequences' )
-        self.prodPth = self.curPth.split( self.curPthParts[ self.stageIndex ] )[ 0 ]
-        self.prodName = self.curPthParts[ self.stageIndex - 1 ]
-        self.prodList = os.listdir( self.prodPth )
-        self.projPth = self.prodName + '/' + self.curPthParts[ self.stageIndex ] + \
-                       self.curPth.split( self.curPthParts[ self.stageIndex ] )[ -1 ]
+        tree = ProdTree.splitPath( self.curPth )
+        self.stageIndex = self.curPthParts.index( tree[ 'stage' ] )
+        self.prodPth = tree[ 'prodPth' ]
+        self.prodName = tree[ 'prodName' ]
+        self.index = ProjIndex.getIndex(self.prodPth)
+        self.prodList = self.index.names( self.prodPth )
+        self.projPth = tree[ 'projPth' ]
         self.projPthParts = self.projPth.split( '/' )
-        if self.curPthParts[ self.stageIndex ] == 'assets':
-            self.assetsPth = self.prodPth + self.curPthParts[ self.stageIndex ] + '/'
-            self.sequencesPth = self.prodPth + self.prodList[ self.prodList.index( 'sequences' ) ] + '/'
-        elif self.curPthParts[ self.stageIndex ] == 'sequences':
-            self.sequencesPth = self.prodPth + self.curPthParts[ self.stageIndex ] + '/'
-            self.assetsPth = self.prodPth + self.prodList[ self.prodList.index( 'assets' ) ] + '/'
-        self.assetsList = [ f for f in os.listdir( self.assetsPth ) if os.path.isdir( self.assetsPth + f ) ]
+        self.assetsPth = self.prodPth + 'assets/'
+        self.sequencesPth = self.prodPth + 'sequences/'
+        self.assetsList = self.index.folders( self.assetsPth )
         self.assetsTaskPth = self.assetsPth + self.assetsList[ 0 ] + '/'
-        self.assetsTaskList = [ f for f in os.listdir( self.assetsTaskPth ) if os.path.isdir( self.assetsTaskPth + f ) ]
-        self.sequencesList = [ f for f in os.listdir( self.sequencesPth ) if os.path.isdir( self.sequencesPth + f ) ]
+        self.assetsTaskList = self.index.folders( self.assetsTaskPth )
+        self.sequencesList = self.index.folders( self.sequencesPth )
         self.sequencesTaskPth = self.sequencesPth + self.sequencesList[0] + '/'
-        self.sequencesTaskList = [ f for f in os.listdir( self.sequencesTaskPth ) if
-                                   os.path.isdir( self.sequencesTaskPth + f ) ]
+        self.sequencesTaskList = self.index.folders( self.sequencesTaskPth )
         self.curStage = self.projPthParts[1]
         if self.curStage == 'assets':
             self.curStagePth = self.assetsPth
@@ -255,36 +260,27 @@ class MayaMainUI( QtWidgets.QWidget ):
         elif self.curStage == 'sequences':
             self.curStagePth = self.sequencesPth
             self.curTask = self.projPthParts[ 3 ]
-        self.curStageList = [ f for f in os.listdir( self.curStagePth ) if os.path.isdir( self.curStagePth + f ) ]
+        self.curStageList = self.index.folders( self.curStagePth )
         self.curStageSection = self.projPthParts[ 2 ]
         self.curStageSectionPth = self.curStagePth + self.curStageSection + '/'
-        self.curStageSectionList = [ f for f in os.listdir( self.curStageSectionPth ) if
-                                     os.path.isdir( self.curStageSectionPth + f ) ]
+        self.curStageSectionList = self.index.folders( self.curStageSectionPth )
         self.curWorkingPart = self.projPthParts[ 3 ]
         self.curWorkingPartPth = self.curStageSectionPth + self.curWorkingPart + '/'
-        self.curWorkingPartList = [ f for f in os.listdir( self.curWorkingPartPth ) if
-                                    os.path.isdir( self.curWorkingPartPth + f ) ]
+        self.curWorkingPartList = self.index.folders( self.curWorkingPartPth )
         if self.curWorkingPart == self.curTask:
             self.curTaskPth = self.curWorkingPartPth
         else:
             self.curTaskPth = self.curWorkingPartPth + self.curTask + '/'
         self.workPth = self.curTaskPth + 'work/maya/'
-        if os.path.exists( self.workPth ) == False:
-            cmds.sysFile( self.workPth, md=True )
-        self.workList = os.listdir( self.workPth )
         self.publishPth = self.curTaskPth + 'publish/maya/'
-        if os.path.exists( self.publishPth ) == False:
-            cmds.sysFile( self.publishPth, md=True )
-        self.publishList = [ f.split( '.ma' )[ 0 ] for f in os.listdir( self.publishPth ) if f.endswith( '.ma' ) ]
         self.reviewPth = self.curTaskPth + 'review/'
-        if os.path.exists( self.reviewPth ) == False:
-            cmds.sysFile( self.reviewPth, md=True )
-        self.reviewList = os.listdir( self.reviewPth )
         self.snapShotPth = self.workPth + 'scenes/snapShot/'
-        if os.path.exists( self.snapShotPth ) == False:
-            cmds.sysFile( self.snapShotPth, md=True )
-        self.snapShotFiles = [ f.split( '.ma' )[ 0 ] for f in os.listdir( self.snapShotPth ) if
-                               f.endswith( '.ma' ) ]
+        self.ensureDetailFolders( self.curTaskPth )
+        self.workList = self.index.names( self.workPth )
+        detail = self.index.taskDetail( self.curTaskPth )
+        self.publishList = detail[ 'publish' ]
+        self.reviewList = detail[ 'review' ]
+        self.snapShotFiles = detail[ 'snapShot' ]
         if 'assets' in self.curPthParts:
             self.stageName = self.curWorkingPart
             self.stageText = 'Assets:'
@@ -292,6 +288,15 @@ class MayaMainUI( QtWidgets.QWidget ):
             self.stageName = self.curStageSection
             self.stageText = 'Shot:'
 
+    def ensureDetailFolders(self, taskPth, *args):
+        # Create work, publish, review, snapShot folders of a task if they are missing, check via project index
+        missing = ProdTree.missingFolders( taskPth, [ ProjIndex.TASKDETAIL[ key ] for key in
+                                                      [ 'work', 'publish', 'review', 'snapShot' ] ], self.index.exists )
+        for pth in missing:
+            cmds.sysFile( pth, md=True )
+        if missing:
+            self.index.invalidate( taskPth )
+
     def buildUI(self):
         # ann1 = ['Open/Load scene','Take a snapshot','Publish file']
         # ic1 = ['openLoad.icon.png','snapshot.icon.png','publish.icon.png']
@@ -708,12 +713,12 @@ class MayaMainUI( QtWidgets.QWidget ):
     # functions of buttons
 
     def refreshInfo(self, *args):
+        self.index.invalidate()
         self.refreshCheckMode()
         self.refreshProdPth()
         self.refreshProdPth()
 
     def goToAssetsFolder(self, *args):
-        self.getMode()
         item1 = cmds.optionMenu( 'assetsMenu', q=True, value=True)
         item2 = cmds.textScrollList( 'assetsSelectList', q=True, si=True )
         updatePth = os.path.join(os.path.join(self.assetsPth, item1), item2[0])
@@ -723,7 +728,6 @@ class MayaMainUI( QtWidgets.QWidget ):
         os.startfile(updatePth)
 
     def goToAssetsTaskFolder(self, *args):
-        self.getMode()
         item1 = cmds.optionMenu( 'assetsMenu', q=True, value=True )
         item2 = cmds.textScrollList( 'assetsSelectList', q=True, si=True )
         item3 = cmds.textScrollList('assetsTaskList', q=True, si=True)
@@ -731,7 +735,6 @@ class MayaMainUI( QtWidgets.QWidget ):
         os.startfile(updatePth)
 
     def setProjectToSelectTask(self, *args):
-        self.getMode()
         item1 = cmds.optionMenu('assetsMenu', q=True, value=True )
         item2 = cmds.textScrollList('assetsSelectList', q=True, si=True )
         item3 = cmds.textScrollList('assetsTaskList', q=True, si=True)
@@ -743,6 +746,8 @@ class MayaMainUI( QtWidgets.QWidget ):
         cmds.textScrollList('snapShotList', e=True, ra=True )
         cmds.textScrollList('reviewList', e=True, ra=True )
         cmds.textScrollList('publishList', e=True, ra=True )
+        self.detailPth = {}
+        self.watcher.watch([])
 
     def refreshProjTab(self, *args):
         if cmds.tabLayout( 'projTabControl', q=True, sti=True ) == 1:
@@ -757,117 +762,111 @@ class MayaMainUI( QtWidgets.QWidget ):
                 self.updateAssetsDetailTask()
 
     def updateAssetsSections(self, *args):
-        self.getMode()
         menuSelect = cmds.optionMenu( 'assetsMenu', q=True, value=True )
         updatePth = self.assetsPth + menuSelect + '/'
-        updateList = [ f for f in os.listdir( updatePth ) if os.path.isdir( updatePth + f ) ]
+        updateList = self.index.folders( updatePth )
         cmds.textScrollList( 'assetsSelectList', e=True, ra=True )
         cmds.textScrollList( 'assetsSelectList', e=True, a=updateList )
         self.clearDataList()
 
     def updateSelectionTask(self, *args):
-        self.getMode()
         itemSelect1 = cmds.textScrollList( 'assetsSelectList', q=True, si=True )
         menuSelect = cmds.optionMenu( 'assetsMenu', q=True, value=True )
         updatePth = os.path.join(os.path.join(self.assetsPth, menuSelect), itemSelect1[0])
-        updateList = [ f for f in os.listdir( updatePth ) if os.path.isdir(os.path.join(updatePth, f))]
+        updateList = self.index.folders( updatePth )
         cmds.textScrollList( 'assetsTaskList', e=True, ra=True )
         cmds.textScrollList( 'assetsTaskList', e=True, a=updateList )
         self.clearDataList()
 
     def updateAssetsDetailTask(self, *args):
-        self.getMode()
         menuSelect = cmds.optionMenu( 'assetsMenu', q=True, value=True )
         itemSelect1 = cmds.textScrollList( 'assetsSelectList', q=True, si=True )
         itemSelect2 = cmds.textScrollList( 'assetsTaskList', q=True, si=True )
         updatePth = self.assetsPth + menuSelect + '/' + itemSelect1[ 0 ] + '/' + itemSelect2[ 0 ] + '/'
-        updatePublishPth = updatePth + 'publish/maya/'
-        if os.path.exists( updatePublishPth ) == False:
-            cmds.sysFile( updatePublishPth, md=True )
-        updateReviewPth = updatePth + 'review/'
-        if os.path.exists( updateReviewPth ) == False:
-            cmds.sysFile( updateReviewPth, md=True )
-
-        baseFolder = 'work/maya/scenes/snapShot'
-        if self.curMode == 'Studio Mode':
-            updateSnapShotPth = os.path.join(updatePth, baseFolder)
-        elif self.curMode == 'Group Mode':
-            updateSnapShotPth = os.path.join(updatePth, baseFolder)
-        else:
-            updateSnapShotPth = os.path.join(updatePth, baseFolder)
-
-        if not os.path.exists(updateSnapShotPth):
-            cmds.sysFile( updateSnapShotPth, md=True )
-
-        updatePublishList = [ f.split( '.ma' )[ 0 ] for f in os.listdir( updatePublishPth ) if f.endswith( '.ma' ) ]
-        updateReviewList = [ f for f in os.listdir( updateReviewPth ) ]
-        updateSnapShotList = [ f.split( '.ma' )[ 0 ] for f in os.listdir( updateSnapShotPth ) if f.endswith( '.ma' ) ]
-
-        cmds.textScrollList( 'snapShotList', e=True, ra=True )
-        cmds.textScrollList( 'reviewList', e=True, ra=True )
-        cmds.textScrollList( 'publishList', e=True, ra=True )
-        cmds.textScrollList( 'snapShotList', e=True, a=updateSnapShotList )
-        cmds.textScrollList( 'reviewList', e=True, a=updateReviewList )
-        cmds.textScrollList( 'publishList', e=True, a=updatePublishList )
+        self.updateDetailLists( updatePth )
 
         if cmds.window('imageViewerMainUI', q=True, exists=True):
             cmds.image('imageViewerMainUI', e=True, vis=False)
             cmds.text('textViewerMainUI', e=True, vis=True)
 
     def updateSequenceSelectTask(self, *args):
-        self.getMode()
         menuSelect = cmds.optionMenu( 'sequencesMenu', q=True, value=True )
         updatePth = self.sequencesPth + menuSelect + '/'
-        updateList = [ f for f in os.listdir( updatePth ) if os.path.isdir( updatePth + f ) ]
+        updateList = self.index.folders( updatePth )
         cmds.textScrollList( 'sequencesTaskList', e=True, ra=True )
         cmds.textScrollList( 'sequencesTaskList', e=True, a=updateList )
         self.clearDataList()
 
     def updateSequenceDetailTask(self, *args):
-        self.getMode()
         menuSelect = cmds.optionMenu( 'sequencesMenu', q=True, value=True )
         itemSelect = cmds.textScrollList( 'sequencesTaskList', q=True, si=True )
         updatePth = self.sequencesPth + menuSelect + '/' + itemSelect[ 0 ] + '/'
-        updatePublishPth = updatePth + 'publish/maya/'
-        if not os.path.exists( updatePublishPth ):
-            cmds.sysFile( updatePublishPth, md=True )
-        updateReviewPth = updatePth + 'review/'
+        self.updateDetailLists( updatePth )
 
-        if not os.path.exists( updateReviewPth ):
-            cmds.sysFile( updateReviewPth, md=True )
+        if cmds.image('imageViewerMainUI', query=True, exists=True):
+            cmds.image('imageViewerMainUI', e=True, vis=False)
+            cmds.text('textViewerMainUI', e=True, vis=True)
 
-        baseFolder = 'work/maya/scenes/snapShot'
+    def updateDetailLists(self, taskPth, *args):
+        # snapShot, review, publish lists of selected task, all come from project index
+        self.ensureDetailFolders( taskPth )
 
-        if self.curMode == 'Studio Mode':
-            updateSnapShotPth = os.path.join(updatePth, baseFolder)
-        elif self.curMode == 'Group Mode':
-            updateSnapShotPth = os.path.join(updatePth, baseFolder)
-        else:
-            updateSnapShotPth = os.path.join(updatePth, baseFolder)
+        # Watch only the folders shown, new files will come to the lists without rescan. The watcher lists them
+        # before the index does, and listings cached before that are dropped, so no file falls in between
+        self.detailPth = {}
+        for key in DETAILLIST:
+            pth = os.path.normpath( os.path.join( taskPth, ProjIndex.TASKDETAIL[ key ] ) )
+            self.detailPth[ pth ] = key
+        self.watcher.watch( list( self.detailPth ) )
+        for pth in self.detailPth:
+            self.index.invalidate( pth )
 
-        if not os.path.exists(updateSnapShotPth):
-            cmds.sysFile( updateSnapShotPth, md=True )
+        detail = self.index.taskDetail( taskPth )
 
-        updatePublishList = [ f.split( '.ma' )[ 0 ] for f in os.listdir( updatePublishPth ) if f.endswith( '.ma' ) ]
-        updateReviewList = [ f for f in os.listdir( updateReviewPth ) ]
-        updateSnapShotList = [ f.split( '.ma' )[ 0 ] for f in os.listdir( updateSnapShotPth ) if f.endswith( '.ma' ) ]
         cmds.textScrollList( 'snapShotList', e=True, ra=True )
         cmds.textScrollList( 'reviewList', e=True, ra=True )
         cmds.textScrollList( 'publishList', e=True, ra=True )
-        cmds.textScrollList( 'snapShotList', e=True, a=updateSnapShotList )
-        cmds.textScrollList( 'reviewList', e=True, a=updateReviewList )
-        cmds.textScrollList( 'publishList', e=True, a=updatePublishList )
-
-        if cmds.image('imageViewerMainUI', query=True, exists=True):
-            cmds.image('imageViewerMainUI', e=True, vis=False)
-            cmds.text('textViewerMainUI', e=True, vis=True)
+        cmds.textScrollList( 'snapShotList', e=True, a=detail[ 'snapShot' ] )
+        cmds.textScrollList( 'reviewList', e=True, a=detail[ 'review' ] )
+        cmds.textScrollList( 'publishList', e=True, a=detail[ 'publish' ] )
+
+    def onFolderChanged(self, pth, added, removed, *args):
+        # Called from watcher thread, maya UI can only be edited in main thread
+        maya.utils.executeDeferred( partial( self.applyFolderChange, pth, added, removed ) )
+
+    def applyFolderChange(self, pth, added, removed, *args):
+        self.index.invalidate( pth )
+
+        # a snapshot written again under the same name gets a new thumbnail straight away
+        for f in added + removed:
+            self.thumbs.forget( os.path.join( pth, f ) )
+
+        key = self.detailPth.get( os.path.normpath( pth ) )
+        if key is None:
+            return
+
+        listName = DETAILLIST[ key ]
+        if not cmds.textScrollList( listName, q=True, exists=True ):
+            return
+
+        if key != 'review':
+            ext = ProjIndex.SCENEEXT
+            added = [ f[ :-len( ext ) ] for f in added if f.endswith( ext ) ]
+            removed = [ f[ :-len( ext ) ] for f in removed if f.endswith( ext ) ]
+
+        items = cmds.textScrollList( listName, q=True, ai=True ) or [ ]
+        for item in removed:
+            if item in items:
+                cmds.textScrollList( listName, e=True, ri=item )
+        for item in added:
+            if item not in items:
+                cmds.textScrollList( listName, e=True, a=item )
 
     def updateViewer(self, *args):
 
         if not cmds.image( 'imageViewerMainUI', query=True, exists=True):
             sys.exit()
         else:
-            self.getMode()
             if cmds.tabLayout( 'projTabControl', q=True, sti=True ) == 1:
                 menuSelect = cmds.optionMenu( 'assetsMenu', q=True, value=True ) or [ ]
                 itemSelect1 = cmds.textScrollList( 'assetsSelectList', q=True, si=True ) or [ ]
@@ -894,21 +893,23 @@ class MayaMainUI( QtWidgets.QWidget ):
                         updateImagePth = self.updatePth + 'work/maya/snapShot/' + snapShotItem[ 0 ] + '.jpg'
                         self.updateCommentPth = self.updatePth + 'work/maya/snapShot/' + snapShotItem[ 0 ] + '.comment'
 
-                    updateSnapShotPth = updateImagePth.split('.jpg')[0] + '.png'
-                    image = om.MImage()
-                    image.readFromFile(updateImagePth)
-                    image.resize(205,115)
-                    image.writeToFile(updateSnapShotPth, 'png')
-                    self.updateInfoFile(filePth=updateSnapShotPth.split('.png')[0] + '.ma')
+                    self.updateInfoFile(filePth=updateImagePth.split('.jpg')[0] + '.ma')
 
                     if not os.path.exists( updateImagePth ):
+                        self.curThumb = None
                         cmds.image('imageViewerMainUI', e=True, vis=False)
                         cmds.text('textViewerMainUI', e=True, vis=True)
                         cmds.text('commentMainUI', e=True, l="No comment")
                     else:
-                        cmds.image('imageViewerMainUI', e=True, i=updateSnapShotPth, vis=True)
-                        cmds.text('textViewerMainUI', e=True, vis=False)
+                        self.curThumb = updateImagePth
                         self.updateCommentMainUI()
+                        # Decode and resize in thumbnail service, show placeholder until it is ready
+                        image = self.thumbs.request( updateImagePth, THUMBSIZE, self.onThumbReady )
+                        if image is None:
+                            cmds.image('imageViewerMainUI', e=True, vis=False)
+                            cmds.text('textViewerMainUI', e=True, l="Loading...", vis=True)
+                        else:
+                            self.showThumb( updateImagePth )
 
             elif cmds.tabLayout( 'detailTabControl', q=True, sti=True) == 2:
                 reviewItem = cmds.textScrollList( 'reviewList', q=True, si=True) or []
@@ -943,6 +944,25 @@ class MayaMainUI( QtWidgets.QWidget ):
                         cmds.text( 'textViewerMainUI', e=True, vis=False )
                         self.updateCommentMainUI()
 
+    def onThumbReady(self, source, size, image, *args):
+        # Called from thumbnail worker thread
+        maya.utils.executeDeferred( partial( self.showThumb, source ) )
+
+    def showThumb(self, source, *args):
+        # Selection may have moved on while the thumbnail was being made
+        if source != self.curThumb or not cmds.image( 'imageViewerMainUI', query=True, exists=True ):
+            return
+
+        thumbPth = self.thumbs.path( source, THUMBSIZE )
+        if thumbPth is None:
+            # source could not be decoded
+            cmds.image('imageViewerMainUI', e=True, vis=False)
+            cmds.text('textViewerMainUI', e=True, l="No image", vis=True)
+            return
+
+        cmds.image('imageViewerMainUI', e=True, i=thumbPth, vis=True)
+        cmds.text('textViewerMainUI', e=True, l="No image", vis=False)
+
     def updateInfoFile(self, filePth=None, *args):
         if os.path.exists(filePth):
             name = os.path.basename(filePth)
@@ -54,12 +54,18 @@ class MayaPythonProc( object ):
 
     #file list in Installation folder
     icons_lst = [f for f in os.listdir(os.path.join(os.getcwd(), 'Maya_tk/icons')) if f.endswith('.png') or f.endswith('.jpg')]
-    modules_lst = [f for f in os.listdir(os.path.join(os.getcwd(), 'Maya_tk/modules')) if f.endswith('.py')]
+    # the shape catalog of toolBoxII is a module file too
+    modules_lst = [f for f in os.listdir(os.path.join(os.getcwd(), 'Maya_tk/modules')) if f.endswith('.py') or
+                   f.endswith('.nrbs')]
+    plugins_lst = [f for f in os.listdir(os.path.join(os.getcwd(), 'Maya_tk/plugins')) if f.endswith('.py')]
     scrRoot_lst = [f for f in os.listdir(os.path.join(os.getcwd(), 'Maya_tk')) if f.endswith( '.py' )]
+    templates_lst = [f for f in os.listdir(os.path.join(os.getcwd(), 'Maya_tk/templates')) if f.endswith('.json')]
     #---------------------------------------------------------
     # List file names for CHECK LIST
-    checkList = dict(icons=NAMES['mayaIcon'], modules=NAMES['mayaModule'], master=NAMES['mayaRoot'])
-    fileList = dict(icons=icons_lst, modules=modules_lst, master=scrRoot_lst)
+    checkList = dict(icons=NAMES['mayaIcon'], modules=NAMES['mayaModule'], master=NAMES['mayaRoot'],
+                     templates=NAMES['mayaTemplate'], plugins=NAMES['mayaPlugin'])
+    fileList = dict(icons=icons_lst, modules=modules_lst, master=scrRoot_lst, templates=templates_lst,
+                    plugins=plugins_lst)
     # ---------------------------------------------------------
     # Make variables just in case you miss something.
     message_missing = []
@@ -61,9 +61,16 @@ MAINVAR = dict(
 
     mayaModule = ['ChannelBox.py', 'MayaFuncs.py', 'MayaMainUI.py', 'MayaPythonProc.py', 'MayaVariables.py',
                   'OsPythonProc.py', 'ProdFolder.py', 'ProjectManager.py', 'toolBoxI.py', 'toolBoxII.py',
-                  'toolBoxIII.py', 'toolBoxIV.py','DataHandle_studio.py', ],
+                  'toolBoxIII.py', 'toolBoxIV.py','DataHandle_studio.py', 'ProjIndex.py', 'ProjWatcher.py',
+                  'ThumbService.py', 'VersionRegistry.py',
+                  'PublishTransaction.py', 'SceneStore.py',
+                  'FolderPlan.py', 'ProdTemplate.py', 'ProdTree.py', 'ProdValidator.py',
+                  'LibraryIndex.py', 'ShapeCatalog.py', 'toolBoxIIshapes.nrbs', 'ControllerBatch.py',
+                  'NodeModel.py', ],
 
-    mayaPlugin = ['Qt.py',],
+    mayaTemplate = ['studioMode.json', 'projectManager.json', 'groupMode.json'],
+
+    mayaPlugin = ['Qt.py', 'controllerBatchCmd.py', 'modifierCmd.py', ],
 
     mayaIcon = ['After Effects CC.icon.png', 'Hiero.icon.png', 'Houdini FX.icon.png', 'Illustrator CC.icon.png',
                       'Mari.icon.png', 'Mudbox 2017.icon.png', 'NukeX.icon.png', 'Photoshop CC.icon.png',
@@ -222,13 +229,6 @@ def getTime():
     time = '%s:%s' % (str(t.tm_hour), str(t.tm_min))
     return time
 
-def createLog(apps, event='log in', data=MAINVAR):
-    d = getDate()
-    t = getTime()
-
-    content = d + ': ' + data['user'] + ': ' + event + ' ' + apps.upper() + ' at ' + t + '\n'
-
-    log = os.path.join(SCRPTH, data['os'][3])
-
-    with open(log, 'a+' ) as f:
-        f.write(content)
\ No newline at end of file
+def createLog(apps, event='login', data=MAINVAR):
+    from tk import eventLog
+    eventLog.logEvent(event, app=apps, user=data['user'])
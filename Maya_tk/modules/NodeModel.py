@@ -0,0 +1,577 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: NodeModel.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Qt list models of maya nodes for the managers of the tool boxes (controllers of toolBoxII, lights of
+    toolBoxIII), one row per node instead of one widget per node, so a scene of thousands of controllers or lights
+    is shown by one view which only paints the rows on screen.
+
+        - the rows are listed once, then maya callbacks (node added / removed) insert and remove rows
+        - attributes of a row are read the first time the row is painted and kept until the node changes, a row
+          which has been read is watched (attribute changed / name changed) and read again only when it changed
+        - callbacks are gathered and applied once per pass of the event loop, deleting 1000 nodes removes their
+          rows in one go
+        - edits of many rows (isolate, colour, intensity, delete) are made with one MDagModifier, run by the command
+          damgApplyModifier (plugin Maya_tk/plugins/modifierCmd.py) so they are one undo step
+
+    Callbacks are removed when the widget which owns the model is destroyed.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, logging
+from functools import partial
+
+from maya import cmds
+import maya.api.OpenMaya as om
+
+from Maya_tk.plugins.Qt import QtWidgets, QtCore, QtGui
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+PLUGINPTH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'plugins', 'modifierCmd.py')
+COMMAND = 'damgApplyModifier'
+
+# Colour of a row (QColor), painted by ColorDelegate
+ColorRole = QtCore.Qt.UserRole + 1
+# Full path of the node of a row
+PathRole = QtCore.Qt.UserRole + 2
+# Intensity of a light
+IntensityRole = QtCore.Qt.UserRole + 3
+
+# Width of the colour swatch of a row
+SWATCHW = 30
+ROWH = 22
+
+# Colour of override colour 0 (no colour)
+DEFAULTCOLOR = (.4, .4, .4)
+
+# Modifiers waiting for the command, the command takes the first one
+_PENDING = []
+# override colour index: QColor
+_COLORS = {}
+
+def loadPlugin(*args):
+    if not cmds.pluginInfo(os.path.basename(PLUGINPTH), query=True, loaded=True):
+        cmds.loadPlugin(PLUGINPTH, quiet=True)
+
+def take(*args):
+    """
+    :return: modifier of the command which is running, called by damgApplyModifier
+    """
+    if not _PENDING:
+        # called by repeat last or by hand, there is no modifier to run
+        raise RuntimeError('%s is not meant to be called directly, use NodeModel.applyModifier' % COMMAND)
+    return _PENDING.pop(0)
+
+def applyModifier(modifier, *args):
+    """
+    Run a modifier as one undo step
+    """
+    loadPlugin()
+    _PENDING.append(modifier)
+    try:
+        getattr(cmds, COMMAND)()
+    finally:
+        # the command did not take its modifier when it failed
+        del _PENDING[:]
+
+def removeCallbacks(callbacks, watched=None, *args):
+    """
+    Module function, it is called when the widget of a model is destroyed and must not use the model
+    """
+    ids = list(callbacks)
+    if watched:
+        for nodeIds in watched.values():
+            ids += nodeIds
+        watched.clear()
+    del callbacks[:]
+    if ids:
+        om.MMessage.removeCallbacks(ids)
+
+def indexColor(index, *args):
+    """
+    :return: QColor of an override colour index
+    """
+    color = _COLORS.get(index)
+    if color is None:
+        rgb = cmds.colorIndex(index, query=True) if index else DEFAULTCOLOR
+        color = QtGui.QColor.fromRgbF(rgb[0], rgb[1], rgb[2])
+        _COLORS[index] = color
+    return color
+
+def attributeName(plug, *args):
+    # name of the attribute changed, colorR is a change of color
+    if plug.isChild:
+        plug = plug.parent()
+    return om.MFnAttribute(plug.attribute()).name
+
+def isDouble(plug, *args):
+    attribute = plug.attribute()
+    return attribute.hasFn(om.MFn.kNumericAttribute) and \
+           om.MFnNumericAttribute(attribute).numericType() == om.MFnNumericData.kDouble
+
+def plugNumber(plug, *args):
+    return plug.asDouble() if isDouble(plug) else plug.asFloat()
+
+def setPlugNumber(modifier, plug, value, *args):
+    # intensity is a float of maya lights and a double of some plugin lights
+    if isDouble(plug):
+        modifier.newPlugValueDouble(plug, value)
+    else:
+        modifier.newPlugValueFloat(plug, value)
+
+def rowRanges(rows, *args):
+    """
+    :return: (first, last) of every run of following rows, last run first so rows can be removed in order
+    """
+    ranges = []
+    for row in sorted(rows):
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return [tuple(r) for r in reversed(ranges)]
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                    MAIN CLASS: NODE LIST MODEL - ONE ROW PER NODE                       """
+# ----------------------------------------------------------------------------------------------------------- #
+class NodeListModel(QtCore.QAbstractListModel):
+
+    # node types of the rows, callbacks are added for each of them
+    nodeTypes = []
+    # attributes which change what a row shows
+    attributes = set()
+
+    def __init__(self, parent=None):
+
+        super(NodeListModel, self).__init__(parent)
+
+        # hash code of the node of every row, and its handle
+        self.keys = []
+        self.handles = {}
+        # hash code: what a row shows, read when the row is painted
+        self.cache = {}
+
+        # changes of the scene waiting for the next pass of the event loop
+        self.added = []
+        self.removed = set()
+        self.stale = set()
+
+        self.callbacks = []
+        # hash code: callbacks of a row which has been read
+        self.watched = {}
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.flush)
+
+        self.populate()
+        self.addCallbacks()
+        if parent is not None:
+            parent.destroyed.connect(partial(removeCallbacks, self.callbacks, self.watched))
+
+    # ------------------------------------------------------
+    # TO BE DONE BY SUB CLASSES
+    # ------------------------------------------------------
+    def fetch(self, node):
+        """
+        :return: dictionary of what the row of a node shows
+        """
+        return dict(name=om.MFnDependencyNode(node).name())
+
+    def watchNodes(self, node):
+        """
+        :return: nodes whose attributes change the row of a node
+        """
+        return [node]
+
+    def roleData(self, info, role):
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return info['name']
+        return None
+
+    # ------------------------------------------------------
+    # ROWS
+    # ------------------------------------------------------
+    def listNodes(self):
+        if not self.nodeTypes:
+            # ls without type lists every node
+            return []
+        names = cmds.ls(type=self.nodeTypes, long=True) or []
+        selection = om.MSelectionList()
+        for name in names:
+            selection.add(name)
+        return [selection.getDependNode(i) for i in range(selection.length())]
+
+    def populate(self):
+        """
+        List the rows again, only when the scene is new or opened
+        """
+        self.beginResetModel()
+        removeCallbacks([], self.watched)
+        self.keys = []
+        self.handles = {}
+        for node in self.listNodes():
+            handle = om.MObjectHandle(node)
+            key = handle.hashCode()
+            if key not in self.handles:
+                self.keys.append(key)
+                self.handles[key] = handle
+        self.cache = {}
+        self.added = []
+        self.removed = set()
+        self.stale = set()
+        self.endResetModel()
+
+    def refresh(self):
+        """
+        Read every row again when it is painted, the rows are not listed again
+        """
+        for key in list(self.watched):
+            self.unwatch(key)
+        self.cache = {}
+        if self.keys:
+            self.dataChanged.emit(self.index(0), self.index(len(self.keys) - 1))
+
+    def node(self, row):
+        handle = self.handles.get(self.keys[row])
+        if handle is None or not handle.isValid():
+            return None
+        return handle.object()
+
+    def nodes(self, rows=None):
+        """
+        :return: nodes of rows (every row by default) which still exist
+        """
+        if rows is None:
+            rows = range(len(self.keys))
+        nodes = [self.node(row) for row in rows]
+        return [node for node in nodes if node is not None]
+
+    def info(self, row):
+        key = self.keys[row]
+        info = self.cache.get(key)
+        if info is None:
+            node = self.node(row)
+            if node is None:
+                return None
+            info = self.fetch(node)
+            self.cache[key] = info
+            if key not in self.watched:
+                self.watch(key, self.watchNodes(node))
+        return info
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.keys):
+            return None
+        info = self.info(index.row())
+        if info is None:
+            return None
+        return self.roleData(info, role)
+
+    # ------------------------------------------------------
+    # CALLBACKS
+    # ------------------------------------------------------
+    def addCallbacks(self):
+        for nodeType in self.nodeTypes:
+            try:
+                self.callbacks.append(om.MDGMessage.addNodeAddedCallback(self.nodeAdded, nodeType))
+                self.callbacks.append(om.MDGMessage.addNodeRemovedCallback(self.nodeRemoved, nodeType))
+            except RuntimeError:
+                # type of a plugin which is not loaded
+                logger.debug('No callback for node type %s' % nodeType)
+        for message in (om.MSceneMessage.kAfterNew, om.MSceneMessage.kAfterOpen):
+            self.callbacks.append(om.MSceneMessage.addCallback(message, self.sceneChanged))
+
+    def watch(self, key, nodes):
+        ids = []
+        for node in nodes:
+            ids.append(om.MNodeMessage.addAttributeChangedCallback(node, self.attributeChanged, key))
+            ids.append(om.MNodeMessage.addNameChangedCallback(node, self.nameChanged, key))
+        self.watched[key] = ids
+
+    def unwatch(self, key):
+        ids = self.watched.pop(key, None)
+        if ids:
+            om.MMessage.removeCallbacks(ids)
+
+    def nodeAdded(self, node, clientData=None):
+        # a new node has no name nor parent yet, it is read at the next pass of the event loop
+        self.added.append(om.MObjectHandle(node))
+        self.timer.start()
+
+    def nodeRemoved(self, node, clientData=None):
+        self.removed.add(om.MObjectHandle(node).hashCode())
+        self.timer.start()
+
+    def attributeChanged(self, message, plug, otherPlug, key):
+        if message & om.MNodeMessage.kAttributeSet and attributeName(plug) in self.attributes:
+            self.stale.add(key)
+            self.timer.start()
+
+    def nameChanged(self, node, previousName, key):
+        self.stale.add(key)
+        self.timer.start()
+
+    def sceneChanged(self, clientData=None):
+        self.populate()
+
+    def flush(self):
+        """
+        Apply the changes of the scene since the last pass of the event loop, only the rows changed are updated
+        """
+        added, self.added = self.added, []
+        removed, self.removed = self.removed, set()
+        stale, self.stale = self.stale, set()
+
+        if removed:
+            rows = [row for row, key in enumerate(self.keys) if key in removed]
+            for first, last in rowRanges(rows):
+                self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+                for key in self.keys[first:last + 1]:
+                    self.handles.pop(key, None)
+                    self.cache.pop(key, None)
+                    self.unwatch(key)
+                del self.keys[first:last + 1]
+                self.endRemoveRows()
+
+        new = []
+        for handle in added:
+            if not handle.isValid():
+                continue
+            key = handle.hashCode()
+            if key not in self.handles:
+                self.handles[key] = handle
+                new.append(key)
+        if new:
+            first = len(self.keys)
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(new) - 1)
+            self.keys += new
+            self.endInsertRows()
+
+        stale = [key for key in stale if key in self.cache]
+        if stale:
+            for key in stale:
+                del self.cache[key]
+            rows = [row for row, key in enumerate(self.keys) if key in stale]
+            for first, last in rowRanges(rows):
+                self.dataChanged.emit(self.index(first), self.index(last))
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                              SUB CLASS: SHAPE LIST MODEL - ONE ROW PER SHAPE NODE                        """
+# ----------------------------------------------------------------------------------------------------------- #
+class ShapeListModel(NodeListModel):
+    """
+    Rows of shape nodes which are shown, renamed, hidden and deleted by their transform
+    """
+    def transform(self, node):
+        return om.MFnDagNode(node).parent(0)
+
+    def fetchTransform(self, node):
+        shape = om.MFnDagNode(node)
+        transform = om.MFnDagNode(shape.parent(0))
+        return dict(name=transform.name(), path=transform.fullPathName(),
+                    visible=transform.findPlug('visibility', False).asBool())
+
+    def watchNodes(self, node):
+        return [node, self.transform(node)]
+
+    def roleData(self, info, role):
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return info['name']
+        if role == QtCore.Qt.CheckStateRole:
+            return QtCore.Qt.Checked if info['visible'] else QtCore.Qt.Unchecked
+        if role in (QtCore.Qt.ToolTipRole, PathRole):
+            return info['path']
+        return None
+
+    def flags(self, index):
+        return super(ShapeListModel, self).flags(index) | QtCore.Qt.ItemIsEditable | QtCore.Qt.ItemIsUserCheckable
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if not index.isValid():
+            return False
+        node = self.node(index.row())
+        if node is None:
+            return False
+        if role == QtCore.Qt.EditRole:
+            # text of the editor as it is, str() fails on a name which is not ascii
+            name = (value if isinstance(value, basestring) else unicode(value)).strip()
+            if not name:
+                return False
+            modifier = om.MDagModifier()
+            modifier.renameNode(self.transform(node), name)
+            applyModifier(modifier)
+            return True
+        if role == QtCore.Qt.CheckStateRole:
+            self.setVisible([index.row()], value == QtCore.Qt.Checked)
+            return True
+        return False
+
+    # ------------------------------------------------------
+    # EDITS OF MANY ROWS, ONE UNDO STEP EACH
+    # ------------------------------------------------------
+    def transforms(self, rows=None):
+        """
+        :return: transforms of rows, once each (a transform may have many shapes)
+        """
+        transforms = {}
+        for node in self.nodes(rows):
+            transform = self.transform(node)
+            transforms.setdefault(om.MObjectHandle(transform).hashCode(), transform)
+        return transforms
+
+    def setVisibility(self, modifier, transforms, value):
+        for transform in transforms:
+            plug = om.MFnDependencyNode(transform).findPlug('visibility', False)
+            # plugs which do not change are not put in the undo step
+            if plug.asBool() != value and not plug.isLocked:
+                modifier.newPlugValueBool(plug, value)
+
+    def setVisible(self, rows, value):
+        modifier = om.MDagModifier()
+        self.setVisibility(modifier, self.transforms(rows).values(), value)
+        applyModifier(modifier)
+
+    def showAll(self):
+        self.setVisible(None, True)
+
+    def isolate(self, rows):
+        """
+        Show the transforms of rows, hide every other one
+        """
+        shown = self.transforms(rows)
+        hidden = [transform for key, transform in self.transforms().items() if key not in shown]
+        modifier = om.MDagModifier()
+        self.setVisibility(modifier, shown.values(), True)
+        self.setVisibility(modifier, hidden, False)
+        applyModifier(modifier)
+
+    def deleteRows(self, rows):
+        modifier = om.MDagModifier()
+        for transform in self.transforms(rows).values():
+            # only the transform, like pm.delete: a parent group left empty is kept
+            modifier.deleteNode(transform, False)
+        applyModifier(modifier)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                 SUB CLASS: CONTROLLER MODEL - CURVES AND SURFACES                       """
+# ----------------------------------------------------------------------------------------------------------- #
+class ControllerModel(ShapeListModel):
+
+    nodeTypes = ['nurbsCurve', 'nurbsSurface']
+    attributes = set(['visibility', 'overrideEnabled', 'overrideColor'])
+
+    def fetch(self, node):
+        info = self.fetchTransform(node)
+        shape = om.MFnDependencyNode(node)
+        info['color'] = 0
+        if shape.findPlug('overrideEnabled', False).asBool():
+            info['color'] = shape.findPlug('overrideColor', False).asInt()
+        return info
+
+    def roleData(self, info, role):
+        if role == ColorRole:
+            return indexColor(info['color'])
+        return super(ControllerModel, self).roleData(info, role)
+
+    def setColor(self, rows, index):
+        modifier = om.MDagModifier()
+        for node in self.nodes(rows):
+            fn = om.MFnDependencyNode(node)
+            modifier.newPlugValueBool(fn.findPlug('overrideEnabled', False), True)
+            modifier.newPlugValueBool(fn.findPlug('overrideRGBColors', False), False)
+            modifier.newPlugValueInt(fn.findPlug('overrideColor', False), index)
+        applyModifier(modifier)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                   SUB CLASS: LIGHT MODEL - MAYA AND PLUGIN LIGHTS                        """
+# ----------------------------------------------------------------------------------------------------------- #
+class LightModel(ShapeListModel):
+
+    attributes = set(['visibility', 'intensity', 'color'])
+
+    def __init__(self, nodeTypes, parent=None):
+        # light types of maya and of the render plugins which are loaded
+        self.nodeTypes = list(nodeTypes)
+        super(LightModel, self).__init__(parent)
+
+    def fetch(self, node):
+        info = self.fetchTransform(node)
+        fn = om.MFnDependencyNode(node)
+        # a plugin light may have no intensity or no colour
+        info['intensity'] = plugNumber(fn.findPlug('intensity', False)) if fn.hasAttribute('intensity') else None
+        info['color'] = None
+        if fn.hasAttribute('color'):
+            plug = fn.findPlug('color', False)
+            info['color'] = tuple([plug.child(i).asFloat() for i in range(3)])
+        return info
+
+    def roleData(self, info, role):
+        if role == ColorRole and info['color'] is not None:
+            return QtGui.QColor.fromRgbF(*[min(max(c, 0.0), 1.0) for c in info['color']])
+        if role == IntensityRole:
+            return info['intensity']
+        if role == QtCore.Qt.ToolTipRole and info['intensity'] is not None:
+            return '%s\nintensity %.3f' % (info['path'], info['intensity'])
+        return super(LightModel, self).roleData(info, role)
+
+    def lightPlugs(self, rows, name):
+        for node in self.nodes(rows):
+            fn = om.MFnDependencyNode(node)
+            if fn.hasAttribute(name):
+                plug = fn.findPlug(name, False)
+                if not plug.isLocked:
+                    yield plug
+
+    def setIntensity(self, rows, value):
+        modifier = om.MDagModifier()
+        for plug in self.lightPlugs(rows, 'intensity'):
+            setPlugNumber(modifier, plug, value)
+        applyModifier(modifier)
+
+    def setLightColor(self, rows, color):
+        modifier = om.MDagModifier()
+        for plug in self.lightPlugs(rows, 'color'):
+            for i in range(3):
+                setPlugNumber(modifier, plug.child(i), color[i])
+        applyModifier(modifier)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                SUB CLASS: COLOR DELEGATE - ROW WITH A COLOUR SWATCH                      """
+# ----------------------------------------------------------------------------------------------------------- #
+class ColorDelegate(QtWidgets.QStyledItemDelegate):
+
+    def paint(self, painter, option, index):
+        opt = QtWidgets.QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        swatch = QtCore.QRect(opt.rect)
+        swatch.setLeft(opt.rect.right() - SWATCHW)
+        opt.rect.setRight(swatch.left() - 4)
+
+        style = opt.widget.style() if opt.widget else QtWidgets.QApplication.style()
+        style.drawControl(QtWidgets.QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+
+        color = index.data(ColorRole)
+        if color is not None:
+            painter.fillRect(swatch.adjusted(0, 2, 0, -2), color)
+
+    def sizeHint(self, option, index):
+        size = super(ColorDelegate, self).sizeHint(option, index)
+        return QtCore.QSize(size.width() + SWATCHW + 4, max(size.height(), ROWH))
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
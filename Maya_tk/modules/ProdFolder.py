@@ -18,6 +18,9 @@ from maya import cmds
 from functools import partial
 import os, sys, json, logging
 
+from Maya_tk.modules import FolderPlan
+from Maya_tk.modules import ProdTemplate
+
 # -------------------------------------------------------------------------------------------------------------
 # VARIABLES
 # -------------------------------------------------------------------------------------------------------------
@@ -28,19 +31,8 @@ WINPROFILE = dict( prodpthUI=[ 'ProdPthUI', 'Create New Project', 'SET UP NEW PR
 
 APPS = [ 'maya', 'zbrush', 'mari', 'nuke', 'photoshop', 'houdini', 'after effects' ]
 
-MASTER = [ 'assets', 'sequences', 'deliverables', 'documents', 'editorial', 'sound', 'resources', 'RnD' ]
-TASKS = [ 'art', 'modeling', 'rigging', 'surfacing' ]
-SEQTASKS = [ 'anim', 'comp', 'fx', 'layout', 'lighting' ]
-ASSETS = {'heroObj': [ 'washer', 'dryer' ], 'environment': [], 'props': [ ]}
-STEPS = ['publish', 'review', 'work']
-
-MODELING = [ 'scenes', 'fromZ', 'toZ', 'objImport', 'objExport', 'movie' ]
-RIGGING = [ 'scenes', 'reference' ]
-SURFACING = ['scenes', 'sourceimages', 'images', 'movie']
-LAYOUT = [ 'scenes', 'sourceimages', 'images', 'movie', 'alembic']
-LIGHTING = [ 'scenes', 'sourceimages', 'images', 'cache', 'reference' ]
-FX = [ 'scenes', 'sourceimages', 'images', 'cache', 'reference', 'alembic' ]
-ANIM = LAYOUT
+# Layout of production, see Maya_tk/templates/studioMode.json
+STUDIOTEMPLATE = 'studioMode'
 
 # -------------------------------------------------------------------------------------------------------------
 # MAKE MAYA UNDERSTAND QT UI AS MAYA WINDOW,  FIX VERSION CONVENTION
@@ -232,7 +224,7 @@ class ProdFolder( object ):
         self.bts.makeSeparator(h=10, w=w)
 
         cmds.rowColumnLayout(nc=3, cw=[(1,w/3),(2,w/3),(3,w/3)])
-        cmds.text(l="")
+        cmds.button(l="DRY RUN", c=self.dryRunProject)
         cmds.button(l="CREATE PROJECT", c=self.createProject)
         cmds.text(l="")
 
@@ -299,16 +291,11 @@ class ProdFolder( object ):
         dir = self.getDirFromUnicode(pth[0])
         cmds.textField(self.setPath, edit=True, tx=dir)
 
-    def createProject(self, *args):
+    def readSettings(self, *args):
         prjName = cmds.textField(self.prodName, q=True, tx=True)
         setPth = cmds.textField(self.setPath, q=True, tx=True)
         self.rootPth = os.path.join(setPth, prjName)
 
-        if os.path.exists(self.rootPth):
-            cmds.confirmDialog(t='Opps', m='The path: %s\nis NOT EMPTY or:\nthis NAME has been USED for another project\n'
-                                 'please choose another name' % self.rootPth, b='Ok')
-            sys.exit()
-
         self.shortName = cmds.textField(self.prodShort, q=True, tx=True)
 
         self.modeSetting = cmds.optionMenu(self.setMode, q=True, v=True)
@@ -318,171 +305,47 @@ class ProdFolder( object ):
         self.numOfEnv = cmds.intField(self.numEnv, q=True, v=True)
         self.numOfProps = cmds.intField(self.numProps, q=True, v=True)
 
+    def createProject(self, *args):
+        self.readSettings()
+
+        if os.path.exists(self.rootPth):
+            cmds.confirmDialog(t='Opps', m='The path: %s\nis NOT EMPTY or:\nthis NAME has been USED for another project\n'
+                                 'please choose another name' % self.rootPth, b='Ok')
+            sys.exit()
+
         # Create content by set mode
         if self.modeSetting == 'Studio Mode':
             self.prjStudioMode()
         elif self.modeSetting == 'Group Mode':
             self.prjGroupMode()
 
+    def dryRunProject(self, *args):
+        self.readSettings()
+
+        if self.modeSetting == 'Studio Mode':
+            report = self.studioModePlan().dryRun(self.rootPth)
+        else:
+            report = FolderPlan.FolderPlan(self.rootPth).dryRun()
+
+        cmds.confirmDialog(t='Dry run', m='%s folders in project, %s to create\nabout %.1f seconds' % (
+                           report['count'], report['missing'], report['estimate']), b='Ok')
+
+    def studioModePlan(self, *args):
+        # Names typed in UI, empty ones get the default name of template
+        variables = dict(short=self.shortName, shots=self.numSeq)
+        for section, num, fieldId in [('characters', self.numOfChar, 'char'), ('environment', self.numOfEnv, 'env'),
+                                      ('props', self.numOfProps, 'props')]:
+            variables[section] = [cmds.textField(fieldId + str(i+1), q=True, tx=True) or "" for i in range(num)]
+
+        return ProdTemplate.getPlan(STUDIOTEMPLATE, variables)
+
     def prjStudioMode(self, *args):
-        # Create master folder
-        os.mkdir(self.rootPth)
-        # Create content of master Folder
-        master = ['assets', 'sequences', 'deliverables', 'documents', 'editorial', 'sound', 'resources', 'RnD']
-        steps = ['publish', 'review', 'work']
-        mayaFolders = ['scenes', 'sourceimages', 'images', 'movie', 'alembic', 'reference']
-
-
-        for f in master:
-            contentMasterPth = os.path.join(self.rootPth, f)
-            os.mkdir(contentMasterPth)
-
-        # Assets content
-        assetsTasks = ['art', 'modeling', 'surfacing', 'rigging']
-        assetsSections = ['characters', 'environment', 'props']
-
-        assetsPth = os.path.join(self.rootPth, 'assets')
-        for section in assetsSections:
-            assetsSectionsPth = os.path.join(assetsPth, section)
-            os.mkdir(assetsSectionsPth)
-            if section == 'characters':
-                for i in range(self.numOfChar):
-                    charName = 'char' + str(i+1)
-                    folCharName = cmds.textField(charName, q=True, tx=True)
-                    if folCharName == "" or folCharName == None:
-                        folCharName = 'character_' + str(i+1)
-                    folCharPth = os.path.join(assetsSectionsPth, folCharName)
-                    os.mkdir(folCharPth)
-                    for task in assetsTasks:
-                        assetsTaskPth = os.path.join(folCharPth, task)
-                        os.mkdir(assetsTaskPth)
-                        for step in steps:
-                            assetsTaskStepPth = os.path.join(assetsTaskPth, step)
-                            os.mkdir(assetsTaskStepPth)
-                        assetsWorkTaskPth = os.path.join(assetsTaskPth, 'work')
-                        if task == 'art':
-                            apps = ['photoshop', 'maya']
-                        elif task == 'modeling':
-                            apps = ['zbrush', 'maya', 'mudbox', 'houdini']
-                        elif task == 'surfacing':
-                            apps = ['mari', 'maya', 'substance', 'photoshop']
-                        elif task == 'rigging':
-                            apps = ['maya']
-
-                        for app in apps:
-                            appPth = os.path.join(assetsWorkTaskPth, app)
-                            os.mkdir(appPth)
-                            if app == 'maya':
-                                for f in mayaFolders:
-                                    mayaPth = os.path.join(appPth, f)
-                                    os.mkdir(mayaPth)
-                    i+=1
-            elif section == 'environment':
-                for i in range(self.numOfEnv):
-                    envName = 'env' + str(i+1)
-                    folEnvName = cmds.textField(envName, q=True, tx=True)
-                    if folEnvName=="" or folEnvName == None:
-                        folEnvName = 'env_' + str(i+1)
-                    folEnvPth = os.path.join(assetsSectionsPth, folEnvName)
-                    os.mkdir(folEnvPth)
-                    for task in assetsTasks:
-                        assetsTaskPth = os.path.join(folEnvPth, task)
-                        os.mkdir(assetsTaskPth)
-                        for step in steps:
-                            assetsTaskStepPth = os.path.join(assetsTaskPth, step)
-                            os.mkdir(assetsTaskStepPth)
-                        assetsWorkTaskPth = os.path.join(assetsTaskPth, 'work')
-                        if task == 'art':
-                            apps = ['photoshop', 'maya']
-                        elif task == 'modeling':
-                            apps = ['zbrush', 'maya', 'mudbox', 'houdini']
-                        elif task == 'surfacing':
-                            apps = ['mari', 'maya', 'substance', 'photoshop']
-                        elif task == 'rigging':
-                            apps = ['maya']
-
-                        for app in apps:
-                            appPth = os.path.join(assetsWorkTaskPth, app)
-                            os.mkdir(appPth)
-                            if app == 'maya':
-                                for f in mayaFolders:
-                                    mayaPth = os.path.join(appPth, f)
-                                    os.mkdir(mayaPth)
-                    i+=1
-            elif section == 'props':
-                for i in range(self.numOfProps):
-                    propsName = 'props' + str(i+1)
-                    folPropsName = cmds.textField(propsName, q=True, tx=True)
-                    print type(folPropsName)
-
-                    if folPropsName == "" or folPropsName == None:
-                        folPropsName = 'props_' + str(i+1)
-
-                    folPropsPth = os.path.join(assetsSectionsPth, folPropsName)
-
-                    print folPropsPth + ' 4'
-
-                    os.mkdir(folPropsPth)
-                    for task in assetsTasks:
-                        assetsTaskPth = os.path.join(folPropsPth, task)
-                        os.mkdir(assetsTaskPth)
-                        for step in steps:
-                            assetsTaskStepPth = os.path.join(assetsTaskPth, step)
-                            os.mkdir(assetsTaskStepPth)
-                        assetsWorkTaskPth = os.path.join(assetsTaskPth, 'work')
-                        if task == 'art':
-                            apps = ['photoshop', 'maya']
-                        elif task == 'modeling':
-                            apps = ['zbrush', 'maya', 'mudbox', 'houdini']
-                        elif task == 'surfacing':
-                            apps = ['mari', 'maya', 'substance', 'photoshop']
-                        elif task == 'rigging':
-                            apps = ['maya']
-
-                        for app in apps:
-                            appPth = os.path.join(assetsWorkTaskPth, app)
-                            os.mkdir(appPth)
-                            if app == 'maya':
-                                for f in mayaFolders:
-                                    mayaPth = os.path.join(appPth, f)
-                                    os.mkdir(mayaPth)
-                    i+=1
-
-        # Sequences content
-
-        seqTask = ['anim', 'comp', 'fx', 'layout', 'lighting']
-
-        sequencesPth = os.path.join(self.rootPth, 'sequences')
-        for i in range(self.numSeq):
-            folName = self.shortName + "_" + "shot_" + str(i+1)
-            seqPth = os.path.join(sequencesPth, folName)
-            os.mkdir(seqPth)
-            for task in seqTask:
-                seqTaskPth = os.path.join(seqPth, task)
-                os.mkdir(seqTaskPth)
-                for step in steps:
-                    seqTaskStepPth = os.path.join(seqTaskPth, step)
-                    os.mkdir(seqTaskStepPth)
-                seqTaskWorkPth = os.path.join(seqTaskPth, 'work')
-                if task == 'anim':
-                    apps = ['maya', 'after effect', 'houdini']
-                elif task == 'comp':
-                    apps = ['nuke', 'after effect', 'photoshop']
-                elif task == 'fx':
-                    apps = ['maya', 'houdini']
-                elif task == 'layout':
-                    apps = ['maya']
-                elif task == 'lighting':
-                    apps = ['maya']
-
-                for app in apps:
-                    appPth = os.path.join(seqTaskWorkPth, app)
-                    os.mkdir(appPth)
-                    if app == 'maya':
-                        for f in mayaFolders:
-                            mayaPth = os.path.join(appPth, f)
-                            os.mkdir(mayaPth)
-            i+=1
+        # Work out the whole production tree first, then create it in bulk
+        plan = self.studioModePlan()
+        try:
+            plan.create(self.rootPth)
+        except (FolderPlan.FolderPlanError, OSError) as e:
+            cmds.confirmDialog(t='Folders missing', m=str(e), b='Ok')
 
     def prjGroupMode(self, *args):
         pass
@@ -0,0 +1,299 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: ProdTemplate.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Production templates. A production layout is described in a json file in Maya_tk/templates, it is compiled
+    once to the list of every folder path, and the compiled plan is cached with the hash of the template and its
+    variables as key. Folder creation, validation and UI all ask the same plan instead of building paths again.
+
+    Template file:
+        name            name of template
+        variables       default values, a number (how many) or a list of names
+        blocks          named pieces of tree which can be used several times
+        tree            the layout
+
+    In the tree:
+        null                                    nothing
+        "folder"                                a folder, {variable} is replaced by its value
+        "@block"                                content of a block
+        [ ... ]                                 several items in the same folder
+        { "folder": content, ... }              folders with their content
+        { "$each": "variable", "name": "asset_{n}", "content": ... }
+                                                one folder per name in variable, or per number 1..variable,
+                                                empty names use the pattern, {n} is the number
+
+    This module does not use maya.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, json, hashlib, logging, threading
+
+from Maya_tk.modules import FolderPlan
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+TEMPLATEDIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+TEMPLATEEXT = '.json'
+
+# Number of compiled plans kept in memory
+MAXPLANS = 32
+
+# A task of a plan is a folder which has this folder
+TASKMARKER = 'work'
+
+class TemplateError(Exception):
+    pass
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                  SUB CLASS: TEMPLATE COMPILER - TREE TO PATHS                           """
+# ----------------------------------------------------------------------------------------------------------- #
+class TemplateCompiler( object ):
+
+    def __init__(self, template, variables=None):
+
+        super(TemplateCompiler, self).__init__()
+
+        self.blocks = template.get('blocks', {})
+        self.tree = template.get('tree')
+        self.variables = dict(template.get('variables', {}))
+        if variables:
+            self.variables.update(variables)
+
+    def compile(self):
+        return tuple(self.expand(self.tree, [], self.variables))
+
+    def name(self, pattern, variables):
+        try:
+            return pattern.format(**variables)
+        except (KeyError, IndexError, ValueError) as e:
+            raise TemplateError('Can not fill "%s": %s' % (pattern, e))
+
+    def block(self, name, stack):
+        if name not in self.blocks:
+            raise TemplateError('Unknown block "@%s"' % name)
+        if name in stack:
+            raise TemplateError('Block "@%s" uses itself' % name)
+        return self.blocks[name]
+
+    def expand(self, node, stack, variables):
+        """
+        :return: list of relative paths, a folder comes before its content
+        """
+        paths = []
+        if node is None:
+            return paths
+
+        if isinstance(node, list):
+            for item in node:
+                paths += self.expand(item, stack, variables)
+            return paths
+
+        if isinstance(node, dict):
+            if '$each' in node:
+                return self.each(node, stack, variables)
+            for key in node:
+                folder = self.name(key, variables)
+                paths.append(folder)
+                paths += ['%s/%s' % (folder, p) for p in self.expand(node[key], stack, variables)]
+            return paths
+
+        if node.startswith('@'):
+            return self.expand(self.block(node[1:], stack), stack + [node[1:]], variables)
+
+        paths.append(self.name(node, variables))
+        return paths
+
+    def each(self, node, stack, variables):
+        key = node['$each']
+        if key not in variables:
+            raise TemplateError('Unknown variable "%s"' % key)
+
+        items = variables[key]
+        if isinstance(items, int):
+            items = [''] * items
+
+        paths = []
+        pattern = node.get('name', '{name}')
+        for i, item in enumerate(items):
+            itemVars = dict(variables, n=i + 1, name=item)
+            folder = item or self.name(pattern, itemVars)
+            paths.append(folder)
+            paths += ['%s/%s' % (folder, p) for p in self.expand(node.get('content'), stack, itemVars)]
+        return paths
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                 MAIN CLASS: PRODUCTION PLAN - EXPANDED TEMPLATE                         """
+# ----------------------------------------------------------------------------------------------------------- #
+class ProdPlan( object ):
+
+    def __init__(self, paths, key=None):
+
+        super(ProdPlan, self).__init__()
+
+        self.key = key
+        self._paths = tuple(paths)
+        self._children = None
+
+    def paths(self):
+        return self._paths
+
+    def count(self):
+        return len(self._paths)
+
+    def children(self, relPth=''):
+        """
+        Sub folders of a folder in the plan, used to fill UI lists without reading disk
+        """
+        if self._children is None:
+            children = {}
+            for pth in self._paths:
+                parent, name = pth.rpartition('/')[::2]
+                children.setdefault(parent, []).append(name)
+            self._children = children
+        return list(self._children.get(relPth.strip('/'), []))
+
+    def subPlan(self, relPth):
+        """
+        Part of the plan under a folder, paths stay relative to the same root
+        """
+        relPth = relPth.strip('/')
+        prefix = relPth + '/'
+        return ProdPlan([p for p in self._paths if p == relPth or p.startswith(prefix)])
+
+    def folderPlan(self, root):
+        plan = FolderPlan.FolderPlan(root)
+        for pth in self._paths:
+            plan.addPath(pth)
+        return plan
+
+    def tasks(self):
+        """
+        :return: relative paths of the task folders of the plan
+        """
+        suffix = '/' + TASKMARKER
+        return [p[:-len(suffix)] for p in self._paths if p.endswith(suffix)]
+
+    def stageDepths(self):
+        """
+        :return: dictionary {stage: number of folder levels between the stage folder and its tasks}
+        """
+        depths = {}
+        for task in self.tasks():
+            parts = task.split('/')
+            depths.setdefault(parts[0], set()).add(len(parts) - 1)
+
+        result = {}
+        for stage, found in depths.items():
+            if len(found) > 1:
+                raise TemplateError('Tasks of stage %s are at different depths %s' % (stage, sorted(found)))
+            result[stage] = found.pop()
+        return result
+
+    def taskFolders(self):
+        """
+        :return: sorted names of the folders every task of the plan has
+        """
+        folders = None
+        for task in self.tasks():
+            names = set(self.children(task))
+            folders = names if folders is None else folders & names
+        return sorted(folders or [])
+
+    def create(self, root, workers=FolderPlan.WORKERS):
+        return self.folderPlan(root).create(workers)
+
+    def dryRun(self, root, workers=FolderPlan.WORKERS):
+        return self.folderPlan(root).dryRun(workers)
+
+# ------------------------------------------------------
+# TEMPLATE FILES AND PLAN CACHE
+# ------------------------------------------------------
+_TEMPLATES = {}
+_PLANS = {}
+_PLANORDER = []
+_CACHELOCK = threading.Lock()
+
+def templatePth(name, *args):
+    if os.path.isabs(name) or name.endswith(TEMPLATEEXT):
+        return name
+    return os.path.join(TEMPLATEDIR, name + TEMPLATEEXT)
+
+def loadTemplate(name, *args):
+    """
+    Read a template file, it is read again only when the file changed
+    :param name: name of template in templates folder, or path of a template file
+    """
+    pth = templatePth(name)
+    try:
+        mtime = os.stat(pth).st_mtime
+    except OSError:
+        raise TemplateError('Can not find template %s' % pth)
+
+    with _CACHELOCK:
+        cached = _TEMPLATES.get(pth)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    with open(pth, 'r') as f:
+        try:
+            template = json.load(f)
+        except ValueError as e:
+            raise TemplateError('Template %s is not valid json: %s' % (pth, e))
+
+    with _CACHELOCK:
+        _TEMPLATES[pth] = (mtime, template)
+    return template
+
+def templateHash(template, variables=None, *args):
+    data = json.dumps([template, variables or {}], sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+def compileTemplate(template, variables=None, *args):
+    """
+    Expand a template to a plan, a template with the same content and variables is only expanded once
+    :param template: template dictionary
+    :param variables: values for variables of template
+    :return: ProdPlan
+    """
+    key = templateHash(template, variables)
+    with _CACHELOCK:
+        plan = _PLANS.get(key)
+        if plan is not None:
+            return plan
+
+    plan = ProdPlan(TemplateCompiler(template, variables).compile(), key)
+    logger.debug('Compiled template %s (%s folders)' % (template.get('name', key[:8]), plan.count()))
+
+    with _CACHELOCK:
+        _PLANS[key] = plan
+        _PLANORDER.append(key)
+        while len(_PLANORDER) > MAXPLANS:
+            _PLANS.pop(_PLANORDER.pop(0), None)
+    return plan
+
+def getPlan(name, variables=None, *args):
+    """
+    Get the plan of a template file
+    :param name: name of template in templates folder, or path of a template file
+    :param variables: values for variables of template
+    :return: ProdPlan
+    """
+    return compileTemplate(loadTemplate(name), variables)
+
+def clearCache(*args):
+    with _CACHELOCK:
+        _TEMPLATES.clear()
+        _PLANS.clear()
+        del _PLANORDER[:]
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,188 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: ProdTree.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Layout rules of a production tree, shared by the main UI and the tools which read a production outside maya.
+
+        studio mode     <prod>/assets/<section>/<asset>/<task>          <prod>/sequences/<shot>/<task>
+        group mode      <prod>/scenes/assets/<section>/<asset>/<task>   <prod>/scenes/sequences/<shot>/<task>
+
+    The stages, the depth of their tasks and the folders every task must have come from the compiled plan of the
+    production template (LAYOUTTEMPLATE), the same plan which creates the folders.
+
+    Tasks are found level by level with generators, a production is never listed in full before the first task
+    comes out. Hidden folders (.store, .versionIndex...) are skipped.
+
+    This module does not use maya.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, errno, logging
+
+from Maya_tk.modules import ProjIndex
+from Maya_tk.modules import ProdTemplate
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+# Template whose plan gives the stages, the depth of their tasks and the folders every task must have
+LAYOUTTEMPLATE = 'studioMode'
+
+# Folder which holds stages in group mode
+GROUPROOT = 'scenes'
+
+SNAPSHOT = ProjIndex.TASKDETAIL['snapShot']
+SCENEEXT = ProjIndex.SCENEEXT
+COMMENTEXT = '.comment'
+
+_LAYOUT = []
+
+def layout(*args):
+    """
+    :return: (dictionary {stage: depth of its tasks}, folders of a task) of the plan of LAYOUTTEMPLATE, it is
+             worked out the first time it is asked for
+    """
+    if not _LAYOUT:
+        plan = ProdTemplate.getPlan(LAYOUTTEMPLATE)
+        _LAYOUT.append((plan.stageDepths(), plan.taskFolders()))
+    return _LAYOUT[0]
+
+def stages(*args):
+    return layout()[0]
+
+def taskFolders(*args):
+    return list(layout()[1])
+
+def listDir(pth, *args):
+    """
+    List a folder with the type of every item, os.scandir is used when python has it so no stat is needed
+    :return: sorted list of (name, isDir), empty if folder can not be read
+    """
+    try:
+        if hasattr(os, 'scandir'):
+            items = []
+            for entry in os.scandir(pth):
+                try:
+                    items.append((entry.name, entry.is_dir()))
+                except OSError:
+                    pass
+        else:
+            items = [(name, os.path.isdir(os.path.join(pth, name))) for name in os.listdir(pth)]
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            logger.debug('Can not list %s: %s' % (pth, e))
+        return []
+    return sorted(items)
+
+def subFolders(pth, *args):
+    return [name for name, isDir in listDir(pth) if isDir and not name.startswith('.')]
+
+def walkFiles(pth, *args):
+    """
+    Walk every file under a folder
+    :return: generator of (path, size)
+    """
+    todo = [pth]
+    while todo:
+        folder = todo.pop()
+        try:
+            if hasattr(os, 'scandir'):
+                entries = [(e.path, e.is_dir(follow_symlinks=False), e) for e in os.scandir(folder)]
+            else:
+                entries = [(p, os.path.isdir(p) and not os.path.islink(p), None) for p in
+                           [os.path.join(folder, name) for name in os.listdir(folder)]]
+        except OSError as e:
+            logger.debug('Can not list %s: %s' % (folder, e))
+            continue
+
+        for filePth, isDir, entry in entries:
+            if isDir:
+                todo.append(filePth)
+                continue
+            try:
+                size = entry.stat(follow_symlinks=False).st_size if entry is not None else os.lstat(filePth).st_size
+            except OSError:
+                continue
+            yield filePth, size
+
+def mode(prodPth, *args):
+    """
+    :return: 'Group Mode' if stages are in a scenes folder, otherwise 'Studio Mode'
+    """
+    groupPth = os.path.join(prodPth, GROUPROOT)
+    if any(os.path.isdir(os.path.join(groupPth, stage)) for stage in stages()):
+        return 'Group Mode'
+    return 'Studio Mode'
+
+def stagePaths(prodPth, *args):
+    """
+    :return: list of (stage, path of stage folder) which exist in production
+    """
+    root = os.path.join(prodPth, GROUPROOT) if mode(prodPth) == 'Group Mode' else prodPth
+    return [(stage, os.path.join(root, stage)) for stage in sorted(stages()) if
+            os.path.isdir(os.path.join(root, stage))]
+
+def iterLevel(pth, depth, *args):
+    if depth == 0:
+        yield pth
+        return
+    for name in subFolders(pth):
+        for sub in iterLevel(os.path.join(pth, name), depth - 1):
+            yield sub
+
+def iterTasks(prodPth, *args):
+    """
+    Find every task folder of a production
+    :return: generator of (stage, task path)
+    """
+    depths = stages()
+    for stage, stagePth in stagePaths(prodPth):
+        for taskPth in iterLevel(stagePth, depths[stage]):
+            yield stage, taskPth
+
+def splitPath(pth, *args):
+    """
+    Split a path inside a production at its stage folder
+    :param pth: path of a folder in a production, '/' separated like the paths of main UI
+    :return: dictionary of prodPth, prodName, stage, projPth (path from production name), None if path is not in
+             a stage
+    """
+    parts = pth.replace('\\', '/').split('/')
+    depths = stages()
+    found = [i for i, part in enumerate(parts) if part in depths and i > 0]
+    if not found:
+        return None
+
+    i = found[0]
+    return dict(prodPth='/'.join(parts[:i]) + '/', prodName=parts[i - 1], stage=parts[i],
+                projPth='/'.join(parts[i - 1:]))
+
+def missingFolders(taskPth, folders=None, exists=os.path.isdir, *args):
+    """
+    :param folders: folders relative to task folder, folders of a task of the plan by default
+    :param exists: function to check a folder, main UI checks via project index
+    :return: paths of folders of a task which do not exist
+    """
+    if folders is None:
+        folders = taskFolders()
+    return [pth for pth in [os.path.join(taskPth, f) for f in folders] if not exists(pth)]
+
+def orphanSnapshots(taskPth, *args):
+    """
+    :return: paths of snapshot scenes which have no comment file
+    """
+    snapShotPth = os.path.join(taskPth, SNAPSHOT)
+    names = set(name for name, isDir in listDir(snapShotPth) if not isDir)
+    return [os.path.join(snapShotPth, name) for name in sorted(names) if name.endswith(SCENEEXT) and
+            name[:-len(SCENEEXT)] + COMMENTEXT not in names]
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
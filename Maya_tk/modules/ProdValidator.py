@@ -0,0 +1,182 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: ProdValidator.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Check a production tree outside maya, it is made to run as a nightly job:
+
+        python -m Maya_tk.modules.ProdValidator /path/to/production --workers 16 --max-size 2048 > report.json
+
+    Tasks and the folders they must have come from the plan of the production template (see ProdTree.py). Every
+    task is checked by a pool of processes:
+        missingFolder       a folder every task of the template has (work, publish, review) does not exist
+        orphanSnapshot      snapshot scene without its .comment file
+        oversized           file bigger than --max-size MB
+
+    With --prune the objects of the snapshot store (see SceneStore.py) no snapshot links to any more are removed
+    as well, each task which had some gives a prunedObjects line. Those lines are not issues for the exit code.
+
+    Results are written as they come, one json object per line (or a json array with --array), and the last
+    line is a summary. Only a few tasks are queued ahead of the workers, so memory stays flat whatever the size of
+    the production. Exit code is 1 when an issue is found.
+
+    This module does not use maya.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, sys, json, time, logging, argparse, multiprocessing
+
+from collections import deque
+
+from Maya_tk.modules import ProdTree
+from Maya_tk.modules import SceneStore
+from Maya_tk.modules import VersionRegistry
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+MAXSIZE = 2048
+# Tasks queued ahead of every worker
+BACKLOG = 4
+
+def checkTask(job, *args):
+    """
+    Check one task, runs in a worker process
+    :param job: (stage, task path, max size in bytes, folders every task must have, prune snapshot store)
+    :return: list of issues, every issue is a dictionary
+    """
+    stage, taskPth, maxSize, folders, prune = job
+    issues = []
+
+    if prune:
+        store = SceneStore.SceneStore(os.path.join(taskPth, VersionRegistry.FOLDERS['snapShot']))
+        count = store.prune()
+        if count:
+            issues.append(dict(issue='prunedObjects', stage=stage, task=taskPth, path=store.storePth, count=count))
+
+    for pth in ProdTree.missingFolders(taskPth, folders):
+        issues.append(dict(issue='missingFolder', stage=stage, task=taskPth, path=pth))
+
+    for pth in ProdTree.orphanSnapshots(taskPth):
+        issues.append(dict(issue='orphanSnapshot', stage=stage, task=taskPth, path=pth))
+
+    if maxSize:
+        for pth, size in ProdTree.walkFiles(taskPth):
+            if size > maxSize:
+                issues.append(dict(issue='oversized', stage=stage, task=taskPth, path=pth, size=size))
+
+    return issues
+
+def validate(prodPth, workers=None, maxSize=MAXSIZE, prune=False, *args):
+    """
+    Check every task of a production with a pool of processes
+    :param workers: number of processes, number of cpu if None
+    :param maxSize: size in MB above which a file is reported, 0 to skip file sizes
+    :param prune: remove the unused objects of the snapshot store of every task
+    :return: generator of (task path, issues), in the order tasks are found
+    """
+    workers = workers or multiprocessing.cpu_count()
+    maxBytes = int(maxSize * 1024 * 1024)
+    # layout of the production template, worked out once here instead of in every worker
+    folders = ProdTree.taskFolders()
+    jobs = ((stage, taskPth, maxBytes, folders, prune) for stage, taskPth in ProdTree.iterTasks(prodPth))
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        pending = deque()
+        for job in jobs:
+            pending.append((job[1], pool.apply_async(checkTask, (job,))))
+            # keep the queue short, tasks are only found as fast as they are checked
+            while len(pending) >= workers * BACKLOG:
+                taskPth, result = pending.popleft()
+                yield taskPth, result.get()
+        while pending:
+            taskPth, result = pending.popleft()
+            yield taskPth, result.get()
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                               MAIN CLASS: REPORT WRITER - STREAMED JSON                                 """
+# ----------------------------------------------------------------------------------------------------------- #
+class ReportWriter( object ):
+
+    def __init__(self, stream, array=False):
+
+        super(ReportWriter, self).__init__()
+
+        self.stream = stream
+        self.array = array
+        self.first = True
+
+    def write(self, data):
+        line = json.dumps(data, sort_keys=True)
+        if self.array:
+            line = ('[\n' if self.first else ',\n') + line
+        else:
+            line += '\n'
+        self.first = False
+        self.stream.write(line)
+
+    def close(self):
+        if self.array:
+            self.stream.write('[]\n' if self.first else '\n]\n')
+        self.stream.flush()
+
+def main(argv=None, *args):
+    parser = argparse.ArgumentParser(description='Check a production tree without maya')
+    parser.add_argument('root', help='root folder of production')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: number of cpu)')
+    parser.add_argument('--max-size', type=float, default=MAXSIZE, help='report files bigger than this many MB, '
+                                                                        '0 to skip (default: %s)' % MAXSIZE)
+    parser.add_argument('--output', default=None, help='write report to this file instead of stdout')
+    parser.add_argument('--array', action='store_true', help='write a json array instead of one object per line')
+    parser.add_argument('--prune', action='store_true', help='remove objects of snapshot stores no snapshot uses')
+    options = parser.parse_args(argv)
+
+    if not os.path.isdir(options.root):
+        parser.error('%s is not a folder' % options.root)
+
+    root = os.path.abspath(options.root)
+    stream = open(options.output, 'w') if options.output else sys.stdout
+    writer = ReportWriter(stream, options.array)
+    summary = dict(root=root, mode=ProdTree.mode(root), tasks=0, issues={}, pruned=0)
+    start = time.time()
+
+    try:
+        for taskPth, issues in validate(root, options.workers, options.max_size, options.prune):
+            summary['tasks'] += 1
+            for issue in issues:
+                if issue['issue'] == 'prunedObjects':
+                    summary['pruned'] += issue['count']
+                    writer.write(issue)
+                    continue
+                summary['issues'][issue['issue']] = summary['issues'].get(issue['issue'], 0) + 1
+                writer.write(issue)
+        summary['seconds'] = round(time.time() - start, 3)
+        writer.write(dict(summary=summary))
+        writer.close()
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    logger.info('Checked %s tasks in %.1f seconds, %s issues' % (summary['tasks'], summary['seconds'],
+                                                                 sum(summary['issues'].values())))
+    return 1 if summary['issues'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,177 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: ProjIndex.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    In memory index of a production tree. Every folder is listed once and kept with its mtime, it is only listed
+    again when the mtime of that folder changes. The main UI asks this index for assets, sections, tasks, work,
+    publish, review and snapshot listings instead of walking the production share on every click.
+
+    This module does not use maya, so it can be used by any tool which needs to read the production tree.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, time, logging, threading
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+# Sub folders of a task which are shown in details section of main UI
+TASKDETAIL = dict( work='work/maya',
+                   publish='publish/maya',
+                   review='review',
+                   snapShot='work/maya/scenes/snapShot', )
+
+SCENEEXT = '.ma'
+
+# Seconds a listing is trusted without checking mtime of folder again
+TTL = 1.0
+
+# A listing read less than this many seconds after the folder was modified may miss changes done in the same
+# mtime tick (network share has coarse timestamp), it will be read again on next query.
+RACY = 2.0
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                             MAIN CLASS: PROJECT INDEX - CACHED PRODUCTION TREE                          """
+# ----------------------------------------------------------------------------------------------------------- #
+class ProjIndex( object ):
+
+    def __init__(self, prodPth, ttl=TTL):
+
+        super(ProjIndex, self).__init__()
+
+        self.prodPth = prodPth
+        self.ttl = ttl
+        # normalized folder path: [mtime, last check time, racy, {name: isDir}]
+        self._cache = {}
+        self._lock = threading.RLock()
+
+    def key(self, pth):
+        return os.path.normcase(os.path.normpath(pth))
+
+    def entries(self, pth):
+        """
+        Get content of a folder from cache, only list the folder again when its mtime changed
+        :param pth: path of folder
+        :return: dictionary {name: isDir}, empty if folder does not exist
+        """
+        key = self.key(pth)
+        now = time.time()
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and not cached[2] and now - cached[1] < self.ttl:
+                return cached[3]
+
+            try:
+                mtime = os.stat(key).st_mtime
+            except OSError:
+                self._cache.pop(key, None)
+                return {}
+
+            if cached is not None and not cached[2] and cached[0] == mtime:
+                cached[1] = now
+                return cached[3]
+
+            content = {}
+            for name in os.listdir(key):
+                content[name] = os.path.isdir(os.path.join(key, name))
+
+            self._cache[key] = [mtime, now, (now - mtime) < RACY, content]
+            logger.debug('Indexed %s (%s items)' % (pth, len(content)))
+
+            return content
+
+    def names(self, pth):
+        return sorted(self.entries(pth))
+
+    def folders(self, pth):
+        content = self.entries(pth)
+        return sorted([f for f in content if content[f]])
+
+    def files(self, pth, ext=None, strip=False):
+        """
+        Get files in a folder
+        :param pth: path of folder
+        :param ext: only return files end with this extension
+        :param strip: remove extension from file name
+        :return: sorted list of file names
+        """
+        content = self.entries(pth)
+        files = [f for f in content if not content[f]]
+
+        if ext is not None:
+            files = [f for f in files if f.endswith(ext)]
+            if strip:
+                files = [f[:-len(ext)] for f in files]
+
+        return sorted(files)
+
+    def exists(self, pth):
+        """
+        Check a path via the listing of its parent folder, so it does not cost an extra stat on the share
+        """
+        pth = os.path.normpath(pth)
+        parent, name = os.path.split(pth)
+        if not name:
+            return os.path.exists(pth)
+        return name in self.entries(parent)
+
+    def taskDetail(self, taskPth):
+        """
+        Get snapShot, review and publish listing of a task
+        :param taskPth: path of task folder
+        :return: dictionary of lists
+        """
+        detail = {}
+        detail['snapShot'] = self.files(os.path.join(taskPth, TASKDETAIL['snapShot']), SCENEEXT, True)
+        detail['review'] = self.names(os.path.join(taskPth, TASKDETAIL['review']))
+        detail['publish'] = self.files(os.path.join(taskPth, TASKDETAIL['publish']), SCENEEXT, True)
+        return detail
+
+    def invalidate(self, pth=None):
+        """
+        Drop cached listing of a folder and everything under it, drop everything if no path is given
+        """
+        with self._lock:
+            if pth is None:
+                self._cache.clear()
+                return
+
+            key = self.key(pth)
+            prefix = key.rstrip(os.sep) + os.sep
+            for k in [k for k in self._cache if k == key or k.startswith(prefix)]:
+                del self._cache[k]
+
+# ------------------------------------------------------
+# ONE INDEX PER PRODUCTION
+# ------------------------------------------------------
+_INDEXES = {}
+_INDEXLOCK = threading.Lock()
+
+def getIndex(prodPth, *args):
+    """
+    Get the index of a production, it is created the first time a production is asked for.
+    :param prodPth: root path of production
+    :return: ProjIndex
+    """
+    key = os.path.normcase(os.path.normpath(prodPth))
+    with _INDEXLOCK:
+        if key not in _INDEXES:
+            logger.info('Create project index for %s' % prodPth)
+            _INDEXES[key] = ProjIndex(prodPth)
+        return _INDEXES[key]
+
+def clearIndex(*args):
+    with _INDEXLOCK:
+        _INDEXES.clear()
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,347 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: ProjWatcher.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Background watcher for folders of a production. It finds out which files were added or removed in the
+    watched folders and sends only those changes to a callback, so the UI can patch its lists instead of scanning
+    the production again.
+
+    On Linux it uses inotify (via ctypes, no extra package), on other os or on network mounts where inotify does
+    not see changes made by other machines it falls back to polling the mtime of the watched folders.
+
+    Callbacks are called from the watcher thread, maya UI must be updated via maya.utils.executeDeferred.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, sys, time, errno, select, struct, logging, threading
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+# Seconds between two checks of polling watcher
+INTERVAL = 2.0
+
+# Folder modified less than this many seconds before a check is listed again on next check, network share has
+# coarse timestamp so two changes in the same tick have the same mtime
+RACY = 2.0
+
+# File systems where changes made by another machine do not come through inotify
+NETFS = [ 'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'afs', '9p', 'fuse.sshfs', 'fuse.glusterfs', 'ceph' ]
+
+# inotify flags, see <sys/inotify.h>
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+EVENTHEADER = struct.Struct('iIII')
+
+def listNames(pth):
+    try:
+        return set(os.listdir(pth))
+    except OSError:
+        return set()
+
+def changeSet(old, new):
+    """
+    Compare two listings of a folder
+    :param old: set of names
+    :param new: set of names
+    :return: sorted added names, sorted removed names
+    """
+    return sorted(new - old), sorted(old - new)
+
+def fsType(pth):
+    """
+    Get the file system type of the mount which contains the path (Linux only)
+    """
+    pth = os.path.realpath(pth)
+    fstype = None
+    mountPth = ''
+    try:
+        with open('/proc/mounts', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mnt = parts[1].replace('\\040', ' ')
+                if (pth == mnt or pth.startswith(mnt.rstrip('/') + '/')) and len(mnt) >= len(mountPth):
+                    mountPth = mnt
+                    fstype = parts[2]
+    except IOError:
+        pass
+    return fstype
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                             SUB CLASS: BASE WATCHER - KEEP LISTING OF WATCHED FOLDERS                   """
+# ----------------------------------------------------------------------------------------------------------- #
+class Watcher( threading.Thread ):
+
+    mode = None
+
+    def __init__(self, callback=None):
+
+        super(Watcher, self).__init__()
+
+        self.daemon = True
+        self.callback = callback
+        self._listing = {}
+        self._lock = threading.RLock()
+        self._stopEvent = threading.Event()
+
+    def setCallback(self, callback):
+        self.callback = callback
+
+    def watch(self, paths):
+        """
+        Replace the set of watched folders
+        :param paths: list of folder paths
+        """
+        paths = set([os.path.normpath(p) for p in paths])
+        with self._lock:
+            for pth in [p for p in self._listing if p not in paths]:
+                self.removeWatch(pth)
+                del self._listing[pth]
+            for pth in [p for p in paths if p not in self._listing]:
+                self._listing[pth] = listNames(pth)
+                self.addWatch(pth)
+
+    def watched(self):
+        with self._lock:
+            return sorted(self._listing)
+
+    def addWatch(self, pth):
+        pass
+
+    def removeWatch(self, pth):
+        pass
+
+    def rescan(self, pth):
+        """
+        List a watched folder again and send what is different from the last listing
+        """
+        with self._lock:
+            if pth not in self._listing:
+                return
+            new = listNames(pth)
+            added, removed = changeSet(self._listing[pth], new)
+            self._listing[pth] = new
+        self.emit(pth, added, removed)
+
+    def emit(self, pth, added, removed):
+        if not added and not removed:
+            return
+        callback = self.callback
+        if callback is None:
+            return
+        try:
+            callback(pth, added, removed)
+        except Exception as e:
+            logger.error('Watcher callback failed for %s: %s' % (pth, e))
+
+    def stop(self):
+        self._stopEvent.set()
+
+    def stopped(self):
+        return self._stopEvent.is_set()
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                              SUB CLASS: POLL WATCHER - WORK ON EVERY FILE SYSTEM                        """
+# ----------------------------------------------------------------------------------------------------------- #
+class PollWatcher( Watcher ):
+
+    mode = 'poll'
+
+    def __init__(self, callback=None, interval=INTERVAL):
+
+        super(PollWatcher, self).__init__(callback)
+
+        self.interval = interval
+        self._mtime = {}
+
+    def addWatch(self, pth):
+        self._mtime[pth] = (self.mtime(pth), time.time())
+
+    def removeWatch(self, pth):
+        self._mtime.pop(pth, None)
+
+    def mtime(self, pth):
+        try:
+            return os.stat(pth).st_mtime
+        except OSError:
+            return None
+
+    def run(self):
+        while not self._stopEvent.wait(self.interval):
+            for pth in self.watched():
+                mtime = self.mtime(pth)
+                now = time.time()
+                with self._lock:
+                    if pth not in self._mtime:
+                        continue
+                    lastMtime, lastCheck = self._mtime[pth]
+                    self._mtime[pth] = (mtime, now)
+                    if lastMtime == mtime and (mtime is None or lastCheck - mtime >= RACY):
+                        continue
+                self.rescan(pth)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                 SUB CLASS: INOTIFY WATCHER - LINUX ONLY                                 """
+# ----------------------------------------------------------------------------------------------------------- #
+class InotifyWatcher( Watcher ):
+
+    mode = 'inotify'
+
+    def __init__(self, callback=None, timeout=0.5):
+
+        super(InotifyWatcher, self).__init__(callback)
+
+        import ctypes, ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init()
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+
+        self.timeout = timeout
+        self._wds = {}
+        self._pths = {}
+
+    def addWatch(self, pth):
+        name = pth.encode(sys.getfilesystemencoding()) if not isinstance(pth, bytes) else pth
+        wd = self._libc.inotify_add_watch(self._fd, name, IN_MASK)
+        if wd < 0:
+            logger.debug('Can not watch %s' % pth)
+            return
+        self._wds[wd] = pth
+        self._pths[pth] = wd
+
+    def removeWatch(self, pth):
+        wd = self._pths.pop(pth, None)
+        if wd is not None:
+            self._wds.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def run(self):
+        try:
+            while not self.stopped():
+                try:
+                    ready, _, _ = select.select([self._fd], [], [], self.timeout)
+                except (OSError, select.error) as e:
+                    if e.args[0] == errno.EINTR:
+                        continue
+                    raise
+                if ready:
+                    self.readEvents()
+        finally:
+            os.close(self._fd)
+
+    def readEvents(self):
+        data = os.read(self._fd, 64 * 1024)
+        touched = set()
+        overflow = False
+        offset = 0
+
+        with self._lock:
+            while offset + EVENTHEADER.size <= len(data):
+                wd, mask, cookie, length = EVENTHEADER.unpack_from(data, offset)
+                offset += EVENTHEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif wd in self._wds:
+                    touched.add(self._wds[wd])
+
+        if overflow:
+            # events were lost, every watched folder has to be compared with disk
+            touched = set(self.watched())
+
+        # only the folders inotify reported are listed again, one batch of events gives one change set per folder
+        for pth in sorted(touched):
+            self.rescan(pth)
+
+# ------------------------------------------------------
+# ONE WATCHER PER PRODUCTION
+# ------------------------------------------------------
+_WATCHERS = {}
+_WATCHERLOCK = threading.Lock()
+
+def useInotify(prodPth, *args):
+    if not sys.platform.startswith('linux'):
+        return False
+    fstype = fsType(prodPth)
+    if fstype is None or fstype in NETFS:
+        logger.info('%s is on %s, use polling watcher' % (prodPth, fstype))
+        return False
+    return True
+
+def createWatcher(prodPth, callback=None, mode=None, *args):
+    """
+    Create a watcher, use inotify when it can see every change, otherwise polling
+    :param prodPth: root path of production, used to find out file system type
+    :param callback: function(pth, added, removed)
+    :param mode: 'inotify' or 'poll' to force the backend
+    :return: started watcher
+    """
+    watcher = None
+    if mode == 'inotify' or (mode is None and useInotify(prodPth)):
+        try:
+            watcher = InotifyWatcher(callback)
+        except (OSError, AttributeError) as e:
+            logger.info('inotify is not available (%s), use polling watcher' % e)
+
+    if watcher is None:
+        watcher = PollWatcher(callback)
+
+    watcher.start()
+    return watcher
+
+def getWatcher(prodPth, callback=None, *args):
+    """
+    Get the running watcher of a production, it is created the first time a production is asked for.
+    """
+    key = os.path.normcase(os.path.normpath(prodPth))
+    with _WATCHERLOCK:
+        watcher = _WATCHERS.get(key)
+        if watcher is None or not watcher.is_alive():
+            watcher = createWatcher(prodPth, callback)
+            logger.info('Watching %s with %s watcher' % (prodPth, watcher.mode))
+            _WATCHERS[key] = watcher
+        elif callback is not None:
+            watcher.setCallback(callback)
+        return watcher
+
+def release(prodPth, callback=None, *args):
+    """
+    Stop the watcher of a production, only if its callback is still the one given: a window which is closed
+    stops its watcher unless a window made again took it over.
+    """
+    key = os.path.normcase(os.path.normpath(prodPth))
+    with _WATCHERLOCK:
+        watcher = _WATCHERS.get(key)
+        if watcher is None or (callback is not None and watcher.callback != callback):
+            return
+        watcher.stop()
+        del _WATCHERS[key]
+
+def stopAll(*args):
+    with _WATCHERLOCK:
+        for key in _WATCHERS:
+            _WATCHERS[key].stop()
+        _WATCHERS.clear()
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -8,6 +8,9 @@
 from maya import cmds
 import os, sys, json, unicodedata, logging
 
+from Maya_tk.modules import FolderPlan
+from Maya_tk.modules import ProdTemplate
+
 # -------------------------------------------------------------------------------------------------------------
 # MAKE MAYA UNDERSTAND QT UI AS MAYA WINDOW,  FIX VERSION CONVENTION
 # -------------------------------------------------------------------------------------------------------------
@@ -157,19 +160,6 @@ class projectManager( object ):
         curProjName = cmds.textField("prjFullName", text = True, query = True)
         #get current project path:
         curProjPath = cmds.textField('projectPth', query=True, text=True)
-        stage_Ls = ['assets', 'deliverables', 'documents', 'editorial', 'reference', 'RnD', 'sequences', 'resources']
-        assets_Ls = ['character', 'enviroment', 'props']
-        task_Ls = ['art', 'modeling', 'rigging', 'surfacing', 'lighting', 'FX', 'anim', 'comp', 'layout']
-        documents_Ls = ['template', 'moodboard', 'schedule', 'script', 'sound', 'storyboard', 'title', 'tools']
-        editorial_Ls = ['animatic', 'edit', 'poster']
-        resources_Ls = ['lighting', 'camera rig']
-        art_task = ['pts & illus', 'maya', 'zbrush', 'reference']
-        modeling_task = ['zbrush', 'maya', 'mudbox', 'houdini']
-        rigging_task = ['maya']
-        surfacing_task = ['maya', 'mari', 'substance', 'photoshop']
-        shotTask_apps = ['maya', 'houdini', 'nuke', 'AE']
-        work_Ls = ['publish', 'review', 'work']
-        
         shots = cmds.intField('numOfShots', v=True, query=True)
         chars = cmds.intField('numOfChars', v=True, query=True)
         shortName = cmds.textField('prjShortName', text=True, query=True)
@@ -201,189 +191,14 @@ class projectManager( object ):
             props_Ls.append(getPropName)
 
         p = curProjPath + "/" +curProjName
-        
-        #master folder (name of project)
-        cmds.sysFile(curProjPath + "/" + curProjName, md=True)
-        
-        #folder for stages of product
-        i = 0
-        for i in range(len(stage_Ls)):
-            cmds.sysFile(p + "/" + stage_Ls[i], md=True)
-            i = i + 1
-        
-        #folder structure inside stages folder:
-        path = p + "/" + stage_Ls[0]
-        i = 0
-        for i in range(len(assets_Ls)):
-            cmds.sysFile(path + "/" + assets_Ls[i], md=True)
-            i = i + 1
-        
-        #character folder
-        path = path + "/" + assets_Ls[0]
-        i = 0
-        for i in range(len(charName_Ls)):
-            cmds.sysFile(path + "/" + charName_Ls[i], md=True)
-            path1 = path + "/" + charName_Ls[i]
-            item = 0
-            for item in range(len(task_Ls[:4])):
-                cmds.sysFile(path1 + "/" + task_Ls[item], md=True)
-                path2 = path1 + "/" + task_Ls[item]
-                obj = 0
-                for obj in range(len(work_Ls)):
-                    cmds.sysFile(path2 + "/" + work_Ls[obj], md=True)
-                    obj = obj + 1
-                item = item + 1
-            path3 = path1 + "/" + task_Ls[0] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(art_task)):
-                cmds.sysFile(path3 + "/" + art_task[a], md=True)
-                a = a + 1
-            path3 = path1 + "/" + task_Ls[1] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(modeling_task)):
-                cmds.sysFile(path3 + "/" + modeling_task[a], md=True)
-                a = a + 1
-            path3 = path1 + "/" + task_Ls[2] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(rigging_task)):
-                cmds.sysFile(path3 + "/" + rigging_task[a], md=True)
-                a = a + 1
-            path3 = path1 + "/" + task_Ls[3] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(surfacing_task)):
-                cmds.sysFile(path3 + "/" + surfacing_task[a], md=True)
-                a = a + 1
-            i = i + 1
-        
-        #environment folder
-        path = path = p + "/" + stage_Ls[0] + "/" + assets_Ls[1]
-        i = 0
-        for i in range(len(envObj_Ls)):
-            cmds.sysFile(path + "/" + envObj_Ls[i], md=True)
-            path1 = path + "/" + envObj_Ls[i]
-            item = 0
-            for item in range(len(task_Ls[:4])):
-                cmds.sysFile(path1 + "/" + task_Ls[item], md=True)
-                path2 = path1 + "/" + task_Ls[item]
-                obj = 0
-                for obj in range(len(work_Ls)):
-                    cmds.sysFile(path2 + "/" + work_Ls[obj], md=True)
-                    obj = obj + 1
-                item = item + 1
-            path3 = path1 + "/" + task_Ls[0] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(art_task)):
-                cmds.sysFile(path3 + "/" + art_task[a], md=True)
-                a = a + 1
-            path3 = path1 + "/" + task_Ls[1] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(modeling_task)):
-                cmds.sysFile(path3 + "/" + modeling_task[a], md=True)
-                a = a + 1
-            path3 = path1 + "/" + task_Ls[2] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(rigging_task)):
-                cmds.sysFile(path3 + "/" + rigging_task[a], md=True)
-                a = a + 1
-            path3 = path1 + "/" + task_Ls[3] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(surfacing_task)):
-                cmds.sysFile(path3 + "/" + surfacing_task[a], md=True)
-                a = a + 1        
-            i = i + 1
-
-        #props folder
-        path = p + "/" + stage_Ls[0] + "/" + assets_Ls[2]
-        i = 0
-        for i in range(len(props_Ls)):
-            cmds.sysFile(path + "/" + props_Ls[i], md=True)
-            path1 = path + "/" + props_Ls[i]
-            item = 0
-            for item in range(len(task_Ls[:4])):
-                cmds.sysFile(path1 + "/" + task_Ls[item], md=True)
-                path2 = path1 + "/" + task_Ls[item]
-                obj = 0
-                for obj in range(len(work_Ls)):
-                    cmds.sysFile(path2 + "/" + work_Ls[obj], md=True)
-                    obj = obj + 1
-                item = item + 1
-            path3 = path1 + "/" + task_Ls[0] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(art_task)):
-                cmds.sysFile(path3 + "/" + art_task[a], md=True)
-                a = a + 1
-            path3 = path1 + "/" + task_Ls[1] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(modeling_task)):
-                cmds.sysFile(path3 + "/" + modeling_task[a], md=True)
-                a = a + 1
-            path3 = path1 + "/" + task_Ls[2] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(rigging_task)):
-                cmds.sysFile(path3 + "/" + rigging_task[a], md=True)
-                a = a + 1
-            path3 = path1 + "/" + task_Ls[3] + "/" + work_Ls[2]
-            a = 0
-            for a in range(len(surfacing_task)):
-                cmds.sysFile(path3 + "/" + surfacing_task[a], md=True)
-                a = a + 1        
-            i = i + 1
-
-        #document folder:
-        path = p + "/" + stage_Ls[2]
-        i = 0
-        for i in range(len(documents_Ls)):
-            cmds.sysFile(path + "/" + documents_Ls[i], md=True)
-            i = i + 1
-            
-        #editorial folder:
-        path = p + "/" + stage_Ls[3]
-        i = 0
-        for i in range(len(editorial_Ls)):
-            cmds.sysFile(path + "/" + editorial_Ls[i], md=True)
-            i = i + 1
-        
-        #sequences folder:
-        sequence_Ls = []
-        i = 0
-        
-        for i in range(int(shots)):
-            shotNum = i + 1
-            if shotNum <= 9:
-                shotName = shortName + "_" + "0" + str(shotNum)
-                sequence_Ls.append(shotName)
-            if shotNum > 9:
-                shotName = shortName + "_" + str(shotNum)
-                sequence_Ls.append(shotName)
-            i = i + 1
-        sequence_task = task_Ls[4:]
-        path = p + "/" + stage_Ls[6]
-        i = 0
-        for i in range(len(sequence_Ls)):
-            cmds.sysFile(path + "/" + sequence_Ls[i], md=True)
-            nextPth = path + "/" + sequence_Ls[i]
-            item = 0
-            for item in range(len(sequence_task)):
-                cmds.sysFile(nextPth + "/" + sequence_task[item], md=True)
-                next_Pth = nextPth + "/" + sequence_task[item]
-                a = 0
-                for obj in range(len(work_Ls)):
-                    cmds.sysFile(next_Pth + "/" + work_Ls[a], md=True)
-                    a = a + 1
-                Pth = next_Pth + "/" + work_Ls[2]
-                a = 0
-                for a in range(len(shotTask_apps)):
-                    cmds.sysFile(Pth + "/" + shotTask_apps[a], md=True)
-                    a = a + 1
-                item = item + 1
-            i = i + 1
 
-        #resources folder
-        path = p + "/" + stage_Ls[7]
-        i = 0
-        for i in range(len(resources_Ls)):
-            cmds.sysFile(path + "/" + resources_Ls[i], md=True)
-            i = i + 1
+        #whole project tree is worked out first from template, then created in bulk
+        plan = ProdTemplate.getPlan('projectManager', dict(characters=charName_Ls, environment=envObj_Ls,
+                                                           props=props_Ls, shots=int(shots), short=shortName))
+        try:
+            plan.create(p)
+        except (FolderPlan.FolderPlanError, OSError) as e:
+            cmds.confirmDialog(t='Folders missing', m=str(e), b='Ok')
 
     def setProj(self, *args):
         import maya.mel as mel
@@ -0,0 +1,280 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: PublishTransaction.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Publish transaction of a task on a shared server.
+
+        - An advisory lock per task (a lock file created with O_EXCL, which works on local disk, SMB and NFS) so
+          two artists publishing the same task never pick the same version number.
+        - Version numbers are allocated under the lock from the version registry.
+        - Every file is streamed to a temp file in the target folder and renamed into place, a reader never sees
+          half of a file.
+        - Metadata is written last, so a .comment file means the publish is complete.
+        - If anything fails, files written by the transaction are removed and the lock is released.
+
+    Publishes of different tasks do not share a lock, so they never wait for each other.
+
+    This module does not use maya.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, json, time, uuid, errno, shutil, socket, getpass, logging, threading
+
+from Maya_tk.modules import VersionRegistry
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+LOCKNAME = '.publish.lock'
+# Seconds to wait for another publish of the same task, a publish from maya UI does not wait (timeout 0): it
+# would block maya main thread
+LOCKTIMEOUT = 120.0
+# A lock which has not been touched for this many seconds belongs to a publish which died
+LOCKSTALE = 600.0
+LOCKRETRY = 0.2
+
+CHUNKSIZE = 4 * 1024 * 1024
+
+class LockTimeout(Exception):
+    pass
+
+def tempPth(pth, *args):
+    folder, name = os.path.split(pth)
+    return os.path.join(folder, '.%s.%s.%s.tmp' % (name, os.getpid(), threading.current_thread().ident))
+
+def removeFile(pth, *args):
+    try:
+        os.remove(pth)
+    except OSError:
+        pass
+
+def streamCopy(src, dst, progress=None, *args):
+    """
+    Copy a file to a temp file beside the target then rename it into place
+    :param progress: function called after every chunk, used to keep the lock alive on big files
+    """
+    tmp = tempPth(dst)
+    try:
+        with open(src, 'rb') as fsrc:
+            with open(tmp, 'wb') as fdst:
+                while True:
+                    buf = fsrc.read(CHUNKSIZE)
+                    if not buf:
+                        break
+                    fdst.write(buf)
+                    if progress is not None:
+                        progress()
+                fdst.flush()
+                os.fsync(fdst.fileno())
+        shutil.copystat(src, tmp)
+        VersionRegistry.replaceFile(tmp, dst)
+    except Exception:
+        removeFile(tmp)
+        raise
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                   SUB CLASS: TASK LOCK - ADVISORY LOCK FILE                             """
+# ----------------------------------------------------------------------------------------------------------- #
+class TaskLock( object ):
+
+    def __init__(self, taskPth, timeout=LOCKTIMEOUT, stale=LOCKSTALE):
+
+        super(TaskLock, self).__init__()
+
+        self.lockPth = os.path.join(taskPth, LOCKNAME)
+        self.timeout = timeout
+        self.stale = stale
+        self.locked = False
+        self._lastTouch = 0
+
+    def owner(self, pth=None):
+        try:
+            with open(pth or self.lockPth, 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def acquire(self):
+        start = time.time()
+        info = dict(user=getpass.getuser(), host=socket.gethostname(), pid=os.getpid(), time=start)
+
+        while True:
+            try:
+                fd = os.open(self.lockPth, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            else:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(info, f)
+                self.locked = True
+                self._lastTouch = time.time()
+                return
+
+            if self.breakStale():
+                continue
+
+            if time.time() - start >= self.timeout:
+                owner = self.owner()
+                raise LockTimeout('Task is being published by %s on %s' % (owner.get('user', 'someone'),
+                                                                           owner.get('host', 'another machine')))
+            time.sleep(LOCKRETRY)
+
+    def breakStale(self):
+        """
+        Remove the lock of a publish which died
+        :return: True if the lock was removed
+        """
+        try:
+            age = time.time() - os.stat(self.lockPth).st_mtime
+        except OSError:
+            return False
+
+        if age < self.stale:
+            return False
+
+        # rename to a name no other waiting publish uses, then check the lock we got is the stale one: another
+        # publish may have broken it first and taken a new lock in between
+        owner = self.owner()
+        stalePth = '%s.%s.stale' % (self.lockPth, uuid.uuid4().hex)
+        try:
+            os.rename(self.lockPth, stalePth)
+        except OSError:
+            return False
+
+        if self.owner(stalePth) != owner:
+            self.restore(stalePth)
+            return False
+
+        logger.info('Removed stale publish lock %s (%s seconds old)' % (self.lockPth, int(age)))
+        removeFile(stalePth)
+        return True
+
+    def restore(self, stalePth):
+        """
+        Give back a live lock which was moved away by mistake, without replacing a lock taken since
+        """
+        try:
+            if hasattr(os, 'link'):
+                os.link(stalePth, self.lockPth)
+            elif not os.path.exists(self.lockPth):
+                os.rename(stalePth, self.lockPth)
+                return
+        except OSError as e:
+            logger.error('Can not give back publish lock %s: %s' % (self.lockPth, e))
+        removeFile(stalePth)
+
+    def touch(self):
+        """
+        Tell other publishes this lock is still alive, called while big files are copied
+        """
+        now = time.time()
+        if not self.locked or now - self._lastTouch < self.stale / 10.0:
+            return
+        try:
+            os.utime(self.lockPth, None)
+        except OSError:
+            pass
+        self._lastTouch = now
+
+    def release(self):
+        if self.locked:
+            removeFile(self.lockPth)
+            self.locked = False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        self.release()
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                              MAIN CLASS: PUBLISH TRANSACTION - ALL OR NOTHING                           """
+# ----------------------------------------------------------------------------------------------------------- #
+class PublishTransaction( object ):
+
+    def __init__(self, registry, timeout=LOCKTIMEOUT):
+
+        super(PublishTransaction, self).__init__()
+
+        self.registry = registry
+        self.lock = TaskLock(registry.taskPth, timeout)
+        # functions to undo what has been done if the transaction fails
+        self._undo = []
+        self._records = []
+
+    def __enter__(self):
+        self.lock.acquire()
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        try:
+            if excType is None:
+                for kind, pth in self._records:
+                    self.registry.record(kind, pth)
+            else:
+                logger.error('Publish failed, roll back: %s' % excValue)
+                self.rollback()
+        finally:
+            self.lock.release()
+
+    def allocate(self, base, version=None):
+        """
+        Get the next free publish version of a base name, must be called inside the transaction
+        :param base: base name of file
+        :param version: version wanted, used when it is free
+        :return: version number
+        """
+        version = max(self.registry.maxVersion(base, 'publish') + 1, version or 1)
+        while os.path.exists(os.path.join(self.registry.folder('publish'), VersionRegistry.fileName(base, version))):
+            version += 1
+        return version
+
+    def copy(self, src, dst, kind=None, store=None, share=True):
+        """
+        Copy a file into place, it never replaces a file which is already there
+        :param kind: 'scenes', 'snapShot' or 'publish' to add the file to version registry when publish is done
+        :param store: SceneStore to link the file from instead of writing a full copy
+        :param share: False for a file which is saved over in place, the store clones or copies it
+        """
+        if os.path.exists(dst):
+            raise IOError(errno.EEXIST, 'Publish will not replace an existing file', dst)
+
+        if store is not None:
+            store.put(src, dst, self.lock.touch, share)
+            # the object of the file goes too when nothing else links to it
+            self._undo.append(lambda: store.remove(dst))
+        else:
+            streamCopy(src, dst, self.lock.touch)
+            self._undo.append(lambda: removeFile(dst))
+        if kind is not None:
+            self._records.append((kind, dst))
+
+    def move(self, src, dst):
+        VersionRegistry.replaceFile(src, dst)
+        self._undo.append(lambda: VersionRegistry.replaceFile(dst, src))
+
+    def writeJson(self, pth, data):
+        VersionRegistry.writeJson(pth, data)
+        self._undo.append(lambda: removeFile(pth))
+
+    def rollback(self):
+        while self._undo:
+            undo = self._undo.pop()
+            try:
+                undo()
+            except Exception as e:
+                logger.error('Can not roll back publish step: %s' % e)
+        self._records = []
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
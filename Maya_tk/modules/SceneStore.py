@@ -0,0 +1,322 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: SceneStore.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Storage backend for snapshot and publish copies of scene files.
+
+    On a volume which takes hard links, every snapshot is stored once by content in a hidden object store beside
+    the snapshots, and the snapshot file is a hard link to that object. A snapshot which is the same as one already
+    stored costs no write at all. The store checks once whether the volume takes hard links, on other volumes, and
+    for files which are not shared (the publish file maya saves over), the file is placed straight at its path with
+    the cheapest way the file system supports:
+
+        reflink     copy on write clone (btrfs, xfs, APFS), no data is written
+        copy        chunked streaming copy
+
+    Objects are read only, and so are the snapshots linked to them as they share one inode: a snapshot can not be
+    changed in place, which would change every snapshot of the same content. Files are only ever written to a temp
+    file which is renamed into place.
+
+    An object whose snapshot is removed by remove() goes with it. Objects left by other ways are removed by
+    prune(), a maintenance step run by ProdValidator --prune as it walks the whole store.
+
+    This module does not use maya.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, sys, stat, time, hashlib, logging, threading
+
+from Maya_tk.modules import VersionRegistry
+from Maya_tk.modules import PublishTransaction
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+STORENAME = '.store'
+
+CHUNKSIZE = PublishTransaction.CHUNKSIZE
+
+# ioctl to clone a file on Linux, see <linux/fs.h>
+FICLONE = 0x40049409
+
+READONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+# an object younger than this may be placed by another publish which did not link it yet, prune() keeps it
+PRUNEAGE = 3600.0
+
+def hashFile(pth, progress=None, *args):
+    sha = hashlib.sha1()
+    with open(pth, 'rb') as f:
+        while True:
+            buf = f.read(CHUNKSIZE)
+            if not buf:
+                break
+            sha.update(buf)
+            if progress is not None:
+                progress()
+    return sha.hexdigest()
+
+def reflink(src, dst, *args):
+    """
+    Clone a file with copy on write
+    :return: True if file system supports it and the clone is made
+    """
+    if sys.platform.startswith('linux'):
+        import fcntl
+        with open(src, 'rb') as fsrc:
+            with open(dst, 'wb') as fdst:
+                try:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                    return True
+                except (IOError, OSError):
+                    pass
+        PublishTransaction.removeFile(dst)
+        return False
+
+    if sys.platform == 'darwin':
+        import ctypes, ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'clonefile'):
+            return False
+        encoding = sys.getfilesystemencoding()
+        return libc.clonefile(src.encode(encoding), dst.encode(encoding), 0) == 0
+
+    return False
+
+def hardlink(src, dst, *args):
+    if hasattr(os, 'link'):
+        try:
+            os.link(src, dst)
+            return True
+        except OSError:
+            return False
+
+    if sys.platform.startswith('win'):
+        # python 2 on windows has no os.link
+        import ctypes
+        encoding = sys.getfilesystemencoding()
+        src, dst = [pth.decode(encoding) if isinstance(pth, bytes) else pth for pth in (src, dst)]
+        return bool(ctypes.windll.kernel32.CreateHardLinkW(dst, src, None))
+
+    return False
+
+def linkCount(pth, *args):
+    """
+    :return: number of names of a file, 0 if the platform does not tell
+    """
+    return os.stat(pth).st_nlink
+
+def removeReadOnly(pth, *args):
+    """
+    Remove a read only file, windows does not remove it while it is read only
+    """
+    try:
+        os.chmod(pth, stat.S_IWUSR | READONLY)
+        os.remove(pth)
+    except OSError:
+        pass
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                               MAIN CLASS: SCENE STORE - DEDUPLICATED BY CONTENT                         """
+# ----------------------------------------------------------------------------------------------------------- #
+class SceneStore( object ):
+
+    def __init__(self, rootPth):
+
+        super(SceneStore, self).__init__()
+
+        self.storePth = os.path.join(rootPth, STORENAME)
+        # source path: (size, mtime, digest), a file is only hashed again when it changed
+        self._digest = {}
+        # None until the volume is checked for hard links
+        self._linkable = None
+        # file path: object it is linked to, for the files put by this process
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def objectPth(self, digest):
+        return os.path.join(self.storePth, digest[:2], digest)
+
+    def digest(self, src, progress=None):
+        st = os.stat(src)
+        with self._lock:
+            cached = self._digest.get(src)
+        if cached is not None and cached[:2] == (st.st_size, st.st_mtime):
+            return cached[2]
+
+        digest = hashFile(src, progress)
+        with self._lock:
+            self._digest[src] = (st.st_size, st.st_mtime, digest)
+        return digest
+
+    def linkable(self):
+        """
+        Check once whether the volume of the store takes hard links (some SMB shares do not)
+        :return: True if objects can be linked to snapshot and publish files
+        """
+        with self._lock:
+            if self._linkable is None:
+                self._linkable = self._probe()
+            return self._linkable
+
+    def _probe(self):
+        probe = PublishTransaction.tempPth(os.path.join(self.storePth, 'probe'))
+        try:
+            if not os.path.exists(self.storePth):
+                os.makedirs(self.storePth)
+            open(probe, 'wb').close()
+        except (IOError, OSError) as e:
+            logger.debug('Can not use store %s: %s' % (self.storePth, e))
+            return False
+
+        linked = hardlink(probe, probe + '.link')
+        PublishTransaction.removeFile(probe + '.link')
+        PublishTransaction.removeFile(probe)
+        return linked
+
+    def place(self, src, dst, progress=None):
+        """
+        Make dst the same content as src with the cheapest way file system supports, dst appears in one rename
+        :return: 'reflink' or 'copy'
+        """
+        tmp = PublishTransaction.tempPth(dst)
+        PublishTransaction.removeFile(tmp)
+
+        if reflink(src, tmp):
+            VersionRegistry.replaceFile(tmp, dst)
+            return 'reflink'
+
+        PublishTransaction.streamCopy(src, dst, progress)
+        return 'copy'
+
+    def link(self, obj, dst):
+        """
+        :return: True if dst is a hard link to the object
+        """
+        tmp = PublishTransaction.tempPth(dst)
+        PublishTransaction.removeFile(tmp)
+
+        if not hardlink(obj, tmp):
+            return False
+
+        VersionRegistry.replaceFile(tmp, dst)
+        return True
+
+    def put(self, src, dst, progress=None, share=True):
+        """
+        Store a copy of src at dst
+        :param src: path of file to copy, usually the work file which keeps changing
+        :param dst: path of snapshot or publish file
+        :param progress: function called while big files are read, used to keep publish lock alive
+        :param share: link dst to the object of its content, False for a file which is saved over in place
+        :return: 'dedupe' if content was already stored, otherwise the way the object or the file was made
+        """
+        if not share or not self.linkable():
+            method = self.place(src, dst, progress)
+            logger.debug('Stored %s (%s)' % (os.path.basename(dst), method))
+            return method
+
+        digest = self.digest(src, progress)
+        obj = self.objectPth(digest)
+
+        if os.path.exists(obj):
+            method = 'dedupe'
+        else:
+            folder = os.path.dirname(obj)
+            if not os.path.exists(folder):
+                try:
+                    os.makedirs(folder)
+                except OSError:
+                    pass
+            # the work file is changed by the next save, it is never linked, only copied or cloned
+            method = self.place(src, obj, progress)
+            os.chmod(obj, READONLY)
+
+        if self.link(obj, dst):
+            linkMethod = 'hardlink'
+            with self._lock:
+                self._objects[dst] = obj
+        else:
+            # object was pruned meanwhile or dst is on another volume, dst gets its own copy and no object is left
+            # behind unused
+            linkMethod = self.place(src, dst, progress)
+            if method != 'dedupe':
+                removeReadOnly(obj)
+        logger.debug('Stored %s (%s, %s)' % (os.path.basename(dst), method, linkMethod))
+        return method
+
+    def remove(self, dst):
+        """
+        Remove a file put by this process, and its object when no other file links to it
+        """
+        with self._lock:
+            obj = self._objects.pop(dst, None)
+        if obj is None:
+            PublishTransaction.removeFile(dst)
+            return
+
+        # the file shares its read only mode with the object, the object is made read only again if it is kept
+        removeReadOnly(dst)
+        try:
+            count = linkCount(obj)
+        except OSError:
+            return
+        if count == 1:
+            removeReadOnly(obj)
+        else:
+            os.chmod(obj, READONLY)
+
+    def prune(self):
+        """
+        Remove objects which no snapshot or publish file links to any more. It stats every object of the store, it
+        is meant for maintenance and not to be run after every publish
+        :return: number of objects removed
+        """
+        removed = 0
+        if not os.path.exists(self.storePth):
+            return removed
+
+        young = time.time() - PRUNEAGE
+        for root, dirs, files in os.walk(self.storePth):
+            for f in files:
+                pth = os.path.join(root, f)
+                try:
+                    st = os.stat(pth)
+                    # a link count of 0 is a platform which does not tell, the object is kept
+                    if st.st_nlink != 1 or max(st.st_mtime, st.st_ctime) > young:
+                        continue
+                    os.chmod(pth, stat.S_IWUSR | READONLY)
+                    os.remove(pth)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+# ------------------------------------------------------
+# ONE STORE PER FOLDER
+# ------------------------------------------------------
+_STORES = {}
+_STORELOCK = threading.Lock()
+
+def getStore(rootPth, *args):
+    """
+    Get the store which keeps objects under a folder, it is created the first time a folder is asked for.
+    :param rootPth: folder the store lives in, must be on the same file system as the files linked to it
+    :return: SceneStore
+    """
+    key = os.path.normcase(os.path.normpath(rootPth))
+    with _STORELOCK:
+        if key not in _STORES:
+            _STORES[key] = SceneStore(rootPth)
+        return _STORES[key]
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
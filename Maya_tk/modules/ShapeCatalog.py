@@ -0,0 +1,276 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: ShapeCatalog.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Catalog of controller shapes of toolBoxII, in a packed binary file instead of python code. A shape is a list
+    of transforms (the first one is the root, the others have a parent), every transform has one or more nurbs
+    curves: degree, periodic, control points (float32 x, y, z) and knots (float64, so knots like 1/3 stay exact).
+    A shape can also be a maya command which makes it (CreateNURBSCircle).
+
+    File layout, little endian:
+
+        header      'NRBS', version (uint16), number of shapes (uint32)
+        directory   for every shape: name (uint16 length + utf-8), kind (uint16 length + utf-8, '2D' or '3D'),
+                    offset and size of its record (uint32, uint32)
+        records     maya command (uint16 length + utf-8), number of transforms (uint16), then for every transform
+                    its parent (int16, -1 for the root) and number of curves (uint16), then for every curve degree
+                    (uint8), periodic (uint8), number of points and knots (uint32, uint32), points and knots
+
+    The directory of a catalog is read the first time it is used, a shape is decoded the first time it is asked
+    for and kept. Catalogs of PIPELINE_SHAPE_CATALOGS (separated by os.pathsep) are read after the default one,
+    a shape of a later catalog replaces a shape of the same name, so a studio adds shapes without code:
+
+        python -m Maya_tk.modules.ShapeCatalog build myShapes.json myShapes.nrbs
+        python -m Maya_tk.modules.ShapeCatalog dump toolBoxIIshapes.nrbs shapes.json
+
+    The json is {name: {kind, command, nodes: [{parent, curves: [{degree, periodic, points, knots}]}]}}.
+
+    This module does not use maya.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, sys, json, array, struct, logging, argparse, threading
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+MAGIC = b'NRBS'
+CATALOGVERSION = 1
+
+CATALOGPTH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'toolBoxIIshapes.nrbs')
+# Extra catalogs of a studio, separated by os.pathsep
+CATALOGENV = 'PIPELINE_SHAPE_CATALOGS'
+
+HEADER = struct.Struct('<4sHI')
+LENGTH = struct.Struct('<H')
+RECORD = struct.Struct('<II')
+NODE = struct.Struct('<hH')
+CURVE = struct.Struct('<BBII')
+
+def packText(text, *args):
+    data = text.encode('utf-8')
+    return LENGTH.pack(len(data)) + data
+
+def unpackText(data, offset, *args):
+    size = LENGTH.unpack_from(data, offset)[0]
+    offset += LENGTH.size
+    return data[offset:offset + size].decode('utf-8'), offset + size
+
+def packFloats(values, typecode='f', *args):
+    values = array.array(typecode, values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tostring() if sys.version_info[0] < 3 else values.tobytes()
+
+def unpackFloats(data, offset, count, typecode='f', *args):
+    values = array.array(typecode)
+    chunk = data[offset:offset + count * values.itemsize]
+    if sys.version_info[0] < 3:
+        values.fromstring(chunk)
+    else:
+        values.frombytes(chunk)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, offset + len(chunk)
+
+# ------------------------------------------------------
+# WRITER
+# ------------------------------------------------------
+def packShape(shape, *args):
+    """
+    :param shape: dictionary like the json of a catalog
+    :return: bytes of its record
+    """
+    nodes = shape.get('nodes') or []
+    parts = [packText(shape.get('command') or ''), LENGTH.pack(len(nodes))]
+    for node in nodes:
+        curves = node['curves']
+        parts.append(NODE.pack(node.get('parent', -1), len(curves)))
+        for curve in curves:
+            points = curve['points']
+            parts.append(CURVE.pack(curve.get('degree', 3), 1 if curve.get('periodic') else 0, len(points),
+                                    len(curve['knots'])))
+            parts.append(packFloats([value for point in points for value in point]))
+            parts.append(packFloats(curve['knots'], 'd'))
+    return b''.join(parts)
+
+def writeCatalog(pth, shapes, *args):
+    """
+    :param shapes: dictionary {name: shape}
+    """
+    names = sorted(shapes)
+    records = [packShape(shapes[name]) for name in names]
+
+    directory = []
+    for name in names:
+        directory.append(packText(name) + packText(shapes[name].get('kind') or ''))
+    offset = HEADER.size + sum([len(entry) + RECORD.size for entry in directory])
+
+    parts = [HEADER.pack(MAGIC, CATALOGVERSION, len(names))]
+    for entry, record in zip(directory, records):
+        parts.append(entry + RECORD.pack(offset, len(record)))
+        offset += len(record)
+    parts += records
+
+    tmpPth = '%s.%s.tmp' % (pth, os.getpid())
+    with open(tmpPth, 'wb') as f:
+        f.write(b''.join(parts))
+    from Maya_tk.modules.VersionRegistry import replaceFile
+    replaceFile(tmpPth, pth)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                  SUB CLASS: CATALOG FILE - DIRECTORY OF ONE FILE                        """
+# ----------------------------------------------------------------------------------------------------------- #
+class CatalogFile( object ):
+
+    def __init__(self, pth):
+
+        super(CatalogFile, self).__init__()
+
+        self.pth = pth
+        with open(pth, 'rb') as f:
+            self.data = f.read()
+
+        magic, version, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != CATALOGVERSION:
+            raise ValueError('%s is not a shape catalog of version %s' % (pth, CATALOGVERSION))
+
+        # name: (kind, offset, size)
+        self.entries = {}
+        offset = HEADER.size
+        for i in range(count):
+            name, offset = unpackText(self.data, offset)
+            kind, offset = unpackText(self.data, offset)
+            self.entries[name] = (kind,) + RECORD.unpack_from(self.data, offset)
+            offset += RECORD.size
+
+    def shape(self, name):
+        kind, offset, size = self.entries[name]
+        command, offset = unpackText(self.data, offset)
+        nodeCount = LENGTH.unpack_from(self.data, offset)[0]
+        offset += LENGTH.size
+
+        nodes = []
+        for i in range(nodeCount):
+            parent, curveCount = NODE.unpack_from(self.data, offset)
+            offset += NODE.size
+            curves = []
+            for j in range(curveCount):
+                degree, periodic, pointCount, knotCount = CURVE.unpack_from(self.data, offset)
+                offset += CURVE.size
+                values, offset = unpackFloats(self.data, offset, pointCount * 3)
+                knots, offset = unpackFloats(self.data, offset, knotCount, 'd')
+                points = [tuple(values[k:k + 3]) for k in range(0, len(values), 3)]
+                curves.append(dict(degree=degree, periodic=bool(periodic), points=points, knots=list(knots)))
+            nodes.append(dict(parent=parent, curves=curves))
+        return dict(kind=kind, command=command or None, nodes=nodes)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                   MAIN CLASS: SHAPE CATALOG - SHAPES BY NAME                            """
+# ----------------------------------------------------------------------------------------------------------- #
+class ShapeCatalog( object ):
+
+    def __init__(self, pths=None):
+
+        super(ShapeCatalog, self).__init__()
+
+        if pths is None:
+            pths = [CATALOGPTH] + [pth for pth in os.getenv(CATALOGENV, '').split(os.pathsep) if pth]
+        self.pths = list(pths)
+        self._files = None
+        self._shapes = {}
+        self._lock = threading.Lock()
+
+    def files(self):
+        """
+        :return: dictionary {name: CatalogFile} of the catalog which has the shape, read the first time
+        """
+        with self._lock:
+            if self._files is None:
+                self._files = {}
+                for pth in self.pths:
+                    try:
+                        catalog = CatalogFile(pth)
+                    except (IOError, OSError, ValueError, struct.error) as e:
+                        logger.error('Can not read shape catalog %s: %s' % (pth, e))
+                        continue
+                    for name in catalog.entries:
+                        self._files[name] = catalog
+            return self._files
+
+    def names(self, kind=None):
+        files = self.files()
+        return sorted([name for name in files if kind is None or files[name].entries[name][0] == kind])
+
+    def kind(self, name):
+        return self.files()[name].entries[name][0]
+
+    def __contains__(self, name):
+        return name in self.files()
+
+    def __getitem__(self, name):
+        return self.shape(name)
+
+    def shape(self, name):
+        """
+        :return: dictionary of a shape, decoded the first time it is asked for. KeyError if it is not known
+        """
+        shape = self._shapes.get(name)
+        if shape is None:
+            shape = self.files()[name].shape(name)
+            self._shapes[name] = shape
+        return shape
+
+    def reload(self):
+        with self._lock:
+            self._files = None
+            self._shapes = {}
+
+# ------------------------------------------------------
+# CATALOG OF THIS PROCESS
+# ------------------------------------------------------
+_CATALOG = []
+_CATALOGLOCK = threading.Lock()
+
+def getCatalog(*args):
+    """
+    Get the shape catalog, it is made the first time it is asked for and files are read when a shape is used
+    :return: ShapeCatalog
+    """
+    with _CATALOGLOCK:
+        if not _CATALOG:
+            _CATALOG.append(ShapeCatalog())
+        return _CATALOG[0]
+
+def main(argv=None, *args):
+    parser = argparse.ArgumentParser(description='Build or dump a controller shape catalog')
+    parser.add_argument('command', choices=['build', 'dump'])
+    parser.add_argument('source', help='json file to build from, or catalog to dump')
+    parser.add_argument('target', help='catalog to build, or json file to dump to')
+    options = parser.parse_args(argv)
+
+    if options.command == 'build':
+        with open(options.source, 'r') as f:
+            shapes = json.load(f)
+        writeCatalog(options.target, shapes)
+        logger.info('Wrote %s shapes to %s' % (len(shapes), options.target))
+    else:
+        catalog = ShapeCatalog([options.source])
+        shapes = dict([(name, catalog.shape(name)) for name in catalog.names()])
+        with open(options.target, 'w') as f:
+            json.dump(shapes, f, indent=1, sort_keys=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
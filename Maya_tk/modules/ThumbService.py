@@ -0,0 +1,438 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: ThumbService.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Thumbnail service for image viewers and libraries. Images are decoded and resized by a pool of worker threads
+    with QImage (QImage is safe outside of the GUI thread, om.MImage is not), so selecting an item in a long list
+    never waits for the network share.
+
+    Thumbnails are kept in two levels:
+        - a memory LRU of QImage bounded by bytes
+        - a content addressed cache on local disk, the file name is a hash of (source path, size, mtime of source),
+          so a changed source gets a new thumbnail and an old one is never shown. It is bounded by bytes and number
+          of files, the least recently used thumbnails are removed first.
+
+    Nothing is written beside the source images. A thumbnail which is in the cache costs no read of the share, the
+    mtime of a source is checked at most once every STATTTL seconds.
+
+    Limits can be set with environment variables PIPELINE_THUMB_CACHE_MB and PIPELINE_THUMB_CACHE_FILES.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, time, hashlib, logging, tempfile, threading
+from collections import OrderedDict
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from Maya_tk.plugins.Qt import QtGui, QtCore
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+WORKERS = 2
+# Memory budget of thumbnails kept in LRU
+MAXBYTES = 64 * 1024 * 1024
+# Disk budget of thumbnail cache
+DISKBYTES = int(os.getenv('PIPELINE_THUMB_CACHE_MB', 512)) * 1024 * 1024
+DISKFILES = int(os.getenv('PIPELINE_THUMB_CACHE_FILES', 20000))
+# Local folder of thumbnail cache, never on the production share
+CACHEDIR = os.path.join(os.getenv('LOCALAPPDATA') or tempfile.gettempdir(), 'PipelineTool/thumbCache')
+# Seconds the mtime of a source image is trusted without asking the share again
+STATTTL = 5.0
+
+THUMBEXT = '.png'
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                    SUB CLASS: LRU CACHE BOUNDED BY BYTES                                """
+# ----------------------------------------------------------------------------------------------------------- #
+class LRUCache( object ):
+
+    def __init__(self, maxBytes=MAXBYTES):
+
+        super(LRUCache, self).__init__()
+
+        self.maxBytes = maxBytes
+        self.curBytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            value, size = self._items.pop(key)
+            self._items[key] = (value, size)
+            return value
+
+    def put(self, key, value, size):
+        with self._lock:
+            if key in self._items:
+                self.curBytes -= self._items.pop(key)[1]
+            self._items[key] = (value, size)
+            self.curBytes += size
+            while self.curBytes > self.maxBytes and len(self._items) > 1:
+                oldKey, (oldValue, oldSize) = self._items.popitem(last=False)
+                self.curBytes -= oldSize
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.curBytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                              SUB CLASS: DISK CACHE - CONTENT ADDRESSED, LRU EVICTION                    """
+# ----------------------------------------------------------------------------------------------------------- #
+class DiskCache( object ):
+
+    def __init__(self, cacheDir=CACHEDIR, maxBytes=DISKBYTES, maxFiles=DISKFILES):
+
+        super(DiskCache, self).__init__()
+
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        self.maxFiles = maxFiles
+        self.curBytes = 0
+        # digest: size, oldest used first
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+        if not os.path.exists(self.cacheDir):
+            os.makedirs(self.cacheDir)
+
+        self.load()
+
+    def path(self, digest):
+        # two level folder so one folder never holds the whole cache
+        return os.path.join(self.cacheDir, digest[:2], digest + THUMBEXT)
+
+    def load(self):
+        """
+        Read what is already in cache folder, mtime of a thumbnail is the last time it was used
+        """
+        found = []
+        for root, dirs, files in os.walk(self.cacheDir):
+            for f in files:
+                pth = os.path.join(root, f)
+                if not f.endswith(THUMBEXT):
+                    # left over of a write which did not finish
+                    self.remove(pth)
+                    continue
+                try:
+                    st = os.stat(pth)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, f[:-len(THUMBEXT)], st.st_size))
+
+        with self._lock:
+            self._items.clear()
+            self.curBytes = 0
+            for mtime, digest, size in sorted(found):
+                self._items[digest] = size
+                self.curBytes += size
+
+        self.evict()
+        logger.debug('Thumbnail cache %s: %s files, %s bytes' % (self.cacheDir, len(self._items), self.curBytes))
+
+    def get(self, digest):
+        """
+        Get local path of a cached thumbnail
+        :param digest: hash of thumbnail key
+        :return: path, None if it is not in cache
+        """
+        pth = self.path(digest)
+        with self._lock:
+            if digest not in self._items:
+                return None
+            if not os.path.exists(pth):
+                self.curBytes -= self._items.pop(digest)
+                return None
+            self._items[digest] = self._items.pop(digest)
+
+        try:
+            os.utime(pth, None)
+        except OSError:
+            pass
+        return pth
+
+    def put(self, digest, image):
+        """
+        Write a thumbnail to cache, it is written to a temp file first so a reader never sees half of a file
+        :param digest: hash of thumbnail key
+        :param image: QImage
+        :return: path of thumbnail
+        """
+        pth = self.path(digest)
+        folder = os.path.dirname(pth)
+        if not os.path.exists(folder):
+            try:
+                os.makedirs(folder)
+            except OSError:
+                pass
+
+        tmpPth = '%s.%s.tmp' % (pth, threading.current_thread().ident)
+        if not image.save(tmpPth, 'PNG'):
+            self.remove(tmpPth)
+            logger.error('Can not write thumbnail %s' % pth)
+            return None
+
+        if os.path.exists(pth):
+            # same key was made by another worker, keep the first one
+            self.remove(tmpPth)
+        else:
+            os.rename(tmpPth, pth)
+
+        size = os.path.getsize(pth)
+        with self._lock:
+            if digest in self._items:
+                self.curBytes -= self._items.pop(digest)
+            self._items[digest] = size
+            self.curBytes += size
+
+        self.evict()
+        return pth
+
+    def evict(self):
+        removed = []
+        with self._lock:
+            while len(self._items) > 1 and (self.curBytes > self.maxBytes or len(self._items) > self.maxFiles):
+                digest, size = self._items.popitem(last=False)
+                self.curBytes -= size
+                removed.append(digest)
+
+        for digest in removed:
+            self.remove(self.path(digest))
+
+    def remove(self, pth):
+        try:
+            os.remove(pth)
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            digests = list(self._items)
+            self._items.clear()
+            self.curBytes = 0
+
+        for digest in digests:
+            self.remove(self.path(digest))
+
+    def __contains__(self, digest):
+        with self._lock:
+            return digest in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                   MAIN CLASS: THUMB SERVICE - WORKER POOL                               """
+# ----------------------------------------------------------------------------------------------------------- #
+class ThumbService( object ):
+
+    def __init__(self, workers=WORKERS, maxBytes=MAXBYTES, cacheDir=CACHEDIR, diskBytes=DISKBYTES,
+                 diskFiles=DISKFILES):
+
+        super(ThumbService, self).__init__()
+
+        self.cache = LRUCache(maxBytes)
+        self.disk = DiskCache(cacheDir, diskBytes, diskFiles)
+        # newest request first, the one user is looking at is the one to decode
+        self._queue = queue.LifoQueue()
+        self._pending = {}
+        # normalized source path: (mtime, check time)
+        self._stat = {}
+        self._lock = threading.Lock()
+
+        self._workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self.work, name='ThumbService-%s' % i)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def mtime(self, source):
+        """
+        Get mtime of a source image, it is asked from disk at most once every STATTTL seconds
+        :return: mtime, None if source does not exist
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._stat.get(source)
+            if cached is not None and now - cached[1] < STATTTL:
+                return cached[0]
+
+        try:
+            mtime = os.stat(source).st_mtime
+        except OSError:
+            mtime = None
+
+        with self._lock:
+            self._stat[source] = (mtime, now)
+        return mtime
+
+    def key(self, source, size):
+        source = os.path.normpath(source)
+        return (source, int(size[0]), int(size[1]), self.mtime(source))
+
+    def digest(self, key):
+        return hashlib.sha1(('%s|%s|%s|%r' % key).encode('utf-8')).hexdigest()
+
+    def forget(self, source=None):
+        """
+        Check mtime of a source again on next request, or of every source if none is given
+        """
+        with self._lock:
+            if source is None:
+                self._stat.clear()
+            else:
+                self._stat.pop(os.path.normpath(source), None)
+
+    def path(self, source, size):
+        """
+        Get local png of a thumbnail for maya controls which only take a file, write it from memory if the file
+        has been removed from disk cache.
+        :return: path, None if thumbnail is not made yet
+        """
+        key = self.key(source, size)
+        if key[3] is None:
+            return None
+
+        digest = self.digest(key)
+        pth = self.disk.get(digest)
+        if pth is None:
+            image = self.cache.get(key)
+            if image is None:
+                return None
+            pth = self.disk.put(digest, image)
+        return pth
+
+    def thumbnail(self, source, size):
+        """
+        Get local png of a thumbnail, make it in calling thread if it is not in cache
+        :param source: path of source image
+        :param size: (width, height)
+        :return: path, None if source can not be read
+        """
+        pth = self.path(source, size)
+        if pth is not None:
+            return pth
+
+        key = self.key(source, size)
+        if key[3] is None:
+            return None
+
+        try:
+            self.makeThumb(key)
+        except Exception as e:
+            logger.error('Can not make thumbnail of %s: %s' % (source, e))
+            return None
+
+        return self.path(source, size)
+
+    def request(self, source, size, callback=None):
+        """
+        Ask for a thumbnail of an image
+        :param source: path of source image
+        :param size: (width, height)
+        :param callback: function(source, size, image), called from worker thread when thumbnail is ready, image
+                         is None when the source can not be read
+        :return: QImage of thumbnail if it is ready, None if it is being made
+        """
+        key = self.key(source, size)
+        if key[3] is None:
+            # source is gone, tell the caller at once instead of leaving it waiting
+            if callback is not None:
+                callback(source, tuple(size), None)
+            return None
+
+        thumb = self.cache.get(key)
+        if thumb is not None:
+            return thumb
+
+        # a small png on local disk, cheap enough to read here
+        pth = self.disk.get(self.digest(key))
+        if pth is not None:
+            thumb = QtGui.QImage(pth)
+            if not thumb.isNull():
+                self.cache.put(key, thumb, thumb.byteCount())
+                return thumb
+
+        with self._lock:
+            if key in self._pending:
+                if callback is not None:
+                    self._pending[key].append(callback)
+                return None
+            self._pending[key] = [callback] if callback is not None else []
+
+        self._queue.put(key)
+        return None
+
+    def work(self):
+        while True:
+            key = self._queue.get()
+            thumb = None
+            try:
+                thumb = self.makeThumb(key)
+            except Exception as e:
+                logger.error('Can not make thumbnail of %s: %s' % (key[0], e))
+
+            with self._lock:
+                callbacks = self._pending.pop(key, [])
+
+            # callbacks are called on failure too (image None), a viewer must not wait forever
+            for callback in callbacks:
+                try:
+                    callback(key[0], key[1:3], thumb)
+                except Exception as e:
+                    logger.error('Thumbnail callback failed for %s: %s' % (key[0], e))
+
+    def makeThumb(self, key):
+        source, w, h, mtime = key
+        image = QtGui.QImage(source)
+        if image.isNull():
+            return None
+
+        image = image.scaled(w, h, QtCore.Qt.IgnoreAspectRatio, QtCore.Qt.SmoothTransformation)
+        self.disk.put(self.digest(key), image)
+
+        self.cache.put(key, image, image.byteCount())
+        return image
+
+# ------------------------------------------------------
+# ONE SERVICE FOR EVERY VIEWER
+# ------------------------------------------------------
+_SERVICE = []
+_SERVICELOCK = threading.Lock()
+
+def getService(*args):
+    with _SERVICELOCK:
+        if not _SERVICE:
+            _SERVICE.append(ThumbService())
+        return _SERVICE[0]
+
+def thumbnail(source, size, *args):
+    """
+    Get local png of a thumbnail from the shared service, see ThumbService.thumbnail
+    """
+    return getService().thumbnail(source, size)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
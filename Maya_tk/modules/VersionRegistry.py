@@ -0,0 +1,251 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: VersionRegistry.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Version and revision registry of a task. File names are parsed once with a compiled grammar:
+
+        <base>_v<version>.ma                work and publish files
+        <base>_v<version>_r<revision>.ma    snapshot files
+
+    The max version of every base name in scenes and publish, and the max revision of every version in snapShot
+    are kept in a sidecar index in the task folder. When the mtime of a folder did not change the index is
+    trusted, so opening snapshot, publish or loader UI costs a few stats instead of listing and parsing the
+    folders. The index is updated on save and written atomically (temp file then rename).
+
+    This module does not use maya.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, re, sys, json, time, logging, threading
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+GRAMMAR = re.compile(r'^(?P<base>.+?)_v(?P<version>\d+)(?:_r(?P<revision>\d+))?(?P<ext>\.ma)$')
+
+PADDING = 3
+
+INDEXNAME = '.versionIndex.json'
+
+# Folders of a task which are indexed, relative to task folder
+FOLDERS = dict( scenes='work/maya/scenes',
+                snapShot='work/maya/scenes/snapShot',
+                publish='publish/maya', )
+
+# A folder modified less than this many seconds before it was listed may have changed again in the same mtime
+# tick, it is listed again on next query.
+RACY = 2.0
+
+def parse(name, *args):
+    """
+    Split a file name into base name, version and revision
+    :param name: file name
+    :return: (base, version, revision), revision is None for work and publish files, None if name does not match
+    """
+    match = GRAMMAR.match(name)
+    if match is None:
+        return None
+    revision = match.group('revision')
+    return (match.group('base'), int(match.group('version')), int(revision) if revision is not None else None)
+
+def fileName(base, version, revision=None, ext='.ma', *args):
+    name = '%s_v%s' % (base, str(version).zfill(PADDING))
+    if revision is not None:
+        name += '_r%s' % str(revision).zfill(PADDING)
+    return name + ext
+
+def writeJson(pth, data, *args):
+    """
+    Write json to a temp file in the same folder then rename it over the target, a reader sees the old or the new
+    file, never half of one
+    """
+    tmpPth = '%s.%s.%s.tmp' % (pth, os.getpid(), threading.current_thread().ident)
+    with open(tmpPth, 'w') as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    replaceFile(tmpPth, pth)
+
+def replaceFile(src, dst, *args):
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+        return
+    if sys.platform.startswith('win') and os.path.exists(dst):
+        # python 2 rename does not overwrite on windows
+        os.remove(dst)
+    os.rename(src, dst)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                              MAIN CLASS: VERSION REGISTRY - SIDECAR INDEX OF A TASK                     """
+# ----------------------------------------------------------------------------------------------------------- #
+class VersionRegistry( object ):
+
+    def __init__(self, taskPth, folders=None):
+
+        super(VersionRegistry, self).__init__()
+
+        self.taskPth = taskPth
+        self.folders = dict([(kind, os.path.join(taskPth, FOLDERS[kind])) for kind in FOLDERS])
+        if folders:
+            self.folders.update(folders)
+        self.indexPth = os.path.join(taskPth, INDEXNAME)
+        self._lock = threading.RLock()
+        self._data = self.read()
+
+    def folder(self, kind):
+        return self.folders[kind]
+
+    def read(self):
+        data = None
+        try:
+            with open(self.indexPth, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            pass
+
+        if not isinstance(data, dict):
+            data = {}
+        for kind in FOLDERS:
+            if not isinstance(data.get(kind), dict):
+                data[kind] = dict(mtime=None, checked=0, max={})
+        return data
+
+    def write(self):
+        try:
+            writeJson(self.indexPth, self._data)
+        except (IOError, OSError) as e:
+            logger.error('Can not write version index %s: %s' % (self.indexPth, e))
+
+    def mtime(self, kind):
+        try:
+            return os.stat(self.folder(kind)).st_mtime
+        except OSError:
+            return None
+
+    def scan(self, kind):
+        """
+        List a folder and keep max version (scenes, publish) or max revision (snapShot) of every name in it
+        """
+        pth = self.folder(kind)
+        now = time.time()
+        mtime = self.mtime(kind)
+
+        found = {}
+        if mtime is not None:
+            for name in os.listdir(pth):
+                parsed = parse(name)
+                if parsed is None:
+                    continue
+                base, version, revision = parsed
+                if kind == 'snapShot':
+                    if revision is None:
+                        continue
+                    key, value = fileName(base, version, ext=''), revision
+                else:
+                    if revision is not None:
+                        continue
+                    key, value = base, version
+                if value > found.get(key, 0):
+                    found[key] = value
+
+        self._data[kind] = dict(mtime=mtime, checked=now, max=found)
+        logger.debug('Indexed versions of %s (%s names)' % (pth, len(found)))
+
+    def fresh(self, kind):
+        entry = self._data[kind]
+        mtime = self.mtime(kind)
+        if mtime is None:
+            return entry['mtime'] is None
+        return entry['mtime'] == mtime and entry['checked'] - mtime >= RACY
+
+    def refresh(self):
+        """
+        Check mtime of indexed folders, only folders which changed are listed again
+        """
+        with self._lock:
+            changed = False
+            for kind in FOLDERS:
+                if not self.fresh(kind):
+                    self.scan(kind)
+                    changed = True
+            if changed:
+                self.write()
+
+    def maxVersion(self, base, kind='scenes'):
+        """
+        :return: max version of a base name in scenes or publish, 0 if there is none
+        """
+        with self._lock:
+            self.refresh()
+            return self._data[kind]['max'].get(base, 0)
+
+    def maxRevision(self, base, version):
+        """
+        :return: max snapshot revision of a version, 0 if there is none
+        """
+        with self._lock:
+            self.refresh()
+            return self._data['snapShot']['max'].get(fileName(base, version, ext=''), 0)
+
+    def record(self, kind, name):
+        """
+        Add a file which has just been saved, index is written straight away
+        :param kind: 'scenes', 'snapShot' or 'publish'
+        :param name: file name
+        """
+        parsed = parse(os.path.basename(name))
+        if parsed is None:
+            logger.debug('%s does not follow version naming, not indexed' % name)
+            return
+
+        base, version, revision = parsed
+        with self._lock:
+            entry = self._data[kind]
+            if kind == 'snapShot':
+                key, value = fileName(base, version, ext=''), revision or 0
+            else:
+                key, value = base, version
+
+            if value > entry['max'].get(key, 0):
+                entry['max'][key] = value
+
+            # the save changed folder mtime, the folder is listed once more on next query to pick up what other
+            # artists saved since it was last listed
+            entry['mtime'] = self.mtime(kind)
+            entry['checked'] = time.time()
+            self.write()
+
+    def invalidate(self):
+        with self._lock:
+            for kind in FOLDERS:
+                self._data[kind] = dict(mtime=None, checked=0, max={})
+
+# ------------------------------------------------------
+# ONE REGISTRY PER TASK
+# ------------------------------------------------------
+_REGISTRIES = {}
+_REGISTRYLOCK = threading.Lock()
+
+def getRegistry(taskPth, folders=None, *args):
+    """
+    Get the version registry of a task, it is created the first time a task is asked for.
+    :param taskPth: path of task folder
+    :param folders: dictionary {kind: path} when scenes, snapShot or publish are not at their default place
+    :return: VersionRegistry
+    """
+    key = os.path.normcase(os.path.normpath(taskPth))
+    with _REGISTRYLOCK:
+        if key not in _REGISTRIES:
+            _REGISTRIES[key] = VersionRegistry(taskPth, folders)
+        return _REGISTRIES[key]
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -6,4 +6,8 @@
 
 """
 
-from maya import cmds
\ No newline at end of file
+try:
+    from maya import cmds
+except ImportError:
+    # outside maya, modules which do not use maya (ProdTree, ProdValidator...) can still be imported
+    cmds = None
@@ -28,7 +28,7 @@ Reference:
 from maya import cmds, mel # Maya_tk Python command
 from functools import partial # partial module can store variables to method
 import maya.OpenMayaUI as omui # the extent of the internal Maya_tk API
-import pymel.core as pm # Pymel command for maya
+import maya.utils # run thumbnail callbacks in main thread
 import json, logging, os, sys # to read and write info & data
 import maya.app.renderSetup.views.renderSetupButton as marv #very nice symbol button
 
@@ -36,6 +36,11 @@ import maya.app.renderSetup.views.renderSetupButton as marv #very nice symbol bu
 # VARIALBES ARE USED BY ALL CLASSES
 # ------------------------------------------------------
 from Maya_tk.modules import MayaVariables as var
+from Maya_tk.modules import ControllerBatch
+from Maya_tk.modules import LibraryIndex
+from Maya_tk.modules import NodeModel
+from Maya_tk.modules import ShapeCatalog
+from Maya_tk.modules import ThumbService
 from Maya_tk.modules import toolBoxIIfuncs
 
 NAMES = var.MAINVAR
@@ -65,15 +70,12 @@ logger.setLevel(logging.DEBUG)
 if Qt.__binding__=='PySide':
     logger.debug('Using PySide with shiboken')
     from shiboken import wrapInstance
-    from Maya_tk.plugins.Qt.QtCore import Signal
 elif Qt.__binding__.startswith('PyQt'):
     logger.debug('Using PyQt with sip')
     from sip import wrapinstance as wrapInstance
-    from Maya_tk.plugins.Qt.QtCore import pyqtSignal as Signal
 else:
     logger.debug('Using PySide2 with shiboken2')
     from shiboken2 import wrapInstance
-    from Maya_tk.plugins.Qt.QtCore import Signal
 # -------------------------------------------------------------------------------------------------------------
 # SHOW UI - MAKE UI IS DOCKABLE INSIDE MAYA
 # -------------------------------------------------------------------------------------------------------------
@@ -129,118 +131,10 @@ def getDock(name='DAMGtoolBoxIIDock', version = VERSION):
 # ------------------------------------- #
 # SUB CLASSES FUNCTIONS AND UI ELEMENTS #
 # ------------------------------------- #
-# Controller Manager UI when create something
-# ------------------------------------------------------
-
 def geticon(icon):
     iconPth = os.path.join(os.getcwd(), 'icons')
     return os.path.join(iconPth, icon)
 
-class ControllerManager( QtWidgets.QWidget ):
-
-    onSolo = Signal(bool)
-    tfW=200
-
-    def __init__(self, nurbs):
-        super( ControllerManager, self ).__init__()
-        if isinstance(nurbs, basestring):
-            nurbs = pm.PyNode(nurbs)
-
-        self.nurbs = nurbs
-
-        self.buildUI()
-
-    def buildUI(self):
-
-        btnW = 75
-
-        layout = QtWidgets.QGridLayout(self)
-
-        self.name = QtWidgets.QCheckBox()
-        self.name.setChecked(self.nurbs.visibility.get())
-        self.name.toggled.connect(lambda val: self.nurbs.getTransform().visibility.set(val))
-        layout.addWidget( self.name, 0, 0 )
-
-        name = str( self.nurbs.getTransform() )
-        self.textFldName = QtWidgets.QLineEdit(name)
-        self.textFldName.setMinimumWidth(self.tfW)
-        self.textFldName.returnPressed.connect(self.renameController)
-        layout.addWidget( self.textFldName, 0, 1 )
-
-        self.colorPlate = QtWidgets.QLabel()
-        self.colorPlate.setMinimumWidth( 30 )
-        self.nurbs.overrideRGBColors.set(0)
-        self.nurbs.overrideEnabled.set(1)
-        self.setColorPlate()
-        layout.addWidget( self.colorPlate, 0, 2 )
-
-        soloBtn = QtWidgets.QPushButton('Isolate')
-        soloBtn.setMinimumWidth( 75 )
-        soloBtn.setCheckable(True)
-        soloBtn.toggled.connect(lambda val: self.onSolo.emit(val))
-        layout.addWidget( soloBtn, 0, 3 )
-
-        self.color_slider = QtWidgets.QSlider( QtCore.Qt.Horizontal )
-        self.color_slider.setMinimumWidth( 2.5 * btnW )
-        self.color_slider.setMinimum( 1 )
-        self.color_slider.setMaximum( 31 )
-        self.color_slider.setValue( self.nurbs.overrideColor.get() )
-        self.color_slider.valueChanged.connect( self.sliderSetColor )
-        layout.addWidget( self.color_slider, 0, 4)
-
-        deleteBtn = QtWidgets.QPushButton('Delete')
-        deleteBtn.setMinimumWidth( btnW )
-        deleteBtn.clicked.connect( self.deleteController )
-        layout.addWidget( deleteBtn, 0, 5 )
-
-    def renameController(self):
-        oldName = str( self.nurbs.getTransform() )
-        newName = self.textFldName.text()
-        cmds.rename(oldName, newName)
-
-    def sliderSetColor(self):
-        index = self.color_slider.value()
-        self.nurbs.overrideColor.set(index)
-        color = cmds.colorIndex(index, q=True)
-        self.setColorPlate( color )
-
-    def setColorPlate(self, color=None):
-        if not color:
-            indexColor = self.nurbs.overrideColor.get()
-            if indexColor == 0:
-                color = (.4,.4,.4)
-            else:
-                color = cmds.colorIndex(indexColor, query=True)
-
-        assert  len(color) == 3, "You must provide a list of 3 colors"
-        r,g,b = [c*255 for c in color]
-        self.colorPlate.setStyleSheet( 'background-color: rgba(%s,%s,%s,1.0)' % (r, g, b) )
-
-    def setColor(self):
-        nurbsIndexColor = self.nurbs.overrideColor.get()
-        if nurbsIndexColor==0:
-            nurbsColor = (.4,.4,.4)
-        else:
-            nurbsColor = cmds.colorIndex(nurbsIndexColor, q=True)
-
-        color = pm.colorEditor(rgbValue=nurbsColor)
-
-        r,g,b,a = [float(c) for c in color.split()]
-        color = (r,g,b)
-
-        self.nurbs.overrideColorRGB.set(color)
-        self.setColorPlate( color )
-
-    def disableNurbs(self, value):
-        self.name.setChecked(not value)
-
-    def deleteController(self):
-        self.setParent(None)
-        self.setVisible(False)
-        self.deleteLater()
-
-        pm.delete(self.nurbs.getTransform())
-
 # User Library Functions
 # ------------------------------------------------------
 class ControllerLibrary( dict ):
@@ -278,6 +172,7 @@ class ControllerLibrary( dict ):
             json.dump( info, f, indent=4 )
 
         self[ name ] = info
+        LibraryIndex.getIndex( directory ).record( name, info )
 
     def remove(self, name, directory=DIRECTORY):
         mayapath = os.path.join(directory, '%s.ma' % name)
@@ -289,40 +184,25 @@ class ControllerLibrary( dict ):
         for item in items:
             cmds.sysFile(item, delete=True)
 
+        self.pop(name, None)
+        LibraryIndex.getIndex(directory).forget(name)
+
     def reference(self, name, directory=DIRECTORY):
         mayapath = os.path.join(directory, '%s.ma' % name)
         cmds.file(mayapath, reference=True, usingNamespaces=False)
 
-    def find(self, directory=DIRECTORY):
+    def find(self, directory=DIRECTORY, force=False):
+        """
+        Items of the library folder, from its manifest: the folder is only listed when it changed and a .json
+        sidecar is only read when it changed
+        :param force: check every sidecar even if the folder did not change
+        """
         self.clear()
 
         if not os.path.exists( directory ):
             return
 
-        files = os.listdir( directory )
-        mayafiles = [ f for f in files if f.endswith( '.ma' ) ]
-
-        for ma in mayafiles:
-            name, ext = os.path.splitext( ma )
-            path = os.path.join( directory, ma )
-
-            infoFile = '%s.json' % name
-            if infoFile in files:
-                infoFile = os.path.join( directory, infoFile )
-
-                with open( infoFile, 'r' ) as f:
-                    info = json.load( f )
-            else:
-                info = {}
-
-            screenshot = '%s.jpg' % name
-            if screenshot in files:
-                info[ 'screenshot' ] = os.path.join( directory, name )
-
-            info[ 'name' ] = name
-            info[ 'path' ] = path
-
-            self[ name ] = info
+        self.update( LibraryIndex.getIndex( directory ).items( force ) )
 
     def load(self, name):
         path = self[ name ][ 'path' ]
@@ -335,6 +215,7 @@ class ControllerLibrary( dict ):
         cf = cmds.currentTime(q=True)
         cmds.playblast(completeFilename=path, forceOverwrite=True, format='image', width=200, height=200,
                        showOrnaments=False, startTime=cf, endTime=cf, viewer=False)
+        ThumbService.getService().forget( path )
         return path
 
 # A Maya_tk channel box UI with a few modify
@@ -971,7 +852,8 @@ class DAMGtoolBoxII( QtWidgets.QWidget ):
 
         # Create QComboBox
         self.nurbsType2DCB = QtWidgets.QComboBox()
-        for nurbsType in sorted( self.nurbsType2D ):
+        # shapes a studio added to the catalog are listed too
+        for nurbsType in sorted( set( self.nurbsType2D ) | set( ShapeCatalog.getCatalog().names( '2D' ) ) ):
             self.nurbsType2DCB.addItem( nurbsType )
         controllerManagerHeaderLayout.addWidget( self.nurbsType2DCB )
 
@@ -989,7 +871,7 @@ class DAMGtoolBoxII( QtWidgets.QWidget ):
 
         # Create QComboBox
         self.nurbsType3DCB = QtWidgets.QComboBox()
-        for nurbsType in sorted( self.nurbsType3D ):
+        for nurbsType in sorted( set( self.nurbsType3D ) | set( ShapeCatalog.getCatalog().names( '3D' ) ) ):
             self.nurbsType3DCB.addItem( nurbsType )
         controllerManagerHeaderLayout.addWidget( self.nurbsType3DCB )
 
@@ -1004,19 +886,48 @@ class DAMGtoolBoxII( QtWidgets.QWidget ):
         refreshBtn.clicked.connect(self.populateAll)
         controllerManagerHeaderLayout.addWidget(refreshBtn)
 
-        # Manager Body - scrollWidget
+        # Manager Body - one view of every curve, only the rows on screen are painted
         # ---------------------------------------------------------------------------------------------------------
         # Create QWidget
-        scrollManagerWidget = QtWidgets.QWidget()
-        scrollManagerWidget.setSizePolicy( QtWidgets.QSizePolicy.Maximum, QtWidgets.QSizePolicy.Maximum )
-        self.scrollLayout = QtWidgets.QVBoxLayout( scrollManagerWidget )
-        #self.scrollLayout.setContentsMargins(QtCore.QMargins(2,2,2,2))
-
-        # Create QScrollArea
-        scrollManagerArea = QtWidgets.QScrollArea()
-        scrollManagerArea.setWidgetResizable( True )
-        scrollManagerArea.setWidget( scrollManagerWidget )
-        self.layout.addWidget( scrollManagerArea, top2['X'][3], top2['Y'][3], top2['H'][3], top2['W'][3] )
+        managerWidget = QtWidgets.QWidget()
+        managerLayout = QtWidgets.QVBoxLayout( managerWidget )
+        managerLayout.setContentsMargins( QtCore.QMargins( 0, 0, 0, 0 ) )
+
+        # Create QListView
+        self.managerModel = NodeModel.ControllerModel( self )
+        self.managerView = QtWidgets.QListView()
+        self.managerView.setModel( self.managerModel )
+        self.managerView.setItemDelegate( NodeModel.ColorDelegate( self.managerView ) )
+        self.managerView.setUniformItemSizes( True )
+        self.managerView.setSelectionMode( QtWidgets.QAbstractItemView.ExtendedSelection )
+        self.managerView.setEditTriggers( QtWidgets.QAbstractItemView.DoubleClicked |
+                                          QtWidgets.QAbstractItemView.EditKeyPressed )
+        managerLayout.addWidget( self.managerView )
+
+        # Tools of the selected rows
+        managerToolsLayout = QtWidgets.QHBoxLayout()
+
+        soloBtn = QtWidgets.QPushButton( 'Isolate' )
+        soloBtn.setMinimumWidth( top2['btnW'][1] )
+        soloBtn.setCheckable( True )
+        soloBtn.toggled.connect( self.onSolo )
+        managerToolsLayout.addWidget( soloBtn )
+
+        self.managerColorSlider = QtWidgets.QSlider( QtCore.Qt.Horizontal )
+        self.managerColorSlider.setMinimum( 1 )
+        self.managerColorSlider.setMaximum( 31 )
+        # the colour is set when the slider is released, one undo step
+        self.managerColorSlider.setTracking( False )
+        self.managerColorSlider.valueChanged.connect( self.setManagerColor )
+        managerToolsLayout.addWidget( self.managerColorSlider )
+
+        deleteBtn = QtWidgets.QPushButton( 'Delete' )
+        deleteBtn.setMinimumWidth( top2['btnW'][1] )
+        deleteBtn.clicked.connect( self.deleteManagerRows )
+        managerToolsLayout.addWidget( deleteBtn )
+
+        managerLayout.addLayout( managerToolsLayout )
+        self.layout.addWidget( managerWidget, top2['X'][3], top2['Y'][3], top2['H'][3], top2['W'][3] )
 
     # Top 3 Layout
     def channelbox(self):
@@ -1486,12 +1397,10 @@ class DAMGtoolBoxII( QtWidgets.QWidget ):
             cmds.confirmDialog(t='Warning', m='You must give a name', b='OK')
             return
 
-        files = [f for f in os.listdir(DIRECTORY)]
-
-        for file in files:
-            if name in file:
-                cmds.confirmDialog( t='Confirm', m='File %s already exists, override?' % name,
-                                    b=[ 'Yes', 'No' ], db='Yes', cb='No', dismissString='No' )
+        # the library knows its items, the folder is not listed again
+        if name in self.library:
+            cmds.confirmDialog( t='Confirm', m='File %s already exists, override?' % name,
+                                b=[ 'Yes', 'No' ], db='Yes', cb='No', dismissString='No' )
 
         self.library.save(name)
         self.saveNameField.setText('')
@@ -1502,7 +1411,7 @@ class DAMGtoolBoxII( QtWidgets.QWidget ):
         if not currentItem:
             self.warningFunction( 'You must select something' )
             return
-        self.library.remove(currentItem)
+        self.library.remove(currentItem.text())
         self.populateAll()
 
     def referenceItem(self):
@@ -1518,37 +1427,66 @@ class DAMGtoolBoxII( QtWidgets.QWidget ):
         self.listLibWidget.clear()
         self.library.find()
 
+        iconSize = self.listLibWidget.iconSize()
+        size = (iconSize.width(), iconSize.height())
+        placeholder = QtGui.QPixmap(iconSize)
+        placeholder.fill(QtGui.QColor(60, 60, 60))
+        placeholder = QtGui.QIcon(placeholder)
+
         for name, info in self.library.items():
             item = QtWidgets.QListWidgetItem(name)
             self.listLibWidget.addItem(item)
 
             screenshot = info.get('screenshot')
             if screenshot:
-                icon = QtGui.QIcon(screenshot)
-                item.setIcon(icon)
+                # thumbnail is decoded and resized by thumbnail service, item shows a placeholder until it is ready
+                image = ThumbService.getService().request(screenshot, size, partial(self.onLibThumbReady, name))
+                if image is None:
+                    item.setIcon(placeholder)
+                else:
+                    item.setIcon(QtGui.QIcon(QtGui.QPixmap.fromImage(image)))
+
+    def onLibThumbReady(self, name, source, size, image, *args):
+        # Called from thumbnail worker thread
+        maya.utils.executeDeferred( partial( self.showLibThumb, name, source, size ) )
+
+    def showLibThumb(self, name, source, size, *args):
+        thumbPth = ThumbService.getService().path( source, size )
+        if thumbPth is None:
+            # source could not be decoded, placeholder stays
+            return
+        try:
+            items = self.listLibWidget.findItems( name, QtCore.Qt.MatchExactly )
+        except RuntimeError:
+            # window was closed while the thumbnail was being made
+            return
+        for item in items:
+            item.setIcon( QtGui.QIcon( thumbPth ) )
 
     # -------------------------------------------
     # Top2 - Functions in controller manager
-    def addNurbs(self, nurbs):
-        widget = ControllerManager( nurbs )
-        self.scrollLayout.addWidget( widget )
-        widget.onSolo.connect( self.onSolo )
+    def selectedManagerRows(self):
+        return sorted( set( [ index.row() for index in self.managerView.selectionModel().selectedIndexes() ] ) )
 
     def onSolo(self, value):
-        nurbsWidgets = self.findChildren( ControllerManager )
-        for widget in nurbsWidgets:
-            if widget != self.sender():
-                widget.disableNurbs( value )
+        if value:
+            self.managerModel.isolate( self.selectedManagerRows() )
+        else:
+            self.managerModel.showAll()
 
-    def populateManagerSection(self):
-        while self.scrollLayout.count():
-            widget = self.scrollLayout.takeAt( 0 ).widget()
-            if widget:
-                widget.setVisible( False )
-                widget.deleteLater()
+    def setManagerColor(self, index):
+        rows = self.selectedManagerRows()
+        if rows:
+            self.managerModel.setColor( rows, index )
 
-        for nurbs in pm.ls( type=[ 'nurbsCurve', 'nurbsSurface' ] ):
-            self.addNurbs( nurbs )
+    def deleteManagerRows(self):
+        rows = self.selectedManagerRows()
+        if rows:
+            self.managerModel.deleteRows( rows )
+
+    def populateManagerSection(self):
+        # rows follow the scene with callbacks, only what they show is read again
+        self.managerModel.refresh()
 
     # -------------------------------------------
     # Mid1 - Functions in quick assets
@@ -1556,20 +1494,24 @@ class DAMGtoolBoxII( QtWidgets.QWidget ):
         if not nurbsType:
             nurbsType = self.nurbsType2DCB.currentText()
 
-        func = toolBoxIIfuncs.ToolBoxIIfuncs
-        func( nurbsType )
-        nurbs = cmds.ls(sl=True)[0]
-        cmds.rename(nurbs, nurbsType)
-        self.populateAll()
+        self.createController(nurbsType)
 
     def create3DController(self, nurbsType=None, add=True):
         if not nurbsType:
             nurbsType = self.nurbsType3DCB.currentText()
 
-        func = toolBoxIIfuncs.ToolBoxIIfuncs
-        func( nurbsType )
-        nurbs = cmds.ls(sl=True)[0]
-        cmds.rename(nurbs, nurbsType)
+        self.createController(nurbsType)
+
+    def createController(self, nurbsType):
+        # one controller for every selected joint, in one undo step, otherwise one at the origin
+        joints = cmds.ls(sl=True, type='joint', long=True)
+        if joints:
+            ControllerBatch.createControllers(nurbsType, joints)
+        else:
+            func = toolBoxIIfuncs.ToolBoxIIfuncs
+            func( nurbsType )
+            nurbs = cmds.ls(sl=True)[0]
+            cmds.rename(nurbs, nurbsType)
         self.populateAll()
 
     # -------------------------------------------
@@ -9,6 +9,7 @@
 from maya import cmds
 import pymel.core as pm
 import maya, os, json, pprint, logging, time
+import maya.utils
 from functools import partial
 from maya.app.renderSetup.views.renderSetupButton import *
 from maya import OpenMayaUI as omui
@@ -23,6 +24,9 @@ from Maya_tk.plugins.Qt import QtWidgets, QtCore, QtGui
 # VARIALBES ARE USED BY ALL CLASSES
 # ------------------------------------------------------
 from Maya_tk.modules import MayaVariables as var
+from Maya_tk.modules import LibraryIndex
+from Maya_tk.modules import NodeModel
+from Maya_tk.modules import ThumbService
 
 NAMES = var.MAINVAR
 SCRPTH = os.path.join(os.getenv('PROGRAMDATA'), 'PipelineTool/scrInfo')
@@ -107,87 +111,6 @@ from Maya_tk.plugins.Qt.QtWidgets import *
 from Maya_tk.plugins.Qt.QtGui import *
 from Maya_tk.plugins.Qt.QtCore import *
 
-class LightManager(QtWidgets.QWidget):
-
-    onSolo = QtCore.Signal(bool)
-
-    def __init__(self, light):
-        super( LightManager, self ).__init__()
-        if isinstance(light, basestring):
-            light = pm.PyNode(light)
-
-        self.light = light
-        self.buildUI()
-
-    def buildUI(self):
-        layout = QtWidgets.QGridLayout(self)
-
-        self.name = QtWidgets.QCheckBox()
-        self.name.setChecked(self.light.visibility.get())
-        self.name.toggled.connect(lambda val: self.light.getTransform().visibility.set(val))
-
-        def setLightVisibility(val):
-            self.light.visibility.set(val)
-
-        layout.addWidget(self.name, 0, 0)
-        self.setName = QtWidgets.QLabel(str(self.light.getTransform()))
-        self.setName.setMinimumWidth(120)
-        layout.addWidget(self.setName, 0, 1)
-
-        soloBtn = QtWidgets.QPushButton('Solo')
-        soloBtn.setCheckable(True)
-        soloBtn.toggled.connect(lambda val: self.onSolo.emit(val))
-        soloBtn.setMinimumWidth(80)
-        layout.addWidget(soloBtn, 0, 2)
-
-        deleteBtn = QtWidgets.QPushButton('Delete')
-        deleteBtn.clicked.connect(self.deleteLight)
-        deleteBtn.setMinimumWidth(80)
-        layout.addWidget(deleteBtn, 0, 3)
-
-        intensity = QtWidgets.QSlider(QtCore.Qt.Horizontal)
-        intensity.setMinimum(0)
-        intensity.setMaximum(1000)
-        intensity.setMinimumWidth(160)
-        intensity.setValue(self.light.intensity.get())
-        intensity.valueChanged.connect(lambda val: self.light.intensity.set(val))
-        layout.addWidget(intensity, 0, 4, 1, 1)
-
-        self.colorBtn = QtWidgets.QPushButton()
-        self.colorBtn.setMinimumWidth(80)
-        self.colorBtn.clicked.connect(self.setColor)
-        layout.addWidget(self.colorBtn, 0, 5)
-
-    def setButtonColor(self, color=None):
-        if not color:
-            color = self.light.color.get()
-
-        assert len(color) == 3, "You must provide a list of 3 colors"
-
-        r,g,b = [c*255 for c in color]
-
-        self.colorBtn.setStyleSheet('background-color: rgba(%s, %s, %s, 1.0)' % (r,g,b))
-
-    def setColor(self):
-        lightColor = self.light.color.get()
-        color = pm.colorEditor(rgbValue=lightColor)
-
-        r,g,b,a = [float(c) for c in color.split()]
-        color = (r,g,b)
-
-        self.light.color.set(color)
-        self.setButtonColor(color)
-
-    def disableLight(self, value):
-        self.name.setChecked(not value)
-
-    def deleteLight(self):
-        self.setParent(None)
-        self.setVisible(False)
-        self.deleteLater()
-
-        pm.delete(self.light.getTransform())
-
 class LightLibrary(dict):
 
     def createDirectory(selfself, directory=DIRECTORY):
@@ -218,6 +141,7 @@ class LightLibrary(dict):
             json.dump( info, f, indent=4 )
 
         self[ name ] = info
+        LibraryIndex.getIndex( directory ).record( name, info )
 
     def remove(self, name, directory=DIRECTORY):
         mayapath = os.path.join(directory, '%s.ma' % name)
@@ -229,40 +153,25 @@ class LightLibrary(dict):
         for item in items:
             cmds.sysFile(item, delete=True)
 
+        self.pop(name, None)
+        LibraryIndex.getIndex(directory).forget(name)
+
     def reference(self, name, directory=DIRECTORY):
         mayapath = os.path.join(directory, '%s.ma' % name)
         cmds.file(mayapath, reference=True, usingNamespaces=False)
 
-    def find(self, directory=DIRECTORY):
+    def find(self, directory=DIRECTORY, force=False):
+        """
+        Items of the library folder, from its manifest: the folder is only listed when it changed and a .json
+        sidecar is only read when it changed
+        :param force: check every sidecar even if the folder did not change
+        """
         self.clear()
 
         if not os.path.exists( directory ):
             return
 
-        files = os.listdir( directory )
-        mayafiles = [ f for f in files if f.endswith( '.ma' ) ]
-
-        for ma in mayafiles:
-            name, ext = os.path.splitext( ma )
-            path = os.path.join( directory, ma )
-
-            infoFile = '%s.json' % name
-            if infoFile in files:
-                infoFile = os.path.join( directory, infoFile )
-
-                with open( infoFile, 'r' ) as f:
-                    info = json.load( f )
-            else:
-                info = {}
-
-            screenshot = '%s.jpg' % name
-            if screenshot in files:
-                info[ 'screenshot' ] = os.path.join( directory, name )
-
-            info[ 'name' ] = name
-            info[ 'path' ] = path
-
-            self[ name ] = info
+        self.update( LibraryIndex.getIndex( directory ).items( force ) )
 
     def load(self, name):
         path = self[ name ][ 'path' ]
@@ -275,6 +184,7 @@ class LightLibrary(dict):
         cf = cmds.currentTime(q=True)
         cmds.playblast(completeFilename=path, forceOverwrite=True, format='image', width=200, height=200,
                        showOrnaments=False, startTime=cf, endTime=cf, viewer=False)
+        ThumbService.getService().forget( path )
         return path
 
 class toolBoxIII(QtWidgets.QWidget):
@@ -386,14 +296,52 @@ class toolBoxIII(QtWidgets.QWidget):
 
         self.lightLibraryUI()
 
-        scrollWidget = QtWidgets.QWidget()
-        scrollWidget.setSizePolicy(QtWidgets.QSizePolicy.Maximum, QtWidgets.QSizePolicy.Maximum)
-        self.scrollLayout = QtWidgets.QVBoxLayout(scrollWidget)
+        # one view of every light, only the rows on screen are painted
+        managerWidget = QtWidgets.QWidget()
+        managerLayout = QtWidgets.QVBoxLayout(managerWidget)
+        managerLayout.setContentsMargins(QtCore.QMargins(0, 0, 0, 0))
+
+        lightTypes = [str(f) for f in self.mayaLights + pluginLights]
+        self.lightModel = NodeModel.LightModel(lightTypes, self)
+        self.lightView = QtWidgets.QListView()
+        self.lightView.setModel(self.lightModel)
+        self.lightView.setItemDelegate(NodeModel.ColorDelegate(self.lightView))
+        self.lightView.setUniformItemSizes(True)
+        self.lightView.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.lightView.setEditTriggers(QtWidgets.QAbstractItemView.DoubleClicked |
+                                       QtWidgets.QAbstractItemView.EditKeyPressed)
+        managerLayout.addWidget(self.lightView)
+
+        # tools of the selected lights
+        toolsLayout = QtWidgets.QHBoxLayout()
+
+        soloBtn = QtWidgets.QPushButton('Solo')
+        soloBtn.setCheckable(True)
+        soloBtn.toggled.connect(self.onSolo)
+        soloBtn.setMinimumWidth(80)
+        toolsLayout.addWidget(soloBtn)
+
+        deleteBtn = QtWidgets.QPushButton('Delete')
+        deleteBtn.clicked.connect(self.deleteLights)
+        deleteBtn.setMinimumWidth(80)
+        toolsLayout.addWidget(deleteBtn)
+
+        self.intensitySlider = QtWidgets.QSlider(QtCore.Qt.Horizontal)
+        self.intensitySlider.setMinimum(0)
+        self.intensitySlider.setMaximum(1000)
+        self.intensitySlider.setMinimumWidth(160)
+        # the intensity is set when the slider is released, one undo step
+        self.intensitySlider.setTracking(False)
+        self.intensitySlider.valueChanged.connect(self.setIntensity)
+        toolsLayout.addWidget(self.intensitySlider)
 
-        scrollArea = QtWidgets.QScrollArea()
-        scrollArea.setWidgetResizable(True)
-        scrollArea.setWidget(scrollWidget)
-        self.layout.addWidget(scrollArea, 1,0,1,5)
+        colorBtn = QtWidgets.QPushButton('Color')
+        colorBtn.setMinimumWidth(80)
+        colorBtn.clicked.connect(self.setColor)
+        toolsLayout.addWidget(colorBtn)
+
+        managerLayout.addLayout(toolsLayout)
+        self.layout.addWidget(managerWidget, 1,0,1,5)
 
     def lightLibraryUI(self):
         libraryLabel = QtWidgets.QLabel( '')
@@ -467,12 +415,10 @@ class toolBoxIII(QtWidgets.QWidget):
             cmds.confirmDialog(t='Warning', m='You must give a name', b='OK')
             return
 
-        files = [f for f in os.listdir(DIRECTORY)]
-
-        for file in files:
-            if name in file:
-                cmds.confirmDialog( t='Confirm', m='File %s already exists, override?' % name,
-                                    b=[ 'Yes', 'No' ], db='Yes', cb='No', dismissString='No' )
+        # the library knows its items, the folder is not listed again
+        if name in self.library:
+            cmds.confirmDialog( t='Confirm', m='File %s already exists, override?' % name,
+                                b=[ 'Yes', 'No' ], db='Yes', cb='No', dismissString='No' )
 
         self.library.save(name)
         self.saveNameField.setText('')
@@ -483,7 +429,7 @@ class toolBoxIII(QtWidgets.QWidget):
         if not currentItem:
             self.warningFunction( 'You must select something' )
             return
-        self.library.remove(currentItem)
+        self.library.remove(currentItem.text())
         self.populateAll()
 
     def loadItem(self):
@@ -508,14 +454,41 @@ class toolBoxIII(QtWidgets.QWidget):
         self.listLibWidget.clear()
         self.library.find()
 
+        iconSize = self.listLibWidget.iconSize()
+        size = (iconSize.width(), iconSize.height())
+        placeholder = QtGui.QPixmap(iconSize)
+        placeholder.fill(QtGui.QColor(60, 60, 60))
+        placeholder = QtGui.QIcon(placeholder)
+
         for name, info in self.library.items():
             item = QtWidgets.QListWidgetItem(name)
             self.listLibWidget.addItem(item)
 
             screenshot = info.get('screenshot')
             if screenshot:
-                icon = QtGui.QIcon(screenshot)
-                item.setIcon(icon)
+                # thumbnail is decoded and resized by thumbnail service, item shows a placeholder until it is ready
+                image = ThumbService.getService().request(screenshot, size, partial(self.onLibThumbReady, name))
+                if image is None:
+                    item.setIcon(placeholder)
+                else:
+                    item.setIcon(QtGui.QIcon(QtGui.QPixmap.fromImage(image)))
+
+    def onLibThumbReady(self, name, source, size, image, *args):
+        # Called from thumbnail worker thread
+        maya.utils.executeDeferred( partial( self.showLibThumb, name, source, size ) )
+
+    def showLibThumb(self, name, source, size, *args):
+        thumbPth = ThumbService.getService().path( source, size )
+        if thumbPth is None:
+            # source could not be decoded, placeholder stays
+            return
+        try:
+            items = self.listLibWidget.findItems( name, QtCore.Qt.MatchExactly )
+        except RuntimeError:
+            # window was closed while the thumbnail was being made
+            return
+        for item in items:
+            item.setIcon( QtGui.QIcon( thumbPth ) )
 
     def getMayaLight(self):
         for lightType in self.mayaLights:
@@ -608,28 +581,42 @@ class toolBoxIII(QtWidgets.QWidget):
         else:
             pass
 
-        light = func()
+        # the row of the new light is added by the callbacks of the model
+        func()
 
-        self.addLight( light )
-
-    def addLight(self, light):
-        widget = LightManager( light )
-        self.scrollLayout.addWidget( widget )
-        widget.onSolo.connect(self.onSolo)
+    def selectedLights(self):
+        return sorted(set([index.row() for index in self.lightView.selectionModel().selectedIndexes()]))
 
     def onSolo(self, value):
-        lightWidgets = self.findChildren( LightManager )
-        for widget in lightWidgets:
-            if widget != self.sender():
-                widget.disableLight(value)
+        if value:
+            self.lightModel.isolate(self.selectedLights())
+        else:
+            self.lightModel.showAll()
+
+    def setIntensity(self, value):
+        rows = self.selectedLights()
+        if rows:
+            self.lightModel.setIntensity(rows, value)
+
+    def setColor(self):
+        rows = self.selectedLights()
+        if not rows:
+            return
+        color = self.lightModel.index(rows[0]).data(NodeModel.ColorRole)
+        rgb = (color.redF(), color.greenF(), color.blueF()) if color is not None else (1.0, 1.0, 1.0)
+        color = pm.colorEditor(rgbValue=rgb)
+
+        r,g,b,a = [float(c) for c in color.split()]
+        self.lightModel.setLightColor(rows, (r,g,b))
+
+    def deleteLights(self):
+        rows = self.selectedLights()
+        if rows:
+            self.lightModel.deleteRows(rows)
 
     def populate(self):
-        while self.scrollLayout.count():
-            widget = self.scrollLayout.takeAt(0).widget()
-            if widget:
-                widget.setVisible(False)
-                widget.deleteLater()
-
-        type = [str(f) for f in self.mayaLights + typeMgr.pluginLights()]
-        for light in pm.ls(type=type):
-            self.addLight(light)
+        # rows follow the scene with callbacks, only what they show is read again
+        self.lightModel.refresh()
+
+    def populateManagerSection(self):
+        self.populate()
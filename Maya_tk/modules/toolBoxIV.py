@@ -18,7 +18,9 @@ from Maya_tk.plugins.Qt import QtWidgets, QtCore, QtGui
 # ------------------------------------------------------
 NAMES = var.MAINVAR
 MESSAGE = var.MESSAGE
-SCRPTH = os.path.join(os.getenv('PROGRAMDATA'), 'PipelineTool/scrInfo')
+# Same data folder as launcher: PROGRAMDATA on Windows, XDG data home on Linux
+SCRPTH = os.path.join(os.getenv('PROGRAMDATA') or os.getenv('XDG_DATA_HOME') or
+                      os.path.join(os.path.expanduser('~'), '.local', 'share'), 'PipelineTool/scrInfo')
 
 WINID = 'AppsManager'
 SUBID = 'Chosing version'
@@ -118,7 +120,8 @@ class toolBoxIV( object ):
         return cw
 
     def openApps(self, path, *args):
-        subprocess.Popen(path)
+        from tk import appDiscovery
+        appDiscovery.launch(path)
 
     def makeACoolButton(self, ann, image, command, *args):
         icon = geticon(image)
@@ -0,0 +1,62 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: controllerBatchCmd.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Maya plugin (API 2.0) of the command damgControllerBatch. The command runs a job of ControllerBatch.py:
+    controllers made with OpenMaya are not in the undo queue, the command puts the whole batch in it as one step.
+
+    It is loaded by ControllerBatch.loadPlugin, the command is not called by hand.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import maya.api.OpenMaya as om
+
+from Maya_tk.modules import ControllerBatch
+
+def maya_useNewAPI():
+    """
+    Tell maya this plugin uses the API 2.0
+    """
+    pass
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                 MAIN CLASS: CONTROLLER BATCH COMMAND                                      """
+# ----------------------------------------------------------------------------------------------------------- #
+class ControllerBatchCmd(om.MPxCommand):
+
+    def __init__(self):
+
+        super(ControllerBatchCmd, self).__init__()
+
+        self.job = None
+
+    @staticmethod
+    def creator():
+        return ControllerBatchCmd()
+
+    def doIt(self, args):
+        self.job = ControllerBatch.take()
+        self.redoIt()
+
+    def redoIt(self):
+        self.job.redo()
+        self.setResult(self.job.result)
+
+    def undoIt(self):
+        self.job.undo()
+
+    def isUndoable(self):
+        return True
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin, 'Do Trinh/Jimmy', '1.0').registerCommand(ControllerBatch.COMMAND, ControllerBatchCmd.creator)
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(ControllerBatch.COMMAND)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
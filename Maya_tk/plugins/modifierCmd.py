@@ -0,0 +1,61 @@
+# -*-coding:utf-8 -*
+"""
+Script Name: modifierCmd.py
+Author: Do Trinh/Jimmy - TD artist
+
+Description:
+    Maya plugin (API 2.0) of the command damgApplyModifier. The command runs a MDGModifier of NodeModel.py: edits
+    made with OpenMaya are not in the undo queue, the command puts all the edits of the modifier in it as one step.
+
+    It is loaded by NodeModel.loadPlugin, the command is not called by hand.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import maya.api.OpenMaya as om
+
+from Maya_tk.modules import NodeModel
+
+def maya_useNewAPI():
+    """
+    Tell maya this plugin uses the API 2.0
+    """
+    pass
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                   MAIN CLASS: APPLY MODIFIER COMMAND                                      """
+# ----------------------------------------------------------------------------------------------------------- #
+class ApplyModifierCmd(om.MPxCommand):
+
+    def __init__(self):
+
+        super(ApplyModifierCmd, self).__init__()
+
+        self.modifier = None
+
+    @staticmethod
+    def creator():
+        return ApplyModifierCmd()
+
+    def doIt(self, args):
+        self.modifier = NodeModel.take()
+        self.redoIt()
+
+    def redoIt(self):
+        self.modifier.doIt()
+
+    def undoIt(self):
+        self.modifier.undoIt()
+
+    def isUndoable(self):
+        return True
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin, 'Do Trinh/Jimmy', '1.0').registerCommand(NodeModel.COMMAND, ApplyModifierCmd.creator)
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(NodeModel.COMMAND)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                                END OF CODE                                              """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -13,6 +13,9 @@ Description:
 # IMPORT PYTHON MODULES
 # -------------------------------------------------------------------------------------------------------------
 import os, sys, logging, subprocess, json, shutil
+from tk import defaultVariable as var
+# PROGRAMDATA is read straight from environment by the tools which come next, on Linux it is not set
+var.exportDataRoot()
 from tk import appFuncs as func
 from tk import autoUpdate as update
 
@@ -33,11 +36,12 @@ scrInstall = os.getcwd()
 func.checkEnvKey(key, scrInstall, toolName)
 
 # Name of required packages which should be installed along with Anaconda
-packages = ['pywinauto', 'winshell', 'pandas']
+packages = ['pandas']
+if sys.platform.startswith('win'):
+    packages += ['pywinauto', 'winshell']
 
-# Check if packages are not installed, install it
-for pkg in packages:
-    func.checkPackageInstall(pkg)
+# Check if packages are not installed, install them together
+func.checkPackagesInstall(packages)
 
 # Create temporary database, this data will be replaced in the future when I have an online server.
 update.createTempData()
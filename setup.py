@@ -14,6 +14,7 @@ setup(
     packages=['', 'tk', 'ui', 'sql_tk', 'Mari_tk', 'Maya_tk', 'Maya_tk.modules', 'Maya_tk.modules.modeling',
               'Maya_tk.modules.sufacing', 'Maya_tk.plugins', 'Maya_tk.userLibrary',
               'Maya_tk.userLibrary.controllerLibrary', 'Nuke_tk', 'ZBrush_tk', 'Houdini_tk'],
+    package_data={'Maya_tk.modules': ['*.nrbs']},
     url='https://github.com/vtta2008/PipelineTool',
     license='internal share',
     author='Trinh Do (aka. Jimmy)',
@@ -1,74 +1,84 @@
-from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtSql import QSqlDatabase, QSqlQuery
+import os, sqlite3, logging, tempfile
 
+from sql_tk import dataAccess
 
-def createConnection():
-    db = QSqlDatabase.addDatabase('QSQLITE')
-    db.setDatabaseName(':memory:')
-    if not db.open():
-        QMessageBox.critical(None, "Cannot open database",
-                "Unable to establish a database connection.py.\n"
-                "This example needs SQLite support. Please read the Qt SQL "
-                "driver documentation for information how to build it.\n\n"
-                "Click Cancel to exit.",
-                QMessageBox.Cancel)
-        return False
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
 
-    query = QSqlQuery()
-    query.exec_("create table person(id int primary key, "
+# Demo database of the table editor
+DEMODB = os.path.join(tempfile.gettempdir(), 'sql_tk_demo.db')
+
+
+def createConnection(pth=None):
+    """
+    Open a database with dataAccess, python sqlite3 only so it works in maya and command line tools too
+    :param pth: path of database, the demo database with the person, offices and images tables if it is None
+    :return: DataAccess, None if the database can not be opened
+    """
+    try:
+        return dataAccess.DataAccess(pth or DEMODB, schema=None if pth else createTables)
+    except sqlite3.Error as e:
+        logger.error("Unable to open database %s: %s" % (pth or DEMODB, e))
+        return None
+
+
+def createTables(query):
+    if query.execute("select count(*) from sqlite_master where name = 'person'").fetchone()[0]:
+        return
+
+    query.execute("create table person(id int primary key, "
                 "firstname varchar(20), lastname varchar(20))")
-    query.exec_("insert into person values(101, 'Danny', 'Young')")
-    query.exec_("insert into person values(102, 'Christine', 'Holand')")
-    query.exec_("insert into person values(103, 'Lars', 'Gordon')")
-    query.exec_("insert into person values(104, 'Roberto', 'Robitaille')")
-    query.exec_("insert into person values(105, 'Maria', 'Papadopoulos')")
+    query.execute("insert into person values(101, 'Danny', 'Young')")
+    query.execute("insert into person values(102, 'Christine', 'Holand')")
+    query.execute("insert into person values(103, 'Lars', 'Gordon')")
+    query.execute("insert into person values(104, 'Roberto', 'Robitaille')")
+    query.execute("insert into person values(105, 'Maria', 'Papadopoulos')")
 
-    query.exec_("create table offices (id int primary key,"
+    query.execute("create table offices (id int primary key,"
                                              "imagefile int,"
                                              "location varchar(20),"
                                              "country varchar(20),"
                                              "description varchar(100))");
-    query.exec_("insert into offices "
+    query.execute("insert into offices "
                "values(0, 0, 'Oslo', 'Norway',"
                "'Oslo is home to more than 500 000 citizens and has a "
                "lot to offer.It has been called \"The city with the big "
                "heart\" and this is a nickname we are happy to live up to.')")
-    query.exec_("insert into offices "
+    query.execute("insert into offices "
                "values(1, 1, 'Brisbane', 'Australia',"
                "'Brisbane is the capital of Queensland, the Sunshine State, "
                "where it is beautiful one day, perfect the next.  "
                "Brisbane is Australia''s 3rd largest city, being home "
                "to almost 2 million people.')")
-    query.exec_("insert into offices "
+    query.execute("insert into offices "
                "values(2, 2, 'Redwood City', 'US',"
                "'You find Redwood City in the heart of the Bay Area "
                "just north of Silicon Valley. The largest nearby city is "
                "San Jose which is the third largest city in California "
                "and the 10th largest in the US.')")
-    query.exec_("insert into offices "
+    query.execute("insert into offices "
                "values(3, 3, 'Berlin', 'Germany',"
                "'Berlin, the capital of Germany is dynamic, cosmopolitan "
                "and creative, allowing for every kind of lifestyle. "
                "East meets West in the metropolis at the heart of a "
                "changing Europe.')")
-    query.exec_("insert into offices "
+    query.execute("insert into offices "
                "values(4, 4, 'Munich', 'Germany',"
                "'Several technology companies are represented in Munich, "
                "and the city is often called the \"Bavarian Silicon Valley\". "
                "The exciting city is also filled with culture, "
                "art and music. ')")
-    query.exec_("insert into offices "
+    query.execute("insert into offices "
                "values(5, 5, 'Beijing', 'China',"
                "'Beijing as a capital city has more than 3000 years of "
                "history. Today the city counts 12 million citizens, and "
                "is the political, economic and cultural centre of China.')")
 
-    query.exec_("create table images (locationid int, file varchar(20))")
-    query.exec_("insert into images values(0, 'images/oslo.png')")
-    query.exec_("insert into images values(1, 'images/brisbane.png')")
-    query.exec_("insert into images values(2, 'images/redwood.png')")
-    query.exec_("insert into images values(3, 'images/berlin.png')")
-    query.exec_("insert into images values(4, 'images/munich.png')")
-    query.exec_("insert into images values(5, 'images/beijing.png')")
-
-    return True
\ No newline at end of file
+    query.execute("create table images (locationid int, file varchar(20))")
+    query.execute("insert into images values(0, 'images/oslo.png')")
+    query.execute("insert into images values(1, 'images/brisbane.png')")
+    query.execute("insert into images values(2, 'images/redwood.png')")
+    query.execute("insert into images values(3, 'images/berlin.png')")
+    query.execute("insert into images values(4, 'images/munich.png')")
+    query.execute("insert into images values(5, 'images/beijing.png')")
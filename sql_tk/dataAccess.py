@@ -0,0 +1,366 @@
+# coding=utf-8
+"""
+Script Name: dataAccess.py
+Author: Do Trinh/Jimmy - 3D artist.
+
+Description:
+    Access to a SQLite database from many threads, with python sqlite3 only so maya, the launcher and command line
+    tools can all use it (Qt views sit on top of it with tableModel.py).
+
+        reads       every thread reads with its own connection, leased from a pool the first time the thread
+                    reads and given back when the thread is gone (or with releaseReader)
+        writes      go through a queue to one writer thread which owns the only write connection. Jobs waiting in
+                    the queue are committed together in one transaction, every job in its own savepoint so a job
+                    which fails does not undo the others.
+
+    The database is in WAL mode, readers see the last commit and never wait for the writer.
+
+        dal = DataAccess(pth)
+        dal.execute('INSERT INTO users (name) VALUES (?)', ('Annie',))
+        dal.executemany('INSERT INTO versions VALUES (?, ?, ?)', rows)
+        dal.fetchall('SELECT * FROM users WHERE class = ?', ('Artist',))
+
+    This module does not use Qt or maya.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, time, sqlite3, logging, threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+# Read connections of a database
+POOLSIZE = 8
+# Seconds a connection waits for a lock held by another process
+BUSYTIMEOUT = 10.0
+# Seconds between looks for connections of ended threads, when the pool is empty
+RECLAIMINTERVAL = 0.1
+# Statements kept prepared by every connection
+CACHEDSTATEMENTS = 128
+# Write jobs committed in one transaction
+WRITEBATCH = 64
+
+class PoolTimeout(Exception):
+    pass
+
+def connect(pth, readOnly=False, *args):
+    """
+    Open a connection, it may be used by another thread than the one which opened it
+    """
+    conn = sqlite3.connect(pth, timeout=BUSYTIMEOUT, check_same_thread=False, isolation_level=None,
+                           cached_statements=CACHEDSTATEMENTS)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys=ON')
+    if readOnly:
+        # a read connection used to write by mistake fails instead of competing with the writer
+        conn.execute('PRAGMA query_only=ON')
+    return conn
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                   SUB CLASS: CONNECTION POOL - READ CONNECTIONS                         """
+# ----------------------------------------------------------------------------------------------------------- #
+class ConnectionPool( object ):
+
+    def __init__(self, pth, size=POOLSIZE, reclaim=None):
+
+        super(ConnectionPool, self).__init__()
+
+        self.pth = pth
+        self.size = size
+        # called when the pool is empty, gives back connections of threads which are gone
+        self.reclaim = reclaim
+        self._idle = []
+        self._count = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=BUSYTIMEOUT):
+        deadline = time.time() + timeout
+        with self._cond:
+            while not self._idle and self._count >= self.size:
+                if self.reclaim is not None:
+                    self._cond.release()
+                    try:
+                        self.reclaim()
+                    finally:
+                        self._cond.acquire()
+                    if self._idle:
+                        break
+                left = deadline - time.time()
+                if left <= 0:
+                    raise PoolTimeout('No free connection to %s after %s seconds' % (self.pth, timeout))
+                # a thread which ends does not tell the pool, look for them again a while later
+                self._cond.wait(min(left, RECLAIMINTERVAL))
+            if self._idle:
+                return self._idle.pop()
+            self._count += 1
+
+        try:
+            return connect(self.pth, readOnly=True)
+        except sqlite3.Error:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._count -= len(self._idle)
+            self._idle = []
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                      SUB CLASS: WRITE JOB - RESULT OF A WRITE                           """
+# ----------------------------------------------------------------------------------------------------------- #
+class WriteJob( object ):
+
+    def __init__(self, func):
+
+        super(WriteJob, self).__init__()
+
+        self.func = func
+        # nobody waits for the result, an error is logged by the writer
+        self.detached = False
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """
+        :return: what the function of the job returned, its error is raised here
+        """
+        self.done.wait(timeout)
+        if not self.done.is_set():
+            raise PoolTimeout('Write job is not done after %s seconds' % timeout)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                    MAIN CLASS: DATA ACCESS - POOLED READS, QUEUED WRITES                """
+# ----------------------------------------------------------------------------------------------------------- #
+class DataAccess( object ):
+
+    def __init__(self, pth, poolSize=POOLSIZE, schema=None):
+        """
+        :param schema: function called with the write connection before the first job, to create tables
+        """
+        super(DataAccess, self).__init__()
+
+        self.pth = pth
+        folder = os.path.dirname(pth)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.pool = ConnectionPool(pth, poolSize, self.reclaim)
+        self._local = threading.local()
+        # thread: read connection leased to it
+        self._leases = {}
+        self._lock = threading.Lock()
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self.run, args=(schema,), name='DataAccessWriter')
+        self._writer.daemon = True
+        self._ready = WriteJob(None)
+        self._writer.start()
+        self._ready.wait()
+
+    # ------------------------------------------------------
+    # READS
+    # ------------------------------------------------------
+    def reader(self):
+        """
+        :return: read connection of this thread
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.pool.acquire()
+            self._local.conn = conn
+            with self._lock:
+                self._leases[threading.current_thread()] = conn
+        return conn
+
+    def releaseReader(self):
+        """
+        Give back the read connection of this thread, for threads which stay alive but stop reading
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                self._leases.pop(threading.current_thread(), None)
+            self.pool.release(conn)
+
+    def reclaim(self):
+        with self._lock:
+            gone = [thread for thread in self._leases if not thread.is_alive()]
+            conns = [self._leases.pop(thread) for thread in gone]
+        for conn in conns:
+            self.pool.release(conn)
+
+    def fetchall(self, sql, params=()):
+        """
+        :return: list of rows as dictionaries
+        """
+        return [dict(row) for row in self.reader().execute(sql, params)]
+
+    def fetchone(self, sql, params=()):
+        row = self.first(sql, params)
+        return dict(row) if row is not None else None
+
+    def scalar(self, sql, params=()):
+        row = self.first(sql, params)
+        return row[0] if row is not None else None
+
+    def first(self, sql, params=()):
+        # the cursor is closed at once, an unfinished statement would keep this thread on an old snapshot
+        cursor = self.reader().execute(sql, params)
+        try:
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    # ------------------------------------------------------
+    # WRITES
+    # ------------------------------------------------------
+    def transaction(self, func, wait=True):
+        """
+        Run a function with the write connection, in the writer thread
+        :param func: function of the connection, what it returns is the result of the job
+        :param wait: wait for the commit, otherwise return the job at once
+        :return: result of func, or WriteJob if wait is False
+        """
+        if threading.current_thread() is self._writer:
+            # a write job which writes more, it is already in a transaction
+            return func(self._conn)
+
+        job = WriteJob(func)
+        job.detached = not wait
+        self._queue.put(job)
+        return job.wait() if wait else job
+
+    def execute(self, sql, params=(), wait=True):
+        """
+        :return: number of changed rows
+        """
+        return self.transaction(lambda db: db.execute(sql, params).rowcount, wait)
+
+    def executemany(self, sql, rows, wait=True):
+        """
+        Batched write, the statement is prepared once and every row is written in the same transaction
+        """
+        rows = list(rows)
+        return self.transaction(lambda db: db.executemany(sql, rows).rowcount, wait)
+
+    def insertMany(self, table, columns, rows, replace=True, wait=True):
+        sql = 'INSERT %sINTO %s (%s) VALUES (%s)' % ('OR REPLACE ' if replace else '', table, ', '.join(columns),
+                                                      ', '.join(['?'] * len(columns)))
+        return self.executemany(sql, rows, wait)
+
+    def flush(self):
+        """
+        Wait until every write queued before is committed
+        """
+        self.transaction(lambda db: None)
+
+    def run(self, schema):
+        try:
+            self._conn = connect(self.pth)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            if schema is not None:
+                self._conn.execute('BEGIN IMMEDIATE')
+                try:
+                    schema(self._conn)
+                except BaseException:
+                    self._conn.execute('ROLLBACK')
+                    raise
+                self._conn.execute('COMMIT')
+        except Exception as e:
+            self._ready.error = e
+            self._ready.done.set()
+            return
+        self._ready.done.set()
+
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < WRITEBATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            jobs = [job for job in batch if job is not None]
+            if jobs:
+                self.commit(jobs)
+            if batch[-1] is None:
+                self._conn.close()
+                return
+
+    def commit(self, jobs):
+        conn = self._conn
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+        except sqlite3.Error as e:
+            for job in jobs:
+                job.error = e
+                job.done.set()
+            return
+
+        for job in jobs:
+            conn.execute('SAVEPOINT job')
+            try:
+                job.result = job.func(conn)
+                conn.execute('RELEASE job')
+            except Exception as e:
+                conn.execute('ROLLBACK TO job')
+                conn.execute('RELEASE job')
+                job.error = e
+
+        try:
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            logger.error('Can not commit %s write jobs to %s: %s' % (len(jobs), self.pth, e))
+            try:
+                conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+            for job in jobs:
+                if job.error is None:
+                    job.error = e
+
+        for job in jobs:
+            if job.detached and job.error is not None:
+                logger.error('Write to %s failed: %s' % (self.pth, job.error))
+            job.done.set()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self.releaseReader()
+        with self._lock:
+            conns = list(self._leases.values())
+            self._leases.clear()
+        for conn in conns:
+            self.pool.release(conn)
+        self.pool.close()
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                             END OF CODE                                                 """
+# ----------------------------------------------------------------------------------------------------------- #
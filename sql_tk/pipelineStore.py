@@ -0,0 +1,582 @@
+# coding=utf-8
+"""
+Script Name: pipelineStore.py
+Author: Do Trinh/Jimmy - 3D artist.
+
+Description:
+    SQLite store of pipeline data, in pipeline.db of info folder:
+
+        users           user.info, one row per user
+        productions     prodInfo/*.prod, with the users of every role in productionUsers
+        apps            apps.pipeline, installed apps and the pipeline apps of the launcher
+        versions        work, snapshot and publish scenes of the tasks of a production
+        comments        .comment sidecars of snapshots and publishes
+        settings        files which are a plain dictionary: env.os, webs.pipeline, maya.userInfo, maya.PluginPth,
+                        user.tempLog and the other sections of apps.pipeline
+
+    The database is opened with dataAccess.py: every thread reads with its own pooled connection and writes are
+    queued to one writer thread, so the launcher, maya and command line tools use it at the same time. Every query
+    is a constant statement with parameters, sqlite keeps it prepared in the statement cache of the connection.
+
+    The json files are imported by migrate(), a file or task folder which did not change since the last import
+    is skipped, so it is cheap to run when the launcher starts:
+
+        python -m sql_tk.pipelineStore migrate --prod E:/deep_sea
+        python -m sql_tk.pipelineStore stats
+
+    The json files are still the data which is written, the store is a mirror of them made at launch by update(),
+    once getData has rescanned the apps. A json file written during a session (a new production, a user account
+    edited) is in the store from the next launch, or the next migrate. Readers of the store fall back to the json
+    files when it has nothing, see lookup().
+
+    The .comment sidecars stay on the production share (a sidecar marks a complete publish), the store keeps a
+    copy so a comment is found without reading the file.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, sys, json, time, sqlite3, logging, argparse, threading
+
+from sql_tk import dataAccess
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+DBNAME = 'pipeline.db'
+SCHEMAVERSION = 1
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS users (
+        name TEXT PRIMARY KEY, uid INTEGER, password TEXT, class TEXT, avatar TEXT, fullName TEXT, title TEXT,
+        remember INTEGER NOT NULL DEFAULT 0)""",
+    """CREATE TABLE IF NOT EXISTS productions (
+        name TEXT PRIMARY KEY, title TEXT, path TEXT, length TEXT, fps TEXT, data TEXT)""",
+    """CREATE TABLE IF NOT EXISTS productionUsers (
+        production TEXT NOT NULL REFERENCES productions (name) ON DELETE CASCADE, user TEXT NOT NULL,
+        role TEXT NOT NULL, PRIMARY KEY (production, role, user))""",
+    """CREATE INDEX IF NOT EXISTS productionUsersByUser ON productionUsers (user)""",
+    """CREATE TABLE IF NOT EXISTS apps (
+        kind TEXT NOT NULL, name TEXT NOT NULL, label TEXT, icon TEXT, command TEXT, PRIMARY KEY (kind, name))""",
+    """CREATE TABLE IF NOT EXISTS versions (
+        path TEXT PRIMARY KEY, task TEXT NOT NULL, kind TEXT NOT NULL, base TEXT NOT NULL,
+        version INTEGER NOT NULL, revision INTEGER)""",
+    """CREATE INDEX IF NOT EXISTS versionsByTask ON versions (task, kind, base, version)""",
+    """CREATE TABLE IF NOT EXISTS comments (
+        stem TEXT PRIMARY KEY, task TEXT, name TEXT, comment TEXT, scene TEXT, image TEXT, data TEXT)""",
+    """CREATE INDEX IF NOT EXISTS commentsByTask ON comments (task)""",
+    """CREATE TABLE IF NOT EXISTS settings (
+        section TEXT NOT NULL, key TEXT NOT NULL, value TEXT, PRIMARY KEY (section, key))""",
+    """CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, mtime REAL, size INTEGER)""",
+]
+
+USERCOLUMNS = ['uid', 'password', 'class', 'avatar', 'fullName', 'title', 'remember']
+PRODCOLUMNS = ['name', 'path', 'length', 'fps']
+PRODROLES = ['Admin', 'Supervisor', 'Artist']
+
+SQL = dict(
+    user='SELECT * FROM users WHERE name = ?',
+    users='SELECT * FROM users ORDER BY name',
+    setUser='INSERT OR REPLACE INTO users (name, uid, password, class, avatar, fullName, title, remember) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+    clearUsers='DELETE FROM users',
+
+    production='SELECT * FROM productions WHERE name = ?',
+    productions='SELECT * FROM productions ORDER BY name',
+    productionUsers='SELECT role, user FROM productionUsers WHERE production = ? ORDER BY rowid',
+    userProductions='SELECT DISTINCT production FROM productionUsers WHERE user = ? ORDER BY production',
+    setProduction='INSERT OR REPLACE INTO productions (name, title, path, length, fps, data) '
+                  'VALUES (?, ?, ?, ?, ?, ?)',
+    clearProductionUsers='DELETE FROM productionUsers WHERE production = ?',
+    addProductionUser='INSERT OR IGNORE INTO productionUsers (production, role, user) VALUES (?, ?, ?)',
+    removeProduction='DELETE FROM productions WHERE name = ?',
+
+    app='SELECT * FROM apps WHERE kind = ? AND name = ?',
+    apps='SELECT * FROM apps WHERE kind = ? ORDER BY name',
+    setApp='INSERT OR REPLACE INTO apps (kind, name, label, icon, command) VALUES (?, ?, ?, ?, ?)',
+    clearApps='DELETE FROM apps WHERE kind = ?',
+
+    maxVersion='SELECT MAX(version) FROM versions WHERE task = ? AND kind = ? AND base = ?',
+    maxRevision='SELECT MAX(revision) FROM versions WHERE task = ? AND kind = ? AND base = ? AND version = ?',
+    taskVersions='SELECT * FROM versions WHERE task = ? AND kind = ? ORDER BY base, version, revision',
+    setVersion='INSERT OR REPLACE INTO versions (path, task, kind, base, version, revision) VALUES (?, ?, ?, ?, ?, ?)',
+    clearVersions='DELETE FROM versions WHERE task = ? AND kind = ?',
+
+    comment='SELECT * FROM comments WHERE stem = ?',
+    taskComments='SELECT * FROM comments WHERE task = ? ORDER BY stem',
+    setComment='INSERT OR REPLACE INTO comments (stem, task, name, comment, scene, image, data) '
+               'VALUES (?, ?, ?, ?, ?, ?, ?)',
+    clearComments='DELETE FROM comments WHERE task = ?',
+
+    setting='SELECT value FROM settings WHERE section = ? AND key = ?',
+    settings='SELECT key, value FROM settings WHERE section = ?',
+    setSetting='INSERT OR REPLACE INTO settings (section, key, value) VALUES (?, ?, ?)',
+    clearSettings='DELETE FROM settings WHERE section = ?',
+
+    source='SELECT mtime, size FROM sources WHERE path = ?',
+    setSource='INSERT OR REPLACE INTO sources (path, mtime, size) VALUES (?, ?, ?)',
+)
+
+# Files of info folder which are kept as settings, the section is the file name
+SETTINGFILES = ['env.os', 'webs.pipeline', 'maya.userInfo', 'maya.PluginPth']
+# Sections of apps.pipeline which are apps, the others are settings
+APPSECTIONS = ['apps', 'pipeline']
+
+def dbPth(*args):
+    from tk import appDiscovery
+    return os.path.join(appDiscovery.dataPth(), DBNAME)
+
+def normPth(pth, *args):
+    """
+    Key of a path in the store, '/' separated and without extension for comments
+    """
+    return os.path.normpath(pth).replace('\\', '/')
+
+def commentStem(pth, *args):
+    """
+    A comment is found from the path of its sidecar, scene or image: 'a/b_v001_r002.comment', '.ma' or '.jpg'
+    """
+    return os.path.splitext(normPth(pth))[0]
+
+def createSchema(db, *args):
+    """
+    Create the tables, it is run by the writer when the database is opened
+    """
+    version = db.execute('PRAGMA user_version').fetchone()[0]
+    if version >= SCHEMAVERSION:
+        return
+    for statement in SCHEMA:
+        db.execute(statement)
+    db.execute('PRAGMA user_version=%d' % SCHEMAVERSION)
+
+def fileStamp(pth, *args):
+    try:
+        st = os.stat(pth)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+def readJson(pth, *args):
+    try:
+        with open(pth, 'r') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError) as e:
+        logger.error('Can not read %s: %s' % (pth, e))
+        return None
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                  MAIN CLASS: PIPELINE STORE - SQLITE DATABASE                           """
+# ----------------------------------------------------------------------------------------------------------- #
+class PipelineStore( object ):
+
+    def __init__(self, pth=None):
+
+        super(PipelineStore, self).__init__()
+
+        self.pth = pth or dbPth()
+        self.dal = dataAccess.DataAccess(self.pth, schema=createSchema)
+
+    def close(self):
+        self.dal.close()
+
+    def query(self, name, *params):
+        return self.dal.reader().execute(SQL[name], params)
+
+    def one(self, name, *params):
+        return self.dal.fetchone(SQL[name], params)
+
+    def all(self, name, *params):
+        return self.dal.fetchall(SQL[name], params)
+
+    def scalar(self, name, *params):
+        return self.dal.scalar(SQL[name], params)
+
+    def write(self, name, *params):
+        return self.dal.execute(SQL[name], params)
+
+    # ------------------------------------------------------
+    # USERS
+    # ------------------------------------------------------
+    def user(self, name):
+        return self.one('user', name)
+
+    def users(self):
+        return self.all('users')
+
+    def userInfo(self, name):
+        """
+        :return: row of a user like in user.info: [uid, password, class, avatar, full name, title, remember]
+        """
+        row = self.user(name)
+        return None if row is None else [row[column] for column in USERCOLUMNS]
+
+    def userRow(self, name, values):
+        """
+        Row of a user of user.info: [uid, password, class, avatar, full name, title, remember]
+        """
+        values = list(values) + [None] * (len(USERCOLUMNS) - len(values))
+        values[6] = 1 if values[6] else 0
+        return [name] + values[:len(USERCOLUMNS)]
+
+    def setUser(self, name, values):
+        self.write('setUser', *self.userRow(name, values))
+
+    # ------------------------------------------------------
+    # PRODUCTIONS
+    # ------------------------------------------------------
+    def production(self, name):
+        """
+        :return: dictionary of a production with its users by role, like a .prod file
+        """
+        row = self.one('production', name)
+        if row is None:
+            return None
+        info = json.loads(row['data']) if row['data'] else {}
+        info.update(name=row['title'], path=row['path'], length=row['length'], fps=row['fps'])
+        for role in PRODROLES:
+            info[role] = []
+        for user in self.query('productionUsers', name):
+            info.setdefault(user['role'], []).append(user['user'])
+        return info
+
+    def productions(self):
+        return [row['name'] for row in self.query('productions')]
+
+    def productionTitles(self):
+        return [row['title'] for row in self.query('productions')]
+
+    def userProductions(self, user):
+        return [row['production'] for row in self.query('userProductions', user)]
+
+    def setProduction(self, name, info):
+        roles = dict([(k, v) for k, v in info.items() if isinstance(v, list)])
+        data = dict([(k, v) for k, v in info.items() if k not in roles and k not in PRODCOLUMNS])
+        users = [(name, role, user) for role in sorted(roles) for user in roles[role]]
+
+        def write(db):
+            db.execute(SQL['setProduction'], (name, info.get('name'), info.get('path'), info.get('length'),
+                                              info.get('fps'), json.dumps(data, sort_keys=True)))
+            db.execute(SQL['clearProductionUsers'], (name,))
+            db.executemany(SQL['addProductionUser'], users)
+        self.dal.transaction(write)
+
+    # ------------------------------------------------------
+    # APPS
+    # ------------------------------------------------------
+    def app(self, name, kind='pipeline'):
+        return self.one('app', kind, name)
+
+    def apps(self, kind='pipeline'):
+        return self.all('apps', kind)
+
+    def appInfo(self, kind='pipeline'):
+        """
+        :return: apps of a kind like the section of apps.pipeline {name: [label, icon, command]}
+        """
+        return dict([(row['name'], [row['label'], row['icon'], row['command']]) for row in self.apps(kind)])
+
+    def setApps(self, kind, apps):
+        """
+        Replace the apps of a kind
+        :param apps: 'apps' section of apps.pipeline {name: command}, or 'pipeline' {key: [label, icon, command]}
+        """
+        rows = []
+        for name, value in apps.items():
+            if isinstance(value, list):
+                value = list(value) + [None] * (3 - len(value))
+                rows.append((kind, name, value[0], value[1], value[2]))
+            else:
+                rows.append((kind, name, None, None, value))
+        def write(db):
+            db.execute(SQL['clearApps'], (kind,))
+            db.executemany(SQL['setApp'], rows)
+        self.dal.transaction(write)
+
+    # ------------------------------------------------------
+    # VERSIONS AND COMMENTS
+    # ------------------------------------------------------
+    def maxVersion(self, task, kind, base):
+        return self.scalar('maxVersion', normPth(task), kind, base)
+
+    def maxRevision(self, task, kind, base, version):
+        return self.scalar('maxRevision', normPth(task), kind, base, version)
+
+    def versions(self, task, kind):
+        return self.all('taskVersions', normPth(task), kind)
+
+    def setVersions(self, task, kind, files, wait=True):
+        """
+        Replace the versions of a task folder
+        :param files: list of (path, base, version, revision)
+        :param wait: wait for the commit
+        """
+        task = normPth(task)
+        rows = [(normPth(pth), task, kind, base, version, revision) for pth, base, version, revision in files]
+
+        def write(db):
+            db.execute(SQL['clearVersions'], (task, kind))
+            db.executemany(SQL['setVersion'], rows)
+        return self.dal.transaction(write, wait)
+
+    def comment(self, pth):
+        """
+        :param pth: path of a sidecar, scene or image
+        :return: dictionary like a .comment file, None if it is not known
+        """
+        row = self.one('comment', commentStem(pth))
+        if row is None:
+            return None
+        return json.loads(row['data'])
+
+    def taskComments(self, task):
+        return [json.loads(row['data']) for row in self.all('taskComments', normPth(task))]
+
+    def commentRow(self, pth, info, task=None):
+        return (commentStem(pth), normPth(task) if task else None, info.get('Name'), info.get('Comment'),
+                info.get('SnapShot'), info.get('Image'), json.dumps(info, sort_keys=True))
+
+    def setComment(self, pth, info, task=None):
+        self.write('setComment', *self.commentRow(pth, info, task))
+
+    def setComments(self, task, rows, wait=True):
+        """
+        Replace the comments of a task
+        :param rows: list of commentRow
+        """
+        task = normPth(task)
+
+        def write(db):
+            db.execute(SQL['clearComments'], (task,))
+            db.executemany(SQL['setComment'], rows)
+        return self.dal.transaction(write, wait)
+
+    # ------------------------------------------------------
+    # SETTINGS
+    # ------------------------------------------------------
+    def setting(self, section, key, default=None):
+        row = self.one('setting', section, key)
+        return json.loads(row['value']) if row is not None else default
+
+    def settings(self, section):
+        return dict([(row['key'], json.loads(row['value'])) for row in self.all('settings', section)])
+
+    def setSettings(self, section, values, replace=True):
+        rows = [(section, key, json.dumps(value, sort_keys=True)) for key, value in values.items()]
+
+        def write(db):
+            if replace:
+                db.execute(SQL['clearSettings'], (section,))
+            db.executemany(SQL['setSetting'], rows)
+        self.dal.transaction(write)
+
+    # ------------------------------------------------------
+    # MIGRATION OF JSON FILES
+    # ------------------------------------------------------
+    def changed(self, pth, force=False):
+        """
+        :return: (mtime, size) of a file or folder if it changed since its last import, None otherwise
+        """
+        stamp = fileStamp(pth)
+        if stamp is None:
+            return None
+        row = self.one('source', normPth(pth))
+        if not force and row is not None and (row['mtime'], row['size']) == stamp:
+            return None
+        return stamp
+
+    def imported(self, pth, stamp, wait=True):
+        return self.dal.execute(SQL['setSource'], (normPth(pth), stamp[0], stamp[1]), wait)
+
+    def migrate(self, infoDir=None, prodPths=(), force=False):
+        """
+        Import the json files of info folder, and the versions and comments of productions
+        :param prodPths: root folders of productions to import
+        :param force: import files which did not change too
+        :return: dictionary of number of imported files by kind
+        """
+        from tk import appDiscovery
+        infoDir = infoDir or appDiscovery.dataPth()
+        counts = dict(users=0, productions=0, apps=0, settings=0, tasks=0)
+        start = time.time()
+
+        pth = os.path.join(infoDir, 'user.info')
+        stamp = self.changed(pth, force)
+        if stamp:
+            users = readJson(pth)
+            if isinstance(users, dict):
+                rows = [self.userRow(name, users[name]) for name in users]
+
+                def write(db):
+                    db.execute(SQL['clearUsers'])
+                    db.executemany(SQL['setUser'], rows)
+                self.dal.transaction(write)
+                self.imported(pth, stamp)
+                counts['users'] += 1
+
+        counts['productions'] += self.migrateProductions(os.path.join(infoDir, 'prodInfo'), force)
+
+        pth = os.path.join(infoDir, 'apps.pipeline')
+        stamp = self.changed(pth, force)
+        if stamp:
+            info = readJson(pth)
+            if isinstance(info, dict):
+                for section in info:
+                    if section in APPSECTIONS:
+                        self.setApps(section, info[section])
+                    elif isinstance(info[section], dict):
+                        self.setSettings('apps.pipeline/%s' % section, info[section])
+                self.imported(pth, stamp)
+                counts['apps'] += 1
+
+        # user.tempLog is in the folder above info folder
+        for name in SETTINGFILES + [os.path.join(os.pardir, 'user.tempLog')]:
+            pth = os.path.normpath(os.path.join(infoDir, name))
+            stamp = self.changed(pth, force)
+            if stamp:
+                values = readJson(pth)
+                if isinstance(values, dict):
+                    self.setSettings(os.path.basename(pth), values)
+                    self.imported(pth, stamp)
+                    counts['settings'] += 1
+
+        for prodPth in prodPths:
+            counts['tasks'] += self.migrateTasks(prodPth, force)
+
+        logger.info('Imported %s in %.2f seconds' % (', '.join(['%s %s' % (counts[k], k) for k in sorted(counts)]),
+                                                    time.time() - start))
+        return counts
+
+    def migrateProductions(self, prodInfoPth, force=False):
+        if not os.path.isdir(prodInfoPth):
+            return 0
+
+        count = 0
+        names = set()
+        for f in sorted(os.listdir(prodInfoPth)):
+            if not f.endswith('.prod'):
+                continue
+            name = os.path.splitext(f)[0]
+            names.add(name)
+            pth = os.path.join(prodInfoPth, f)
+            stamp = self.changed(pth, force)
+            if stamp:
+                info = readJson(pth)
+                if isinstance(info, dict):
+                    self.setProduction(name, info)
+                    self.imported(pth, stamp)
+                    count += 1
+
+        # a production whose file was removed
+        removed = [(name,) for name in set(self.productions()) - names]
+        if removed:
+            self.dal.executemany(SQL['removeProduction'], removed)
+        return count
+
+    def migrateTasks(self, prodPth, force=False):
+        """
+        Import scene versions and snapshot comments of every task of a production, a task folder whose mtime did
+        not change is skipped
+        :return: number of task folders imported
+        """
+        from Maya_tk.modules import ProdTree, VersionRegistry
+
+        count = 0
+        for stage, taskPth in ProdTree.iterTasks(prodPth):
+            for kind, folder in sorted(VersionRegistry.FOLDERS.items()):
+                folderPth = os.path.join(taskPth, folder)
+                stamp = self.changed(folderPth, force)
+                if not stamp:
+                    continue
+
+                files = []
+                comments = []
+                for name, isDir in ProdTree.listDir(folderPth):
+                    if isDir:
+                        continue
+                    parsed = VersionRegistry.parse(name)
+                    if parsed is not None:
+                        files.append((os.path.join(folderPth, name),) + parsed)
+                    elif kind == 'snapShot' and name.endswith(ProdTree.COMMENTEXT):
+                        info = readJson(os.path.join(folderPth, name))
+                        if isinstance(info, dict):
+                            comments.append(self.commentRow(os.path.join(folderPth, name), info, taskPth))
+
+                # queued without waiting, the writer commits the folders of many tasks together
+                self.setVersions(taskPth, kind, files, wait=False)
+                if kind == 'snapShot':
+                    self.setComments(taskPth, comments, wait=False)
+                self.imported(folderPth, stamp, wait=False)
+                count += 1
+        self.dal.flush()
+        return count
+
+    def stats(self):
+        return dict([(table, self.dal.scalar('SELECT COUNT(*) FROM %s' % table)) for table in
+                     ['users', 'productions', 'apps', 'versions', 'comments', 'settings']])
+
+# ------------------------------------------------------
+# STORE OF THIS PROCESS
+# ------------------------------------------------------
+_STORE = []
+_STORELOCK = threading.Lock()
+
+def getStore(*args):
+    """
+    Get the store of this process, it is opened the first time it is asked for
+    :return: PipelineStore
+    """
+    with _STORELOCK:
+        if not _STORE:
+            _STORE.append(PipelineStore())
+        return _STORE[0]
+
+def update(*args):
+    """
+    Bring the store of this process up to date with the info files, errors are logged and the apps read the info
+    files until the store is updated again
+    :return: dictionary of number of imported files by kind, None if the store can not be updated
+    """
+    try:
+        return getStore().migrate()
+    except (sqlite3.Error, IOError, OSError) as e:
+        logger.error('Can not update pipeline store: %s' % e)
+        return None
+
+def lookup(name, *params):
+    """
+    Call a lookup of the store of this process, a store which can not be read gives None so the caller can read
+    the info files instead
+    """
+    try:
+        return getattr(getStore(), name)(*params)
+    except (sqlite3.Error, IOError, OSError) as e:
+        logger.error('Pipeline store is not available: %s' % e)
+        return None
+
+def main(argv=None, *args):
+    parser = argparse.ArgumentParser(description='Pipeline store')
+    parser.add_argument('command', choices=['migrate', 'stats'])
+    parser.add_argument('--db', default=None, help='path of database (default: %s in info folder)' % DBNAME)
+    parser.add_argument('--info', default=None, help='info folder to import (default: PipelineTool/scrInfo)')
+    parser.add_argument('--prod', nargs='*', default=[], help='root folders of productions to import')
+    parser.add_argument('--force', action='store_true', help='import files which did not change too')
+    options = parser.parse_args(argv)
+
+    store = PipelineStore(options.db)
+    try:
+        if options.command == 'migrate':
+            store.migrate(options.info, options.prod, options.force)
+        sys.stdout.write(json.dumps(store.stats(), indent=4, sort_keys=True) + '\n')
+    finally:
+        store.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                             END OF CODE                                                 """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -1,22 +1,19 @@
 from PyQt5.QtCore import *
-from PyQt5.QtSql import *
 from PyQt5.QtWidgets import *
 
 from sql_tk import connection
+from sql_tk.tableModel import DataTableModel
 
 
 class TableEditor(QDialog):
-    def __init__(self, tableName, parent=None):
+    def __init__(self, dal, tableName, headers=(), parent=None):
         super(TableEditor, self).__init__(parent)
 
-        self.model = QSqlTableModel(self)
-        self.model.setTable(tableName)
-        self.model.setEditStrategy(QSqlTableModel.OnManualSubmit)
-        self.model.select()
+        # edits are kept by the model until submit
+        self.model = DataTableModel(dal, tableName, self)
 
-        self.model.setHeaderData(0, Qt.Horizontal, "ID")
-        self.model.setHeaderData(1, Qt.Horizontal, "First name")
-        self.model.setHeaderData(2, Qt.Horizontal, "Last name")
+        for column, header in enumerate(headers):
+            self.model.setHeaderData(column, Qt.Horizontal, header)
 
         view = QTableView()
         view.setModel(self.model)
@@ -43,13 +40,10 @@ class TableEditor(QDialog):
         self.setWindowTitle("Cached Table")
 
     def submit(self):
-        self.model.database().transaction()
-        if self.model.submitAll():
-            self.model.database().commit()
-        else:
-            self.model.database().rollback()
+        # the edits are written in one transaction, nothing is written if one of them fails
+        if not self.model.submitAll():
             QMessageBox.warning(self, "Cached Table",
-                        "The database reported an error: %s" % self.model.lastError().text())
+                        "The database reported an error: %s" % self.model.lastError())
 
 
 if __name__ == '__main__':
@@ -57,10 +51,17 @@ if __name__ == '__main__':
     import sys
 
     app = QApplication(sys.argv)
-    if not connection.createConnection():
+    dal = connection.createConnection()
+    if dal is None:
+        QMessageBox.critical(None, "Cannot open database",
+                "Unable to establish a database connection.\n\n"
+                "Click Cancel to exit.",
+                QMessageBox.Cancel)
         sys.exit(1)
 
-    editor = TableEditor('person')
+    editor = TableEditor(dal, 'person', ["ID", "First name", "Last name"])
     editor.show()
-    sys.exit(editor.exec_())
+    code = editor.exec_()
+    dal.close()
+    sys.exit(code)
 
@@ -0,0 +1,163 @@
+# coding=utf-8
+"""
+Script Name: tableModel.py
+Author: Do Trinh/Jimmy - 3D artist.
+
+Description:
+    Qt table model of a table of a dataAccess.DataAccess, it takes the place of QSqlTableModel so a Qt view shows
+    the same database as maya and the command line tools, without QSqlDatabase.
+
+    Rows are fetched by pages of FETCHSIZE when the view scrolls, edits are kept until submitAll writes them in one
+    transaction of the writer (like QSqlTableModel.OnManualSubmit), revertAll drops them.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import logging
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+# Rows fetched when the view needs more
+FETCHSIZE = 256
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                  MAIN CLASS: DATA TABLE MODEL - TABLE OF DATA ACCESS                      """
+# ----------------------------------------------------------------------------------------------------------- #
+class DataTableModel(QAbstractTableModel):
+
+    def __init__(self, dal, tableName, parent=None):
+
+        super(DataTableModel, self).__init__(parent)
+
+        self.dal = dal
+        self.tableName = None
+        self.columns = []
+        self.headers = {}
+        self.rows = []
+        self.rowids = []
+        # (rowid, column): value edited but not submitted
+        self.pending = {}
+        self.error = ''
+        self.atEnd = True
+        self.setTable(tableName)
+
+    def setTable(self, tableName):
+        names = [row['name'] for row in self.dal.fetchall("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        if tableName not in names:
+            raise ValueError('No table %s in %s' % (tableName, self.dal.pth))
+        self.tableName = tableName
+        self.columns = [row['name'] for row in self.dal.fetchall('PRAGMA table_info("%s")' % tableName)]
+        self.select()
+
+    def select(self):
+        self.beginResetModel()
+        self.rows = []
+        self.rowids = []
+        self.pending = {}
+        self.atEnd = False
+        self.fetch()
+        self.endResetModel()
+        return True
+
+    def fetch(self):
+        """
+        :return: rows of the next page, after the last rowid fetched
+        """
+        sql = 'SELECT rowid AS __rowid, %s FROM "%s" %%s ORDER BY rowid LIMIT ?' % (
+            ', '.join(['"%s"' % c for c in self.columns]), self.tableName)
+        if self.rowids:
+            page = self.dal.fetchall(sql % 'WHERE rowid > ?', (self.rowids[-1], FETCHSIZE))
+        else:
+            page = self.dal.fetchall(sql % '', (FETCHSIZE,))
+        self.atEnd = len(page) < FETCHSIZE
+        self.rowids += [row['__rowid'] for row in page]
+        self.rows += [[row[c] for c in self.columns] for row in page]
+        return page
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.atEnd
+
+    def fetchMore(self, parent=QModelIndex()):
+        first = len(self.rows)
+        page = self.fetch()
+        if page:
+            self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+            self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        key = (self.rowids[index.row()], index.column())
+        if key in self.pending:
+            return self.pending[key]
+        return self.rows[index.row()][index.column()]
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        self.pending[(self.rowids[index.row()], index.column())] = value
+        self.dataChanged.emit(index, index)
+        return True
+
+    def flags(self, index):
+        return super(DataTableModel, self).flags(index) | Qt.ItemIsEditable
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and section < len(self.columns):
+            return self.headers.get(section, self.columns[section])
+        return super(DataTableModel, self).headerData(section, orientation, role)
+
+    def setHeaderData(self, section, orientation, value, role=Qt.EditRole):
+        if orientation != Qt.Horizontal:
+            return False
+        self.headers[section] = value
+        self.headerDataChanged.emit(orientation, section, section)
+        return True
+
+    def submitAll(self):
+        """
+        Write the edits in one transaction
+        :return: True if they are written, the error is in lastError otherwise
+        """
+        if not self.pending:
+            return True
+        updates = [('UPDATE "%s" SET "%s" = ? WHERE rowid = ?' % (self.tableName, self.columns[column]),
+                    (value, rowid)) for (rowid, column), value in sorted(self.pending.items())]
+
+        def write(db):
+            for sql, params in updates:
+                db.execute(sql, params)
+        try:
+            self.dal.transaction(write)
+        except Exception as e:
+            self.error = str(e)
+            logger.error('Can not write %s: %s' % (self.tableName, e))
+            return False
+
+        self.error = ''
+        return self.select()
+
+    def revertAll(self):
+        self.beginResetModel()
+        self.pending = {}
+        self.endResetModel()
+
+    def lastError(self):
+        return self.error
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                             END OF CODE                                                 """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,336 @@
+# coding=utf-8
+"""
+Script Name: appDiscovery.py
+Author: Do Trinh/Jimmy - 3D artist.
+
+Description:
+    Find the apps installed on local pc. Every platform has a backend:
+
+        WindowsBackend      shortcuts (.lnk) of Start Menu, read with winshell
+        LinuxBackend        XDG .desktop files of application folders and executables on $PATH
+
+    A backend gives a dictionary {app name: command}, a stamp which changes when installed apps change (used by
+    getData to skip an unchanged scan), the desktop folder, and starts the command of an app with launch().
+
+    The Linux backend keeps a catalog file next to apps.pipeline. A folder whose mtime did not change is not
+    listed or parsed again, so launcher and other tools share the same catalog and only read what changed.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, sys, json, shlex, logging, threading, subprocess
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+CATALOGNAME = 'apps.catalog'
+CATALOGVERSION = 1
+
+DESKTOPGROUP = '[Desktop Entry]'
+# Field codes of Exec key, see freedesktop desktop entry specification
+FIELDCODES = ['%f', '%F', '%u', '%U', '%d', '%D', '%n', '%N', '%i', '%c', '%k', '%v', '%m']
+
+def dataRoot(*args):
+    """
+    Folder which holds PipelineTool data: PROGRAMDATA on Windows, XDG data home on Linux
+    """
+    return os.getenv('PROGRAMDATA') or os.getenv('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'),
+                                                                                   '.local', 'share')
+
+def dataPth(*args):
+    return os.path.join(dataRoot(), 'PipelineTool', 'scrInfo')
+
+def folderStamp(pth, *args):
+    try:
+        return os.stat(pth).st_mtime
+    except OSError:
+        return None
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                SUB CLASS: APP BACKEND - INTERFACE                                       """
+# ----------------------------------------------------------------------------------------------------------- #
+class AppBackend( object ):
+
+    name = None
+
+    @classmethod
+    def available(cls):
+        return False
+
+    def apps(self):
+        """
+        :return: dictionary {app name: command}
+        """
+        raise NotImplementedError
+
+    def stamp(self):
+        """
+        :return: json serializable value which changes when installed apps change
+        """
+        raise NotImplementedError
+
+    def desktop(self):
+        return os.path.join(os.path.expanduser('~'), 'Desktop')
+
+    def launchable(self, pth, package):
+        """
+        Check if the command of an app starts a program
+        """
+        return True
+
+    def launch(self, command):
+        """
+        Start the command of an app, a command line with arguments is split like a shell does
+        :return: subprocess.Popen
+        """
+        return subprocess.Popen(shlex.split(command))
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                              SUB CLASS: WINDOWS BACKEND - START MENU SHORTCUTS                          """
+# ----------------------------------------------------------------------------------------------------------- #
+class WindowsBackend( AppBackend ):
+
+    name = 'windows'
+
+    @classmethod
+    def available(cls):
+        return sys.platform.startswith('win')
+
+    def programs(self):
+        import winshell
+        return winshell.programs(common=1)
+
+    def apps(self):
+        import winshell
+        all_programs = self.programs()
+        appInfo = {}
+        for dirpath, dirnames, filenames in sorted(os.walk(all_programs)):
+            for f in sorted(filenames):
+                lnk = winshell.shortcut(os.path.join(dirpath, f))
+                name, _ = os.path.splitext(os.path.basename(lnk.lnk_filepath))
+                # when a name is found twice the first shortcut is kept
+                if name not in appInfo:
+                    appInfo[name] = lnk.path
+        return appInfo
+
+    def stamp(self):
+        # a shortcut added or removed changes the mtime of its folder
+        all_programs = self.programs()
+        return sorted([(dirpath[len(all_programs):], folderStamp(dirpath)) for dirpath, dirnames, filenames in
+                       os.walk(all_programs)])
+
+    def desktop(self):
+        import winshell
+        return winshell.desktop()
+
+    def launchable(self, pth, package):
+        return pth.endswith(package['ext'][0])
+
+    def launch(self, command):
+        # target of a shortcut, a path which may have spaces, windows splits a command line itself
+        return subprocess.Popen(command)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                           SUB CLASS: LINUX BACKEND - XDG DESKTOP FILES AND PATH                         """
+# ----------------------------------------------------------------------------------------------------------- #
+class LinuxBackend( AppBackend ):
+
+    name = 'linux'
+
+    def __init__(self, catalogPth=None):
+
+        super(LinuxBackend, self).__init__()
+
+        self.catalogPth = catalogPth
+        self._lock = threading.Lock()
+
+    @classmethod
+    def available(cls):
+        return not sys.platform.startswith('win')
+
+    def appFolders(self):
+        """
+        :return: application folders of XDG data dirs, the first one wins when a file is in several of them
+        """
+        home = os.getenv('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+        dirs = [home] + (os.getenv('XDG_DATA_DIRS') or '/usr/local/share:/usr/share').split(os.pathsep)
+        return [os.path.join(d, 'applications') for d in dirs if d]
+
+    def pathFolders(self):
+        folders = []
+        for d in (os.getenv('PATH') or '').split(os.pathsep):
+            if d and d not in folders:
+                folders.append(d)
+        return folders
+
+    def stamp(self):
+        return [(d, folderStamp(d)) for d in self.appFolders() + self.pathFolders()]
+
+    def readCatalog(self):
+        pth = self.catalogPth or os.path.join(dataPth(), CATALOGNAME)
+        try:
+            with open(pth, 'r') as f:
+                catalog = json.load(f)
+        except (IOError, OSError, ValueError):
+            catalog = {}
+        if catalog.get('version') != CATALOGVERSION:
+            catalog = dict(version=CATALOGVERSION, desktop={}, path={})
+        return catalog
+
+    def writeCatalog(self, catalog):
+        pth = self.catalogPth or os.path.join(dataPth(), CATALOGNAME)
+        tmp = '%s.%s.tmp' % (pth, os.getpid())
+        try:
+            if not os.path.exists(os.path.dirname(pth)):
+                os.makedirs(os.path.dirname(pth))
+            with open(tmp, 'w') as f:
+                json.dump(catalog, f, indent=4)
+            if hasattr(os, 'replace'):
+                os.replace(tmp, pth)
+            else:
+                os.rename(tmp, pth)
+        except (IOError, OSError) as e:
+            logger.error('Can not write app catalog %s: %s' % (pth, e))
+
+    def parseDesktopFile(self, pth):
+        """
+        :return: (name, command) of an application entry, None if it is not shown as an app
+        """
+        entry = {}
+        group = None
+        try:
+            with open(pth, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    if line.startswith('['):
+                        group = line
+                        continue
+                    if group != DESKTOPGROUP or '=' not in line:
+                        continue
+                    key, value = line.split('=', 1)
+                    entry[key.strip()] = value.strip()
+        except (IOError, OSError, UnicodeDecodeError):
+            return None
+
+        if entry.get('Type', 'Application') != 'Application' or not entry.get('Exec') or not entry.get('Name'):
+            return None
+        if entry.get('NoDisplay') == 'true' or entry.get('Hidden') == 'true':
+            return None
+
+        command = entry['Exec']
+        for code in FIELDCODES:
+            command = command.replace(code, '')
+        command = ' '.join(command.replace('%%', '%').split())
+        return entry['Name'], command
+
+    def scanFolder(self, catalog, kind, folder):
+        """
+        Get the entries of a folder from catalog, the folder is only read again when its mtime changed
+        :param kind: 'desktop' or 'path'
+        :return: list of [name, command]
+        """
+        mtime = folderStamp(folder)
+        cached = catalog[kind].get(folder)
+        if mtime is None:
+            catalog[kind].pop(folder, None)
+            return []
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        entries = []
+        try:
+            names = sorted(os.listdir(folder))
+        except OSError:
+            names = []
+
+        for f in names:
+            pth = os.path.join(folder, f)
+            if kind == 'desktop':
+                if f.endswith('.desktop'):
+                    parsed = self.parseDesktopFile(pth)
+                    if parsed is not None:
+                        entries.append(list(parsed))
+            elif os.path.isfile(pth) and os.access(pth, os.X_OK):
+                entries.append([f, pth])
+
+        catalog[kind][folder] = [mtime, entries]
+        catalog['changed'] = True
+        logger.debug('Catalogued %s (%s apps)' % (folder, len(entries)))
+        return entries
+
+    def apps(self):
+        with self._lock:
+            catalog = self.readCatalog()
+            catalog['changed'] = False
+
+            appInfo = {}
+            # desktop entries first, they have the names artists know apps by
+            for kind, folders in [('desktop', self.appFolders()), ('path', self.pathFolders())]:
+                for folder in folders:
+                    for name, command in self.scanFolder(catalog, kind, folder):
+                        if name not in appInfo:
+                            appInfo[name] = command
+
+            if catalog.pop('changed'):
+                self.writeCatalog(catalog)
+            return appInfo
+
+    def desktop(self):
+        # XDG user dirs, ~/Desktop if it is not set
+        config = os.path.join(os.getenv('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config'),
+                              'user-dirs.dirs')
+        try:
+            with open(config, 'r') as f:
+                for line in f:
+                    if line.startswith('XDG_DESKTOP_DIR='):
+                        value = line.split('=', 1)[1].strip().strip('"')
+                        return os.path.expandvars(value.replace('$HOME', os.path.expanduser('~')))
+        except (IOError, OSError):
+            pass
+        return super(LinuxBackend, self).desktop()
+
+# ------------------------------------------------------
+# BACKEND OF LOCAL PC
+# ------------------------------------------------------
+BACKENDS = [WindowsBackend, LinuxBackend]
+
+_BACKEND = []
+_BACKENDLOCK = threading.Lock()
+
+def registerBackend(cls, *args):
+    """
+    Add a backend, backends registered later are tried first
+    """
+    BACKENDS.insert(0, cls)
+
+def getBackend(*args):
+    """
+    Get the backend of local pc, it is created the first time it is asked for and shared after
+    :return: AppBackend
+    """
+    with _BACKENDLOCK:
+        if not _BACKEND:
+            for cls in BACKENDS:
+                if cls.available():
+                    logger.debug('Using %s app backend' % cls.name)
+                    _BACKEND.append(cls())
+                    break
+            else:
+                raise RuntimeError('No app backend for %s' % sys.platform)
+        return _BACKEND[0]
+
+def launch(command, *args):
+    """
+    Start the command of an app with the backend of local pc
+    """
+    return getBackend().launch(command)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                             END OF CODE                                                 """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -9,8 +9,10 @@ Description:
 # -------------------------------------------------------------------------------------------------------------
 # IMPORT PYTHON MODULES
 # -------------------------------------------------------------------------------------------------------------
-import os, sys, logging, json, subprocess, pip, uuid, unicodedata, datetime
+import os, re, sys, logging, json, subprocess, threading, uuid, unicodedata, datetime
 from tk import defaultVariable as var
+from tk import eventLog
+from sql_tk import pipelineStore
 
 # ------------------------------------------------------
 # DEFAULT VARIABLES
@@ -59,34 +61,93 @@ def dataHandle(filePath, mode, indent=4, *args):
         with open(filePath, mode) as f:
             return json.dump(filePath, f, indent=indent)
 
-def getAllInstalledPythonPackage(*args):
-    pyPkgs = {}
-
-    pyPkgs['__mynote__'] = 'import pip; pip.get_installed_distributions()'
-
-    for package in pip.get_installed_distributions():
-        name = package.project_name # SQLAlchemy, Django, Flask-OAuthlib
-        key = package.key # sqlalchemy, django, flask-oauthlib
-        module_name = package._get_metadata("top_level.txt") # sqlalchemy, django, flask_oauthlib
-        location = package.location # virtualenv lib directory etc.
-        version = package.version # version number
+# ------------------------------------------------------
+# INSTALLED PYTHON PACKAGES
+# ------------------------------------------------------
+# Snapshot of installed distributions, read once and shared by every check
+_PYPKGS = {}
+_PYPKGSLOCK = threading.Lock()
 
-        pyPkgs[name] = [key, version, location]
+def packageKey(name, *args):
+    """
+    Normalized name of a distribution (PEP 503): Flask_OAuthlib, flask.oauthlib -> flask-oauthlib
+    """
+    return re.sub(r'[-_.]+', '-', name).lower()
 
-    pkgInfo = os.path.join(os.getenv('PROGRAMDATA'), 'PipelineTool/scrInfo/apps.pipeline')
+def installedDistributions(*args):
+    """
+    Read every installed distribution with importlib.metadata, pkg_resources on python which does not have it
+    :return: list of (name, version, location)
+    """
+    try:
+        from importlib import metadata
+    except ImportError:
+        try:
+            import importlib_metadata as metadata
+        except ImportError:
+            metadata = None
+
+    if metadata is None:
+        import pkg_resources
+        return [(d.project_name, d.version, d.location) for d in pkg_resources.working_set]
+
+    dists = []
+    for dist in metadata.distributions():
+        name = dist.metadata['Name']
+        if name:
+            dists.append((name, dist.version, str(dist.locate_file(''))))
+    return dists
+
+def getAllInstalledPythonPackage(refresh=False, *args):
+    """
+    Snapshot of installed python packages, it is made the first time it is asked for (or with refresh) and saved
+    to pkgs.pipeline in info folder
+    :return: dictionary {name: [key, version, location]}
+    """
+    with _PYPKGSLOCK:
+        if _PYPKGS and not refresh:
+            return _PYPKGS
 
-    print pkgInfo, os.path.exists(pkgInfo)
+        pyPkgs = {}
+        for name, version, location in installedDistributions():
+            pyPkgs[name] = [packageKey(name), version, location]
 
-    if not os.path.exists(pkgInfo):
-        from tk import getData
-        reload(getData)
-        getData.initialize()
+        _PYPKGS.clear()
+        _PYPKGS.update(pyPkgs)
 
+    pkgInfo = os.path.join(var.ensureInfoDir(), NAMES['pkgs'])
     with open(pkgInfo, 'w') as f:
-        json.dump(pyPkgs, f, indent=4)
+        json.dump(dict(pyPkgs, __mynote__='importlib.metadata.distributions()'), f, indent=4)
 
     return pyPkgs
 
+def findModule(name, *args):
+    """
+    Check if a module can be imported without importing it
+    """
+    try:
+        from importlib.util import find_spec
+    except ImportError:
+        import pkgutil
+        try:
+            return pkgutil.find_loader(name) is not None
+        except ImportError:
+            return False
+
+    try:
+        return find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+def isPackageInstalled(name, *args):
+    """
+    A package whose module can be found is installed, only other names are looked up in the snapshot
+    """
+    if findModule(name.replace('-', '_')):
+        return True
+    key = packageKey(name)
+    return any(info[0] == key for info in getAllInstalledPythonPackage().values())
+
 # Execute a python file
 def executing(name, path, *args):
     """
@@ -100,33 +161,73 @@ def executing(name, path, *args):
     if os.path.exists(pth):
         subprocess.call([sys.executable, pth])
 
-# Install package via pip command (cmd)
+# Install packages via pip of this python
+def install_packages(names, *args):
+    """
+    Install python components with one pip call, if it fails they are installed one by one so one bad name does
+    not stop the others
+    :param names: list of names of component
+    :return: True if every component is installed
+    """
+    names = list(names)
+    if not names:
+        return True
+
+    logger.info( 'Using pip to install %s' % ', '.join(names) )
+
+    ok = subprocess.call([sys.executable, '-m', 'pip', 'install'] + names) == 0
+    if not ok and len(names) > 1:
+        logger.info( 'pip could not install them together, installing one by one' )
+        ok = all([subprocess.call([sys.executable, '-m', 'pip', 'install', name]) == 0 for name in names])
+
+    # new packages are not seen by import finders until their caches are dropped
+    import importlib
+    if hasattr(importlib, 'invalidate_caches'):
+        importlib.invalidate_caches()
+    getAllInstalledPythonPackage(refresh=True)
+    return ok
+
 def install_package(name, *args):
     """
     Install python component via command prompt
     :param name: name of component
     :return:
     """
-    logger.info( 'Using pip to install %s' % name )
+    return install_packages([name])
 
-    subprocess.Popen('pip install %s' % name, shell=True).wait()
+# Check plugins are installed or not
+def checkPackagesInstall(names, *args):
+    """
+    check python components, the missing ones are installed together
+    :param names: list of names of component
+    :return: list of names which are still not installed
+    """
+    missing = []
+    for name in names:
+        if isPackageInstalled(name):
+            logger.info('package "%s" is already installed' % name)
+        else:
+            missing.append(name)
+
+    if not missing:
+        return []
+
+    logger.info('packages "%s" are not installed, '
+                'execute package installation procedural' % '", "'.join(missing))
+    install_packages(missing)
+
+    missing = [name for name in missing if not isPackageInstalled(name)]
+    if missing:
+        logger.error('Can not install packages: %s' % ', '.join(missing))
+    return missing
 
-# Check plugin is installed or not
 def checkPackageInstall(name, *args):
     """
     check python component, if false, it will install component
     :param name:
     :return:
     """
-    # logger.info( 'Trying to import %s' % name )
-    allPkgs = getAllInstalledPythonPackage()
-
-    if name in allPkgs:
-        logger.info('package "%s" is already installed' % name)
-    else:
-        logger.info('package "%s" is not installed, '
-                    'execute package installation procedural' % name)
-        install_package(name)
+    return checkPackagesInstall([name])
 
 # Create environment variable by custom key
 def createKey(key, path, *args):
@@ -170,17 +271,22 @@ def avatar(userName, *args):
     avatarPth = os.path.join(imgPth, img)
     return avatarPth
 
+# Get the row of a user account, user.info is read when pipeline store has not got it.
+def userInfo(userName, *args):
+    values = pipelineStore.lookup('userInfo', userName)
+    if values is None:
+        userDataPth = os.path.join(os.getenv('PROGRAMDATA'), 'PipelineTool/scrInfo/user.info')
+        values = dataHandle(userDataPth, 'r').get(userName)
+    return values
+
 # Save information of current log in user account for next time.
 def saveCurrentUserLogin(userName, remember=False, *args):
-    userDataPth = os.path.join(os.getenv('PROGRAMDATA'), 'PipelineTool/scrInfo/user.info')
-
-    with open(userDataPth, 'r') as f:
-        userData = json.load(f)
-
-    userData[userName].append(remember)
+    values = list(userInfo(userName))
+    # rows of user.info have no remember column, rows of the store have it last
+    values = values[:len(pipelineStore.USERCOLUMNS) - 1] + [remember]
 
     curUser = {}
-    curUser[userName] = userData[userName]
+    curUser[userName] = values
     currentUserLoginPth = os.path.join(os.getenv('PROGRAMDATA'), 'PipelineTool/user.tempLog')
     with open(currentUserLoginPth, 'w') as f:
         json.dump(curUser, f, indent=4)
@@ -289,11 +395,8 @@ class Proc():
         timeOutput = '%s:%s' % (str(t.tm_hour), str(t.tm_min))
         return timeOutput
 
-    def createLog(self, event='Create Log', names=NAMES, package=PACKAGE):
-        log = {}
-        log[proc('date')] = event
-        with open( os.path.join(package['appData'], names['log']), 'a+') as f:
-            json.dump(log, f, indent=4)
+    def createLog(self, event='Create Log', app='PipelineTool', **data):
+        eventLog.logEvent(event, app=app, user=USER, **data)
 
 def encoding(message):
     output = encode(message, mode='hex')
@@ -303,28 +406,24 @@ def decoding(message):
     output = encode(message, mode='str')
     return output
 
-def logRecord(event):
+def logRecord(event, **data):
     # logger.info('Log created')
-    output = Proc().createLog(event=event)
+    output = Proc().createLog(event=event, **data)
     return output
 
 def proc(operation=None, name=NAMES['log'], path=PACKAGE['info']):
-    t = Proc().getTime()
-    d = Proc().getDate()
-    u = USER
-
     if operation == 'date':
         output = Proc().getDate()
     elif operation == 'time':
         output = Proc().getTime()
     elif operation == 'log out':
-        output = logRecord('User %s logged out at %s' % (u,t))
+        output = logRecord('logout')
     elif operation == 'log in':
-        output = logRecord('User %s logged in at %s' % (u,t))
+        output = logRecord('login')
     elif operation == 'update':
-        output = logRecord('Update data at %s' % t)
+        output = logRecord('update')
     elif operation == 'restart':
-        output = logRecord('User %s restart app at %s' % (u, t) )
+        output = logRecord('restart')
     else:
         output=None
 
@@ -5,12 +5,16 @@ Author: Do Trinh/Jimmy - 3D artist, pipelineTD artist.
 
 Description:
     This script is the place that all the variables will be referenced from here
+
+    Importing it does not touch the file system or the environment. Variables which cost something to work out
+    (paths of info folder, desktop, user name, messages...) are computed the first time they are used and kept
+    after, the module is replaced by a Settings object which does that. PROGRAMDATA is only set by
+    exportDataRoot(), which PipelineTool.py calls when it starts.
 """
 # -------------------------------------------------------------------------------------------------------------
 # IMPORT PYTHON MODULES
 # -------------------------------------------------------------------------------------------------------------
-import os, sys, winshell, platform, logging
-from tk import message
+import os, sys, types, logging
 
 logging.basicConfig()
 logger = logging.getLogger(__file__)
@@ -28,7 +32,7 @@ OPERATION = dict( encode=[ 'hex', 'string' ], pathInfo=[ 'create', 'read', 'modi
 # getData.py
 MAIN_NAMES = dict( info='apps.pipeline',
                    prod='prod.content',
-                   log='user.timelog',
+                   log='events.log',
                    login='user.info',
                    web='webs.pipeline',
                    maya='maya.pipeline',
@@ -36,6 +40,8 @@ MAIN_NAMES = dict( info='apps.pipeline',
                    appdata=['appData', 'scrInfo'],
                    sysEnv = 'env.os',
                    key = 'PIPELINE_TOOL',
+                   scan = 'scan.pipeline',
+                   pkgs = 'pkgs.pipeline',
                    )
 
 USER_CLASS = ['', 'Admin','Supervisor','Artist', 'tester']
@@ -61,65 +67,168 @@ def checkEnvKey(key, path, *args):
     else:
         pass
 
-def createInfo():
-    key = 'PROGRAMDATA'
-    path = os.getcwd()
-
-    checkEnvKey(key, path)
+def dataRoot():
+    """
+    Folder which holds PipelineTool data: PROGRAMDATA on Windows, XDG data home on Linux, see appDiscovery.dataRoot
+    """
+    from tk import appDiscovery
+    return appDiscovery.dataRoot()
 
-    appDir = os.getenv('PROGRAMDATA')
+def exportDataRoot():
+    """
+    Set PROGRAMDATA for the tools which read it straight from environment, it is not set on Linux
+    """
+    checkEnvKey('PROGRAMDATA', dataRoot())
 
-    infoDir = os.path.join(appDir, 'PipelineTool/scrInfo')
+def infoPth():
+    """
+    Path of info folder, it is not created here, see ensureInfoDir
+    """
+    return os.path.join(dataRoot(), 'PipelineTool/scrInfo')
 
+def ensureInfoDir():
+    infoDir = infoPth()
     if not os.path.exists(infoDir):
         os.makedirs(infoDir)
     return infoDir
 
-inforDir = createInfo()
-
-USERNAME = platform.node()
+def createInfo():
+    return ensureInfoDir()
 
 MAIN_ID = dict( Main='Tools Manager',
                 LogIn = 'Log in',
                 About='About Pipeline Tool',
                 Credit='From Author')
 
-APPDATA = [inforDir, os.path.join(os.getcwd().split('ui')[0], MAIN_NAMES['appdata'][0]),]
-
-MAIN_MESSAGE = dict( About=message.MAIN_ABOUT,
-                     Credit=message.MAIN_CREDIT,
-                     status='Pipeline Application', )
-
 MAIN_TABID = ['', 'Profile', 'Tools', 'Developer']
 
 MAIN_PLUGIN = dict(winshell='winshell')
 
 MAIN_URL = dict( Help='https://dot.damgteam.com/', )
 
-MAIN_PACKPAGE = dict( job=[ 'TD', 'Comp', 'Design', 'Office', 'UV', 'Sound' ],
-                      TD=[ 'Maya', '3Ds max', 'Mudbox', 'Houdini FX', 'ZBrush', 'Mari' ],
-                      Comp=[ 'NukeX', 'Hiero', 'After Effects', 'Premiere Pro' ],
-                      Design=[ 'Photoshop', 'Illustrator', 'InDesign' ],
-                      Office=[ 'Word', 'Excel', 'PowerPoint' ],
-                      UV=[ 'UVLayout' ],
-                      Sound=[ 'Audition' ],
-                      instruction=[ 'documentation' ],
-                      website=[ 'doc' ],
-                      image=[ 'icons', 'imgs' ],
-                      py=[ 'tk', 'ui',],
-                      ext=[ '.exe', 'PipelineTool.py', '.lnk' ],
-                      sysOpts=[ "Host Name", "OS Name", "OS Version", "Product ID", "System Manufacturer",
-                                "System Model",
-                                "System type", "BIOS Version", "Domain", "Windows Directory", "Total Physical Memory",
-                                "Available Physical Memory", "Logon Server" ],
-                      temp=os.path.join(os.getcwd(), 'temp'),
-                      info=os.path.join(os.getcwd().split( 'ui' )[ 0 ], 'appData'),
-                      desktop=winshell.desktop(),
-                      current=os.getcwd(),
-                      root=os.getcwd().split( 'ui' )[ 0 ],
-                      appData=APPDATA[0],
-                      filter=[ 'Non-commercial', 'Uninstall', 'Verbose', 'License', 'Skype' ],
-                      adobe=[ 'CS5', 'CS6', 'CC' ],
-                      geo=[ 300, 300, 300, 400, 350], )
-
-MAIN_ROOT = dict(main=MAIN_PACKPAGE['root'])
\ No newline at end of file
+# ----------------------------------------------------------------------------------------------------------- #
+"""                            SUB CLASS: LAZY SETTINGS - COMPUTED ON FIRST USE                             """
+# ----------------------------------------------------------------------------------------------------------- #
+class lazy( object ):
+    """
+    Attribute computed the first time it is read, the value then replaces the attribute
+    """
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        value = self.func(obj)
+        setattr(obj, self.func.__name__, value)
+        return value
+
+class LazyDict( dict ):
+    """
+    Dictionary whose values can be functions, a function is called when its key is first read
+    """
+    def __init__(self, lazyKeys=None, **kwargs):
+        super(LazyDict, self).__init__(**kwargs)
+        self._lazy = dict(lazyKeys or {})
+
+    def resolve(self, key):
+        if key in self._lazy:
+            dict.__setitem__(self, key, self._lazy.pop(key)())
+        return dict.__getitem__(self, key)
+
+    def __getitem__(self, key):
+        return self.resolve(key)
+
+    def __contains__(self, key):
+        return key in self._lazy or dict.__contains__(self, key)
+
+    def __iter__(self):
+        for key in self.keys():
+            yield key
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __setitem__(self, key, value):
+        self._lazy.pop(key, None)
+        dict.__setitem__(self, key, value)
+
+    def get(self, key, default=None):
+        return self.resolve(key) if key in self else default
+
+    def keys(self):
+        return list(dict.keys(self)) + list(self._lazy)
+
+    def values(self):
+        return [self.resolve(key) for key in self.keys()]
+
+    def items(self):
+        return [(key, self.resolve(key)) for key in self.keys()]
+
+class Settings( types.ModuleType ):
+
+    @lazy
+    def inforDir(self):
+        return infoPth()
+
+    @lazy
+    def USERNAME(self):
+        import platform
+        return platform.node()
+
+    @lazy
+    def APPDATA(self):
+        return [self.inforDir, os.path.join(os.getcwd().split('ui')[0], MAIN_NAMES['appdata'][0]),]
+
+    @lazy
+    def MAIN_MESSAGE(self):
+        from tk import message
+        return dict( About=message.MAIN_ABOUT,
+                     Credit=message.MAIN_CREDIT,
+                     status='Pipeline Application', )
+
+    @lazy
+    def MAIN_PACKPAGE(self):
+        return LazyDict( dict(desktop=desktopPth,
+                              appData=lambda: self.APPDATA[0]),
+                         job=[ 'TD', 'Comp', 'Design', 'Office', 'UV', 'Sound' ],
+                         TD=[ 'Maya', '3Ds max', 'Mudbox', 'Houdini FX', 'ZBrush', 'Mari' ],
+                         Comp=[ 'NukeX', 'Hiero', 'After Effects', 'Premiere Pro' ],
+                         Design=[ 'Photoshop', 'Illustrator', 'InDesign' ],
+                         Office=[ 'Word', 'Excel', 'PowerPoint' ],
+                         UV=[ 'UVLayout' ],
+                         Sound=[ 'Audition' ],
+                         instruction=[ 'documentation' ],
+                         website=[ 'doc' ],
+                         image=[ 'icons', 'imgs' ],
+                         py=[ 'tk', 'ui',],
+                         ext=[ '.exe', 'PipelineTool.py', '.lnk' ],
+                         sysOpts=[ "Host Name", "OS Name", "OS Version", "Product ID", "System Manufacturer",
+                                   "System Model",
+                                   "System type", "BIOS Version", "Domain", "Windows Directory", "Total Physical Memory",
+                                   "Available Physical Memory", "Logon Server" ],
+                         temp=os.path.join(os.getcwd(), 'temp'),
+                         info=os.path.join(os.getcwd().split( 'ui' )[ 0 ], 'appData'),
+                         current=os.getcwd(),
+                         root=os.getcwd().split( 'ui' )[ 0 ],
+                         filter=[ 'Non-commercial', 'Uninstall', 'Verbose', 'License', 'Skype' ],
+                         adobe=[ 'CS5', 'CS6', 'CC' ],
+                         geo=[ 300, 300, 300, 400, 350], )
+
+    @lazy
+    def MAIN_ROOT(self):
+        return dict(main=self.MAIN_PACKPAGE['root'])
+
+def desktopPth():
+    # winshell on windows, it is a slow import
+    from tk import appDiscovery
+    return appDiscovery.getBackend().desktop()
+
+# Replace this module by settings which hold everything defined above, the module is kept alive so its functions
+# keep their globals
+_module = sys.modules[__name__]
+_settings = Settings(__name__, __doc__)
+_settings.__dict__.update(dict([(k, v) for k, v in _module.__dict__.items() if k not in ('__name__', '__doc__')]))
+_settings._module = _module
+sys.modules[__name__] = _settings
@@ -0,0 +1,335 @@
+# coding=utf-8
+"""
+Script Name: eventLog.py
+Author: Do Trinh/Jimmy - 3D artist.
+
+Description:
+    Event log shared by the pipeline tool and maya: log in, log out, update, restart, app launch...
+
+    Every event is one json object on its own line (NDJSON) of events.log in info folder:
+
+        {"app": "maya", "event": "login", "host": "ws-042", "pid": 1234, "ts": 1792200000.123, "user": "jimmy"}
+
+    Events are queued and written by a background thread, a caller never waits for the disk. When events.log is
+    bigger than MAXBYTES it is renamed to events.<date-time>.log and a new one is started, a rotated file is never
+    renamed again so tools which keep offsets in it (analytics index) stay valid.
+
+    readEvents streams events of every log file, oldest first, with filters on user, app, event and time range,
+    so a year of logs is never loaded in memory.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, re, json, time, atexit, socket, logging, datetime, threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    STRTYPES = basestring
+except NameError:
+    STRTYPES = str
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.DEBUG)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+EVENTLOG = 'events.log'
+# Size of events.log before it is rotated
+MAXBYTES = 8 * 1024 * 1024
+# Number of rotated files kept, None keeps all of them
+BACKUPS = None
+# Seconds the writer waits to gather events before writing them
+FLUSHINTERVAL = 0.5
+# Events waiting for the writer, new events are dropped when it is full
+QUEUESIZE = 10000
+
+ROTATEDFORMAT = '%Y%m%dT%H%M%S'
+
+def logPth(*args):
+    from tk import appDiscovery
+    return os.path.join(appDiscovery.dataPth(), EVENTLOG)
+
+def logFiles(pth=None, *args):
+    """
+    :return: rotated files of a log, oldest first, then the log itself
+    """
+    pth = pth or logPth()
+    folder, name = os.path.split(pth)
+    base, ext = os.path.splitext(name)
+    pattern = re.compile(r'^%s\.(\d{8}T\d{6})(?:-(\d+))?%s$' % (re.escape(base), re.escape(ext)))
+    try:
+        names = os.listdir(folder or '.')
+    except OSError:
+        names = []
+
+    # files rotated in the same second have a counter after the date
+    rotated = []
+    for n in names:
+        match = pattern.match(n)
+        if match:
+            rotated.append((match.group(1), int(match.group(2) or 0), n))
+    files = [os.path.join(folder, n) for stamp, i, n in sorted(rotated)]
+    if os.path.exists(pth):
+        files.append(pth)
+    return files
+
+def toStamp(value, *args):
+    """
+    :param value: epoch seconds, datetime, date or 'YYYY-MM-DD' string
+    :return: epoch seconds (local time), None if value is None
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, STRTYPES):
+        value = datetime.datetime.strptime(value, '%Y-%m-%d')
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    return time.mktime(value.timetuple()) + value.microsecond / 1e6
+
+def matches(value, wanted, *args):
+    if wanted is None:
+        return True
+    if isinstance(wanted, (list, tuple, set, frozenset)):
+        return value in wanted
+    return value == wanted
+
+class FlushMark( object ):
+    """
+    Put in the queue by flush, it is set when the events queued before it are written
+    """
+    def __init__(self):
+        self.done = threading.Event()
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                   MAIN CLASS: EVENT LOG - BUFFERED WRITER                               """
+# ----------------------------------------------------------------------------------------------------------- #
+class EventLog( object ):
+
+    def __init__(self, pth=None, maxBytes=MAXBYTES, backups=BACKUPS, flushInterval=FLUSHINTERVAL):
+
+        super(EventLog, self).__init__()
+
+        self.pth = pth or logPth()
+        self.maxBytes = maxBytes
+        self.backups = backups
+        self.flushInterval = flushInterval
+
+        self.host = socket.gethostname()
+        self.dropped = 0
+        self._queue = queue.Queue(QUEUESIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def record(self, event, app=None, user=None, **data):
+        rec = dict(ts=round(time.time(), 3), event=event, app=app, user=user or self.host, host=self.host,
+                   pid=os.getpid())
+        if data:
+            rec['data'] = data
+        return rec
+
+    def log(self, event, app=None, user=None, **data):
+        """
+        Queue an event, it returns at once
+        """
+        self.start()
+        try:
+            self._queue.put_nowait(self.record(event, app, user, **data))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1:
+                logger.error('Event log queue is full, events are dropped')
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run, name='EventLogWriter')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def flush(self, timeout=5.0):
+        """
+        Wait until every event queued before is written
+        :return: True if they are written in time
+        """
+        if self._thread is None:
+            return True
+        mark = FlushMark()
+        try:
+            self._queue.put(mark, timeout=timeout)
+        except queue.Full:
+            return False
+        mark.done.wait(timeout)
+        return mark.done.is_set()
+
+    def close(self, timeout=5.0):
+        if self._thread is not None and self._thread.is_alive():
+            self.flush(timeout)
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # gather what comes in a short while, so a burst of events is one write
+            deadline = time.time() + self.flushInterval
+            while item is not None and not isinstance(item, FlushMark):
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            records = [i for i in batch if isinstance(i, dict)]
+            if records:
+                self.write(records)
+            for i in batch:
+                if isinstance(i, FlushMark):
+                    i.done.set()
+            if None in batch:
+                return
+
+    def write(self, records):
+        data = ''.join([json.dumps(rec, sort_keys=True) + '\n' for rec in records]).encode('utf-8')
+        try:
+            folder = os.path.dirname(self.pth)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            if self.maxBytes and self.size() + len(data) > self.maxBytes:
+                self.rotate()
+            # one write in append mode, lines of other processes are not mixed with ours
+            with open(self.pth, 'ab') as f:
+                f.write(data)
+        except (IOError, OSError) as e:
+            logger.error('Can not write event log %s: %s' % (self.pth, e))
+
+    def size(self):
+        try:
+            return os.path.getsize(self.pth)
+        except OSError:
+            return 0
+
+    def rotate(self):
+        if not self.size():
+            return
+        base, ext = os.path.splitext(self.pth)
+        stamp = time.strftime(ROTATEDFORMAT)
+        rotated = '%s.%s%s' % (base, stamp, ext)
+        i = 1
+        while os.path.exists(rotated):
+            rotated = '%s.%s-%s%s' % (base, stamp, i, ext)
+            i += 1
+        try:
+            os.rename(self.pth, rotated)
+        except OSError:
+            # another process rotated it first
+            return
+        logger.debug('Rotated event log to %s' % rotated)
+
+        if self.backups is not None:
+            old = [pth for pth in logFiles(self.pth) if pth != self.pth]
+            for pth in old[:max(0, len(old) - self.backups)]:
+                try:
+                    os.remove(pth)
+                except OSError:
+                    pass
+
+# ------------------------------------------------------
+# READER
+# ------------------------------------------------------
+def firstStamp(pth, *args):
+    try:
+        with open(pth, 'rb') as f:
+            return json.loads(f.readline().decode('utf-8'))['ts']
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return None
+
+def readFile(pth, offset=0, *args):
+    """
+    Read events of one file
+    :param offset: byte offset to start at, it must be the start of a line
+    :return: generator of (offset of line, event)
+    """
+    try:
+        f = open(pth, 'rb')
+    except (IOError, OSError) as e:
+        logger.debug('Can not read %s: %s' % (pth, e))
+        return
+
+    with f:
+        f.seek(offset)
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            try:
+                yield offset, json.loads(line.decode('utf-8'))
+            except ValueError:
+                # an unfinished line, written when a process was killed
+                pass
+            offset += len(line)
+
+def readEvents(pth=None, user=None, app=None, event=None, since=None, until=None, *args):
+    """
+    Stream events of a log and its rotated files, oldest first
+    :param user, app, event: a value or a list of values to keep
+    :param since, until: time range, epoch seconds, datetime, date or 'YYYY-MM-DD', until is excluded
+    :return: generator of events
+    """
+    since = toStamp(since)
+    until = toStamp(until)
+    files = logFiles(pth)
+
+    for i, filePth in enumerate(files):
+        # a file is older than its mtime, and newer than its first event
+        if since is not None:
+            try:
+                if os.path.getmtime(filePth) < since:
+                    continue
+            except OSError:
+                continue
+        if until is not None:
+            first = firstStamp(filePth)
+            if first is not None and first >= until:
+                break
+
+        for offset, rec in readFile(filePth):
+            ts = rec.get('ts', 0)
+            if since is not None and ts < since or until is not None and ts >= until:
+                continue
+            if matches(rec.get('user'), user) and matches(rec.get('app'), app) and matches(rec.get('event'), event):
+                yield rec
+
+# ------------------------------------------------------
+# EVENT LOG OF THIS PROCESS
+# ------------------------------------------------------
+_EVENTLOG = []
+_EVENTLOGLOCK = threading.Lock()
+
+def getEventLog(*args):
+    """
+    Get the event log of this process, it is created the first time it is asked for and flushed at exit
+    :return: EventLog
+    """
+    with _EVENTLOGLOCK:
+        if not _EVENTLOG:
+            _EVENTLOG.append(EventLog())
+            atexit.register(_EVENTLOG[0].close)
+        return _EVENTLOG[0]
+
+def logEvent(event, app=None, user=None, **data):
+    """
+    Record an event, for example logEvent('login', app='maya', user='jimmy')
+    """
+    getEventLog().log(event, app, user, **data)
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                             END OF CODE                                                 """
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,475 @@
+# coding=utf-8
+"""
+Script Name: eventReport.py
+Author: Do Trinh/Jimmy - 3D artist.
+
+Description:
+    Reports of the event log (see eventLog.py) for supervisors:
+
+        python -m tk.eventReport count --by day app --event launch --since 2026-10-01 --format csv
+        python -m tk.eventReport users --app maya --last 7
+        python -m tk.eventReport index
+
+    count       number of events grouped by day, week, month, app, user, event or host
+    users       users with their number of events, first and last time seen
+    index       bring the index up to date and show what is in it
+
+    events.index is kept next to the log. For every log file it has the byte ranges of every day, so a query on
+    a time range only reads the days it needs. Rotated files never change and are indexed once, events.log is
+    indexed from where the last run stopped.
+
+    Selected events are kept as columns of integer codes and counted with numpy when it is installed (it comes
+    with pandas), with a plain python fallback.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, re, sys, csv, json, time, array, logging, argparse, datetime
+
+from collections import Counter
+
+from tk import eventLog
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+INDEXNAME = 'events.index'
+INDEXVERSION = 1
+
+# Bytes read at once from a log file
+CHUNK = 4 * 1024 * 1024
+
+# Fields events are grouped by, week and month are worked out from day
+FIELDS = ['day', 'week', 'month', 'app', 'user', 'event', 'host']
+TEXTFIELDS = ['app', 'user', 'event', 'host']
+
+TSPATTERN = re.compile(br'"ts": (\d+(?:\.\d*)?)')
+
+class DayClock( object ):
+    """
+    Local day of a time stamp, localtime is only called when a stamp is outside of the last day found
+    """
+    def __init__(self):
+        self.day = None
+        self.start = self.end = 0
+
+    def __call__(self, ts):
+        if not self.start <= ts < self.end:
+            t = time.localtime(ts)
+            self.day = '%04d-%02d-%02d' % t[:3]
+            self.start = time.mktime((t[0], t[1], t[2], 0, 0, 0, 0, 0, -1))
+            # mktime carries day 32 to the next month
+            self.end = time.mktime((t[0], t[1], t[2] + 1, 0, 0, 0, 0, 0, -1))
+        return self.day
+
+def weekOf(day, *args):
+    year, week = datetime.datetime.strptime(day, '%Y-%m-%d').isocalendar()[:2]
+    return '%04d-W%02d' % (year, week)
+
+def monthOf(day, *args):
+    return day[:7]
+
+# ------------------------------------------------------
+# INDEX - BYTE RANGES OF EVERY DAY
+# ------------------------------------------------------
+def indexPth(logPth=None, *args):
+    return os.path.join(os.path.dirname(logPth or eventLog.logPth()), INDEXNAME)
+
+def readIndex(pth, *args):
+    try:
+        with open(pth, 'r') as f:
+            index = json.load(f)
+    except (IOError, OSError, ValueError):
+        index = {}
+    if index.get('version') != INDEXVERSION:
+        index = dict(version=INDEXVERSION, files={})
+    return index
+
+def writeIndex(pth, index, *args):
+    tmp = '%s.%s.tmp' % (pth, os.getpid())
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(index, f, sort_keys=True)
+        if hasattr(os, 'replace'):
+            os.replace(tmp, pth)
+        else:
+            if os.path.exists(pth):
+                os.remove(pth)
+            os.rename(tmp, pth)
+    except (IOError, OSError) as e:
+        logger.error('Can not write index %s: %s' % (pth, e))
+
+def newEntry(*args):
+    return dict(size=0, first=None, days={})
+
+def indexFile(pth, entry, *args):
+    """
+    Add the lines written after entry['size'] to the day ranges of entry, an unfinished last line is left for
+    the next run
+    """
+    clock = DayClock()
+    days = entry['days']
+    offset = entry['size']
+    with open(pth, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            match = TSPATTERN.search(line)
+            if match:
+                ts = float(match.group(1))
+                if entry['first'] is None:
+                    entry['first'] = ts
+                ranges = days.setdefault(clock(ts), [])
+                if ranges and ranges[-1][1] == offset:
+                    ranges[-1][1] = offset + len(line)
+                else:
+                    ranges.append([offset, offset + len(line)])
+            offset += len(line)
+    entry['size'] = offset
+    return entry
+
+def updateIndex(logPth=None, *args):
+    """
+    Index what was written since the last run
+    :return: list of (path of log file, index entry), oldest first
+    """
+    files = eventLog.logFiles(logPth)
+    pth = indexPth(logPth)
+    index = readIndex(pth)
+    entries = {}
+    changed = False
+
+    for filePth in files:
+        name = os.path.basename(filePth)
+        entry = index['files'].get(name)
+        try:
+            size = os.path.getsize(filePth)
+        except OSError:
+            continue
+        # events.log is started again after a rotation
+        if entry is not None and (size < entry['size'] or entry['first'] is not None and
+                                  eventLog.firstStamp(filePth) != entry['first']):
+            entry = None
+        if entry is None:
+            entry = newEntry()
+            changed = True
+        if size > entry['size']:
+            start = time.time()
+            indexFile(filePth, entry)
+            logger.debug('Indexed %s in %.2f seconds' % (name, time.time() - start))
+            changed = True
+        entries[name] = entry
+
+    if changed or set(entries) != set(index['files']):
+        index['files'] = entries
+        writeIndex(pth, index)
+    return [(filePth, entries[os.path.basename(filePth)]) for filePth in files if
+            os.path.basename(filePth) in entries]
+
+def selectRanges(entry, sinceDay=None, untilDay=None, *args):
+    """
+    :return: sorted byte ranges of the days from sinceDay to untilDay (both included), next ranges are merged
+    """
+    ranges = []
+    for day, dayRanges in entry['days'].items():
+        if (sinceDay is None or day >= sinceDay) and (untilDay is None or day <= untilDay):
+            ranges += dayRanges
+    ranges.sort()
+
+    merged = []
+    for start, end in ranges:
+        if merged and merged[-1][1] == start:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+def readRanges(pth, ranges, *args):
+    """
+    :return: generator of text lines in byte ranges of a file, a chunk is decoded at once up to its last line end
+    """
+    with open(pth, 'rb') as f:
+        for start, end in ranges:
+            f.seek(start)
+            left = end - start
+            rest = b''
+            while left > 0:
+                data = f.read(min(CHUNK, left))
+                if not data:
+                    break
+                left -= len(data)
+                data = rest + data
+                cut = data.rfind(b'\n') + 1
+                rest = data[cut:]
+                for line in data[:cut].decode('utf-8', 'replace').split(u'\n')[:-1]:
+                    yield line
+            if rest:
+                yield rest.decode('utf-8', 'replace')
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                SUB CLASS: COLUMNS - SELECTED EVENTS AS CODES                            """
+# ----------------------------------------------------------------------------------------------------------- #
+class Columns( object ):
+    """
+    Selected events as two columns: time stamp and the code of the (day, app, user, event, host) of the event.
+    Events of a studio repeat the same few combinations, so a code is found with one dictionary lookup and the
+    column of a field is made from the small table of combinations.
+    """
+    def __init__(self):
+
+        super(Columns, self).__init__()
+
+        self.ts = array.array('d')
+        self.combo = array.array('i')
+        self.combos = []
+        self._lookup = {}
+
+    def __len__(self):
+        return len(self.ts)
+
+    def add(self, rec, day):
+        key = (day, rec.get('app'), rec.get('user'), rec.get('event'), rec.get('host'))
+        code = self._lookup.get(key)
+        if code is None:
+            code = self._lookup[key] = len(self.combos)
+            self.combos.append(key)
+        self.combo.append(code)
+        self.ts.append(rec.get('ts', 0))
+
+    def column(self, field):
+        """
+        :return: (codes, values) of a field, codes has the code of every event in values
+        """
+        if field in ('week', 'month'):
+            derive = weekOf if field == 'week' else monthOf
+            pos = 0
+        else:
+            derive = None
+            pos = (['day'] + TEXTFIELDS).index(field)
+
+        values = []
+        lookup = {}
+        derived = {}
+        mapping = []
+        for combo in self.combos:
+            value = combo[pos]
+            if derive is not None:
+                if value not in derived:
+                    derived[value] = derive(value)
+                value = derived[value]
+            if value not in lookup:
+                lookup[value] = len(values)
+                values.append(value)
+            mapping.append(lookup[value])
+
+        if numpy is not None:
+            codes = numpy.array(mapping, dtype=numpy.int64)[numpy.asarray(self.combo, dtype=numpy.int64)]
+        else:
+            codes = [mapping[c] for c in self.combo]
+        return codes, values
+
+def prefilter(user=None, app=None, event=None, *args):
+    """
+    Lines are written by json.dumps with sorted keys so a value always looks the same in a line. A line without
+    the text of a wanted value can not pass the filters and is not parsed.
+    :return: function which tells if a line has to be parsed, None if every line has to
+    """
+    needles = []
+    for field, wanted in [('user', user), ('app', app), ('event', event)]:
+        if wanted is None:
+            continue
+        if not isinstance(wanted, (list, tuple, set, frozenset)):
+            wanted = [wanted]
+        needles.append(['"%s": %s' % (field, json.dumps(value)) for value in wanted])
+
+    if not needles:
+        return None
+    if all(len(options) == 1 for options in needles):
+        single = [options[0] for options in needles]
+        if len(single) == 1:
+            needle = single[0]
+            return lambda line: needle in line
+        return lambda line: all([n in line for n in single])
+    return lambda line: all([any([n in line for n in options]) for options in needles])
+
+def select(logPth=None, user=None, app=None, event=None, since=None, until=None, *args):
+    """
+    Read the events of a time range which pass the filters
+    :param user, app, event: a value or a list of values to keep
+    :param since, until: epoch seconds, datetime, date or 'YYYY-MM-DD', until is excluded
+    :return: Columns
+    """
+    since = eventLog.toStamp(since)
+    until = eventLog.toStamp(until)
+    clock = DayClock()
+    sinceDay = clock(since) if since is not None else None
+    # until is excluded, its day is only needed when it is not midnight
+    untilDay = clock(until - 0.001) if until is not None else None
+
+    keep = prefilter(user, app, event)
+    checks = [(field, wanted) for field, wanted in [('user', user), ('app', app), ('event', event)] if
+              wanted is not None]
+    # lines are written without spaces around them, raw_decode skips the strip of decode
+    decode = json.JSONDecoder().raw_decode
+    columns = Columns()
+
+    for filePth, entry in updateIndex(logPth):
+        ranges = selectRanges(entry, sinceDay, untilDay)
+        if not ranges:
+            continue
+        for line in readRanges(filePth, ranges):
+            if keep is not None and not keep(line):
+                continue
+            try:
+                rec = decode(line)[0]
+            except (ValueError, IndexError):
+                continue
+            ts = rec.get('ts', 0)
+            if since is not None and ts < since or until is not None and ts >= until:
+                continue
+            if all([eventLog.matches(rec.get(field), wanted) for field, wanted in checks]):
+                columns.add(rec, clock(ts))
+    return columns
+
+# ------------------------------------------------------
+# REPORTS
+# ------------------------------------------------------
+def countBy(columns, by, *args):
+    """
+    Number of events for every combination of fields
+    :param by: list of fields, see FIELDS
+    :return: list of rows [value of every field..., count], sorted
+    """
+    if not len(columns):
+        return []
+
+    cols = [columns.column(field) for field in by]
+
+    if numpy is not None:
+        # one integer key per event, then one pass of unique
+        keys = numpy.zeros(len(columns), dtype=numpy.int64)
+        for codes, values in cols:
+            keys = keys * len(values) + numpy.asarray(codes, dtype=numpy.int64)
+        uniq, counts = numpy.unique(keys, return_counts=True)
+        decoded = []
+        for codes, values in reversed(cols):
+            decoded.insert(0, uniq % len(values))
+            uniq = uniq // len(values)
+        rows = [[cols[i][1][int(c)] for i, c in enumerate(combo)] + [int(n)] for combo, n in
+                zip(zip(*decoded), counts)]
+    else:
+        counts = Counter(zip(*[codes for codes, values in cols]))
+        rows = [[cols[i][1][c] for i, c in enumerate(combo)] + [n] for combo, n in counts.items()]
+
+    return sorted(rows, key=lambda row: [str(v) for v in row[:-1]])
+
+def userStats(columns, *args):
+    """
+    :return: list of rows [user, count, first seen, last seen], sorted by user
+    """
+    if not len(columns):
+        return []
+
+    codes, values = columns.column('user')
+    if numpy is not None:
+        codes = numpy.asarray(codes, dtype=numpy.int64)
+        ts = numpy.asarray(columns.ts, dtype=numpy.float64)
+        order = numpy.argsort(codes, kind='mergesort')
+        uniq, starts, counts = numpy.unique(codes[order], return_index=True, return_counts=True)
+        firsts = numpy.minimum.reduceat(ts[order], starts)
+        lasts = numpy.maximum.reduceat(ts[order], starts)
+        stats = zip(uniq.tolist(), counts.tolist(), firsts.tolist(), lasts.tolist())
+    else:
+        found = {}
+        for code, ts in zip(codes, columns.ts):
+            if code in found:
+                stat = found[code]
+                stat[0] += 1
+                stat[1] = min(stat[1], ts)
+                stat[2] = max(stat[2], ts)
+            else:
+                found[code] = [1, ts, ts]
+        stats = [(code, n, first, last) for code, (n, first, last) in found.items()]
+
+    rows = [[values[code], n, isoTime(first), isoTime(last)] for code, n, first, last in stats]
+    return sorted(rows, key=lambda row: str(row[0]))
+
+def isoTime(ts, *args):
+    return datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+def writeRows(stream, header, rows, fmt='csv', *args):
+    if fmt == 'json':
+        json.dump([dict(zip(header, row)) for row in rows], stream, indent=4, sort_keys=True)
+        stream.write('\n')
+    else:
+        if sys.version_info[0] == 2:
+            # csv of python 2 only writes bytes
+            rows = [[v.encode('utf-8') if isinstance(v, unicode) else v for v in row] for row in rows]
+        writer = csv.writer(stream, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def timeRange(options, *args):
+    since, until = options.since, options.until
+    if options.last:
+        today = datetime.date.today()
+        since = today - datetime.timedelta(days=options.last - 1)
+        until = today + datetime.timedelta(days=1)
+    return since, until
+
+def main(argv=None, *args):
+    parser = argparse.ArgumentParser(description='Reports of the pipeline event log')
+    parser.add_argument('report', choices=['count', 'users', 'index'])
+    parser.add_argument('--log', default=None, help='path of events.log (default: info folder)')
+    parser.add_argument('--by', nargs='+', choices=FIELDS, default=['day', 'app'], help='fields to group by '
+                                                                                          '(default: day app)')
+    parser.add_argument('--user', nargs='+', default=None, help='keep events of these users')
+    parser.add_argument('--app', nargs='+', default=None, help='keep events of these apps')
+    parser.add_argument('--event', nargs='+', default=None, help='keep these events (login, launch...)')
+    parser.add_argument('--since', default=None, help='first day, YYYY-MM-DD')
+    parser.add_argument('--until', default=None, help='day after the last one, YYYY-MM-DD')
+    parser.add_argument('--last', type=int, default=None, help='last N days, today included')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+    parser.add_argument('--output', default=None, help='write report to this file instead of stdout')
+    options = parser.parse_args(argv)
+
+    start = time.time()
+    if options.report == 'index':
+        entries = updateIndex(options.log)
+        header = ['file', 'bytes', 'days']
+        rows = [[os.path.basename(pth), entry['size'], len(entry['days'])] for pth, entry in entries]
+    else:
+        since, until = timeRange(options)
+        columns = select(options.log, options.user, options.app, options.event, since, until)
+        if options.report == 'count':
+            header = list(options.by) + ['count']
+            rows = countBy(columns, options.by)
+        else:
+            header = ['user', 'count', 'first', 'last']
+            rows = userStats(columns)
+        logger.info('%s events selected in %.2f seconds' % (len(columns), time.time() - start))
+
+    stream = open(options.output, 'w') if options.output else sys.stdout
+    try:
+        writeRows(stream, header, rows, options.format)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                             END OF CODE                                                 """
+# ----------------------------------------------------------------------------------------------------------- #
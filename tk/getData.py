@@ -5,11 +5,24 @@ Author: Do Trinh/Jimmy - 3D artist, leader DAMG team.
 
 Description:
     This script will find all the path of modules, icons, images ans store them to a file
+
+    Every source is fingerprinted (folder mtimes of Start Menu, icons, images, hash of environment) and the
+    fingerprints are kept in scan.pipeline next to the info file. On launch only the sections whose fingerprint
+    changed are collected again, on an unchanged machine apps.pipeline is reused as it is.
+
+    Sections are collected by collectors registered with registerCollector(), they run at the same time in their
+    own thread with a timeout each. A collector which fails or runs out of time keeps its info of last scan and is
+    run again on next launch.
 """
 # -------------------------------------------------------------------------------------------------------------
 # IMPORT PYTHON MODULES
 # -------------------------------------------------------------------------------------------------------------
-import json, logging, os, sys, re, platform, winshell
+import json, logging, os, sys, re, time, hashlib, platform, threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
 
 logging.basicConfig()
 logger = logging.getLogger(__file__)
@@ -17,6 +30,7 @@ logger.setLevel(logging.DEBUG)
 
 from tk import defaultVariable as var
 from tk import appFuncs as func
+from tk import appDiscovery
 
 # ------------------------------------------------------
 # DEFAULT VARIABLES
@@ -25,6 +39,71 @@ PACKAGE = var.MAIN_PACKPAGE
 # List of file name
 NAMES = var.MAIN_NAMES
 
+# Bump it when the content of info file changes, every section is collected again
+SCANVERSION = 1
+# SYSTEMINFO is slow and its content hardly changes, it is only run again after this many seconds
+SYSINFOTTL = 24*60*60
+
+# Seconds a collector is given when it does not set its own timeout
+COLLECTTIMEOUT = 30
+
+# section: (function(getData, package, names), timeout), see registerCollector
+COLLECTORS = {}
+
+def registerCollector(section, func, timeout=COLLECTTIMEOUT):
+    """
+    Register a function which collects one section of info file
+    :param section: key of section in info file, it needs a fingerprint in GetData.getFingerprints
+    :param func: function(getData, package, names) which returns the info of section
+    :param timeout: seconds after which the collector is given up
+    """
+    COLLECTORS[section] = (func, timeout)
+
+def trieRegex(words):
+    """
+    Build a regex of words which share their prefixes, 'Maya|Mari|Mudbox' becomes 'M(?:a(?:ri|ya)|udbox)', so a name
+    is checked against every keyword in one pass without trying each word again from its start
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(node[char]) for char in sorted(node) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:%s)' % '|'.join(branches)
+        if '' in node:
+            pattern = '(?:%s)?' % pattern
+        return pattern
+
+    return build(trie)
+
+_MATCHERS = {}
+
+def keywordMatcher(words):
+    """
+    :return: compiled regex which finds any of words in a text, None if there is no word
+    """
+    key = tuple(sorted(set([w for w in words if w])))
+    if not key:
+        return None
+    if key not in _MATCHERS:
+        _MATCHERS[key] = re.compile(trieRegex(key))
+    return _MATCHERS[key]
+
+def fingerprint(*values):
+    return hashlib.sha1(json.dumps(values, sort_keys=True).encode('utf-8')).hexdigest()
+
+def folderStamp(pth):
+    try:
+        return os.stat(pth).st_mtime
+    except OSError:
+        return None
+
 # ----------------------------------------------------------------------------------------------------------- #
 """                MAIN CLASS: GET MODULE INFO - GET ALL INFO OF MODULES, ICONS, IMAGES                     """
 # ----------------------------------------------------------------------------------------------------------- #
@@ -33,18 +112,59 @@ class GetData( object ):
     This class will find all the info of python, icon, image files and folders then store them to info files in
     info folder
     """
-    def __init__(self, package, names):
+    def __init__(self, package, names, force=False):
         """
         Initialize the main class functions
         :param package: the package of many information stored from default variable
         :param names: the dictionary of names stored from default variable
+        :param force: collect every section again even if nothing changed
         :returns: all installed app info, package app info, icon info, image info, pc info.
         """
         logger.info('Updating data paths')
 
         func.proc('')
 
-        self.createAllInfoFiles(package, names)
+        self.createAllInfoFiles(package, names, force)
+
+    def getFingerprints(self, package):
+        """
+        Fingerprint every source of info without reading it
+        :param package: the package of many information stored from default variable
+        :return: dictionary {section: fingerprint}
+        """
+        root = package['root']
+        prints = {}
+        prints['version'] = SCANVERSION
+        prints['modules'] = fingerprint(root, [folderStamp(os.path.join(root, f)) for f in package['py']])
+        prints['icon'] = fingerprint(root, folderStamp(os.path.join(root, package['image'][0])))
+        prints['image'] = fingerprint(root, folderStamp(os.path.join(root, package['image'][1])))
+        prints['sys'] = fingerprint(platform.node(), platform.platform(), sys.version, int(time.time()/SYSINFOTTL))
+        prints['apps'] = fingerprint(appDiscovery.getBackend().name, appDiscovery.getBackend().stamp())
+        prints['env'] = fingerprint(sorted(os.environ.items()))
+        return prints
+
+    def readScan(self, package, names):
+        """
+        Read fingerprints and info of last scan
+        :return: (fingerprints, info), empty dictionaries if there is no usable scan
+        """
+        try:
+            with open(os.path.join(package['appData'], names['scan']), 'r') as f:
+                prints = json.load(f)
+            with open(os.path.join(package['appData'], names['info']), 'r') as f:
+                info = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}, {}
+
+        if prints.get('version') != SCANVERSION:
+            return {}, {}
+        return prints, info
+
+    def addPyPaths(self, package):
+        for pyFol in package['py']:
+            pyPth = os.path.join(package['root'], pyFol)
+            if os.path.exists(pyPth) and pyPth not in sys.path:
+                sys.path.append(pyPth)
 
     def getPCinfo(self, package):
         """
@@ -66,13 +186,18 @@ class GetData( object ):
         sysInfo[ 'os' ] = windowOS + "|" + windowVersion
         # check if info folder exists, if not, create one
         values = {}
-        cache = os.popen2( "SYSTEMINFO" )
-        source = cache[ 1 ].read()
         sysOpts = package['sysOpts']
         sysInfo['artist name'] = platform.node()
         sysInfo['operating system'] = platform.system() + "/" + platform.platform()
         sysInfo['python version'] = platform.python_version()
 
+        # SYSTEMINFO only exists on windows
+        if windowOS != 'Windows':
+            return sysInfo
+
+        cache = os.popen2( "SYSTEMINFO" )
+        source = cache[ 1 ].read()
+
         for opt in sysOpts:
             values[opt] = [item.strip() for item in re.findall("%s:\w*(.*?)\n" % (opt), source, re.IGNORECASE)][0]
 
@@ -102,8 +227,6 @@ class GetData( object ):
         # loop to store all the python files found root's content to dictionary
         for pyFol in package['py']:
             pyPth = os.path.join(package['root'], pyFol)
-            if os.path.exists(pyPth):
-                sys.path.append(pyPth)
             files = [f for f in os.listdir(pyPth) if f.endswith('PipelineTool.py')]
             for file in files:
                 # do not need __init__.py
@@ -171,109 +294,164 @@ class GetData( object ):
 
     def getAllAppInfo(self, package):
         """
-        It will find and put all the info of installed apps to two list: appname and path
-        :param filters: self.appName, self.appPath
-        :return: self.appName, self.appPath
+        It will find and put all the info of installed apps to a dictionary, apps are found by the backend of local
+        pc (Start Menu shortcuts on Windows, .desktop files and PATH on Linux)
+        :param package: the package of many information stored from default variable
+        :return: dictionary {app name: path}
         """
-        shortcuts = {}
-        appName = []
-        appPth = []
-        # get list of all programmes installed in local pc
-        all_programs = winshell.programs(common=1)
-        # loop to store info to shortcut, path, filename.
-        for dirpath, dirnames, filenames in os.walk(all_programs):
-            relpath = dirpath[1+ len(all_programs):]
-            shortcuts.setdefault(relpath, []).extend([winshell.shortcut(os.path.join(dirpath, f)) for f in filenames])
-        # loop to store all the app names, paths to a dictionary
-        for relpath, lnks in sorted(shortcuts.items()):
-            for lnk in lnks:
-                name, _ = os.path.splitext(os.path.basename(lnk.lnk_filepath))
-                appName.append(name)
-                appPth.append(lnk.path)
-                #self.createLog('Found %s: %s' % (name, lnk.path))
         appInfo = {}
         # fix the encoding convention
-        for name in appName:
-            pth = appPth[appName.index(name)]
-            pth = func.encode(pth, 'utf8')
-            name = func.encode(name, 'utf8')
-            appInfo[name] = pth
+        for name, pth in appDiscovery.getBackend().apps().items():
+            appInfo[func.encode(name, 'utf8')] = func.encode(pth, 'utf8')
         # return data
         return appInfo
 
-    def getPackageAppInfo(self, package, names):
+    def getPackageAppInfo(self, package, names, appInfo=None):
         """
         It will Check if there is more than 1 version is installed
         :param package: the package of many information stored from default variable
         :param names: the dictionary of names stored from default variable
+        :param appInfo: all installed apps if they are already collected
         :return: final app info
         """
         # Take app info return from function
-        self.appInfo = self.getAllAppInfo(package)
-        # logger.info(self.appInfo)
-        # filter 1: find .exe path
-        keys = [k for k in self.appInfo if not self.appInfo[k].endswith(package['ext'][0])]
-        self.appInfo = self.deleteKey(keys, '1')
-        # logger.info(self.appInfo)
-        # filter 2: filter app name
-        jobs = []
-        for key in package['job']:
-            for job in package[key]:
-                jobs.append(job)
-
-        keys = []
-        for job in jobs:
-            for key in self.appInfo:
-                if job in key:
-                    keys.append(key)
-
-        pth = [self.appInfo[k] for k in keys]
-        self.appInfo = {}
-        for k in sorted(keys):
-            self.appInfo[k] = pth[keys.index(k)]
+        if appInfo is None:
+            appInfo = self.getAllAppInfo(package)
 
-        # logger.info(self.appInfo )
-        # filter 3: filter keywords
+        jobs = [job for key in package['job'] for job in package[key]]
+        jobMatcher = keywordMatcher(jobs)
+        filterMatcher = keywordMatcher(package['filter'])
 
-        for k in package['filter']:
-            for key in keys:
-                if k in key:
-                    # logger.info('%s: %s' % (k, key))
-                    del self.appInfo[key]
+        # one pass: filter 1 path starts a program (.exe on windows), filter 2 name of a pipeline app, filter 3 no filter keyword
+        backend = appDiscovery.getBackend()
+        self.appInfo = {}
+        for name, pth in appInfo.items():
+            if not backend.launchable(pth, package):
+                continue
+            if jobMatcher is None or jobMatcher.search(name) is None:
+                continue
+            if filterMatcher is not None and filterMatcher.search(name) is not None:
+                continue
+            self.appInfo[name] = pth
         #return
         return self.appInfo
 
-    def createAllInfoFiles(self, package, names):
+    def createAllInfoFiles(self, package, names, force=False):
         """
-        Run all the functions inside class and take all the return info then store them to files
+        Run all the functions inside class and take all the return info then store them to files, only the
+        sections which changed since last scan are collected again
         :param package: the package of many information stored from default variable
+        :param force: collect every section again
         :return: info files
         """
-        info = {}
         # check if info folder exists, if not, create one
         scrPth = package['appData']
         # logger.info('Checking path available: %s' % scrPth)
         if not os.path.exists(package['appData']):
             # logger.info('False, creating path %s' % package['appData'])
-            os.mkdir(package['appData'])
-        # take info return from modules
-        # logger.info('collecting modules pth')
-        info['modules'] = self.getModuleInfo(package)
-        # take info return from icons
-        # logger.info( 'collecting info pth' )
-        iconInfo = self.getIconInfo(package, names)
-        # take info return from image
-        # logger.info( 'collecting images and icons pth' )
-        info['image'] = self.getImgInfo(package)
-        # take info return from sys
-        # logger.info( 'collecting local computer configuration pth' )
-        info['sys'] = self.getPCinfo(package)
-        # take info return from all apps
-        # logger.info('collecting installed apps pth')
-        info['apps'] = self.getAllAppInfo(package)
+            os.makedirs(package['appData'])
+
+        self.addPyPaths(package)
+
+        prints = self.getFingerprints(package)
+        oldPrints, info = ({}, {}) if force else self.readScan(package, names)
+        changed = [key for key in prints if prints[key] != oldPrints.get(key)]
+
+        if not changed:
+            logger.info('Nothing changed since last scan, keep %s' % names['info'])
+            return
+
+        logger.info('Collecting: %s' % ', '.join(sorted(changed)))
+        info = dict(info)
+        # take info return from collectors, sections which fail keep info of last scan and their old fingerprint
+        results = self.runCollectors([key for key in changed if key in COLLECTORS], package, names)
+        for section in [key for key in changed if key in COLLECTORS]:
+            if section in results:
+                info[section] = results[section]
+            elif section in oldPrints:
+                prints[section] = oldPrints[section]
+            else:
+                del prints[section]
+
+        if [key for key in changed if key != 'env']:
+            if 'icon' in info and 'apps' in info:
+                self.createPipelineInfo(info, info['icon'], package, names)
+            # Save all info to directory
+            logger.info( 'creating Info file' )
+            self.createInfo(info, names, package)
+
+        if 'env' in changed:
+            logger.info( 'creating environment variable file' )
+            self.getSysPth(package=package, names=names)
+
+        with open(os.path.join(package['appData'], names['scan']), 'w') as f:
+            json.dump(prints, f, indent=4)
+
+    def runCollectors(self, sections, package, names):
+        """
+        Run collectors of sections at the same time, every collector in its own thread
+        :param sections: list of section keys
+        :return: dictionary {section: info} of collectors which finished in time
+        """
+        done = queue.Queue()
+        start = time.time()
+
+        def collect(section, func):
+            # winshell resolves shortcuts through COM, every thread has to initialize it
+            try:
+                import pythoncom
+                pythoncom.CoInitialize()
+            except ImportError:
+                pythoncom = None
+
+            t = time.time()
+            try:
+                done.put((section, func(self, package, names), None, time.time() - t))
+            except Exception as e:
+                done.put((section, None, e, time.time() - t))
+            finally:
+                if pythoncom is not None:
+                    pythoncom.CoUninitialize()
+
+        for section in sections:
+            thread = threading.Thread(target=collect, args=(section, COLLECTORS[section][0]),
+                                      name='GetData-%s' % section)
+            # a collector which hangs does not keep the launcher alive
+            thread.daemon = True
+            thread.start()
+
+        results = {}
+        pending = set(sections)
+        while pending:
+            deadline = min([start + COLLECTORS[section][1] for section in pending])
+            try:
+                section, result, error, seconds = done.get(timeout=max(0, deadline - time.time()))
+            except queue.Empty:
+                for section in [key for key in pending if start + COLLECTORS[key][1] <= time.time()]:
+                    logger.warning('Collector %s timed out after %s seconds' % (section, COLLECTORS[section][1]))
+                    pending.discard(section)
+                continue
+
+            if section not in pending:
+                # came back after its timeout
+                continue
+            pending.discard(section)
+            if error is not None:
+                logger.error('Collector %s failed after %.2f seconds: %s' % (section, seconds, error))
+            else:
+                logger.info('Collected %s in %.2f seconds' % (section, seconds))
+                results[section] = result
+
+        logger.info('Collected %s sections in %.2f seconds' % (len(results), time.time() - start))
+        return results
+
+    def createPipelineInfo(self, info, iconInfo, package, names):
+        """
+        Arrange installed apps which belong to pipeline with their icons
+        """
         # take info return from apps
         # logger.info( 'collecting pipeline package apps pth' )
-        self.appInfo = self.getPackageAppInfo(package, names)
+        self.appInfo = self.getPackageAppInfo(package, names, info['apps'])
         # logger.info( 'Fix paths which is not corrected' )
         for key in self.appInfo:
             # fix nukeX path
@@ -308,12 +486,6 @@ class GetData( object ):
         # logger.info(iconInfo)
 
         info['pipeline'] = trackKeys
-        info['icon'] = iconInfo
-        # Save all info to directory
-        logger.info( 'creating Info file' )
-        self.createInfo(info, names, package)
-        logger.info( 'creating environment variable file' )
-        self.getSysPth(package=PACKAGE, names=NAMES)
 
     def getSysPth(self, package, names):
         envKeys = {}
@@ -345,17 +517,64 @@ class GetData( object ):
         with open(os.path.join(package['appData'], names['info']), 'w') as f:
             json.dump(info, f, indent=4)
 
-def initialize(package=PACKAGE, names=NAMES):
+# ------------------------------------------------------
+# COLLECTORS OF INFO FILE
+# ------------------------------------------------------
+registerCollector('modules', lambda data, package, names: data.getModuleInfo(package), 10)
+registerCollector('icon', lambda data, package, names: data.getIconInfo(package, names), 10)
+registerCollector('image', lambda data, package, names: data.getImgInfo(package), 10)
+registerCollector('sys', lambda data, package, names: data.getPCinfo(package), 60)
+registerCollector('apps', lambda data, package, names: data.getAllAppInfo(package), 60)
+
+def initialize(package=PACKAGE, names=NAMES, force=False):
     """
     This function will import all the variables which need to run the class
     :param package: the package of many information stored from default variable
     :param names: the dictionsary of names stored from default variable
+    :param force: collect every info again even if nothing changed
     :return: info file, log file
     """
-    GetData( package, names )
+    GetData( package, names, force )
+
+def benchmark(count=10000, package=PACKAGE, names=NAMES):
+    """
+    Time app matching on a synthetic catalog of shortcuts, against the nested loops it replaced
+    :param count: number of shortcuts in catalog
+    :return: dictionary of matched, seconds, naive (seconds)
+    """
+    jobs = [job for key in package['job'] for job in package[key]]
+    words = jobs + package['filter'] + ['Tool', 'Helper', 'Viewer', 'Updater', 'Readme']
+    catalog = {}
+    for i in range(count):
+        name = '%s %s %s' % (words[i % len(words)], words[(i * 7) % len(words)], i)
+        catalog[name] = 'C:/Program Files/app%s/%s' % (i, 'app.exe' if i % 3 else 'readme.txt')
+
+    data = GetData.__new__(GetData)
+    start = time.time()
+    matched = data.getPackageAppInfo(package, names, catalog)
+    seconds = time.time() - start
+
+    start = time.time()
+    keys = [k for k in catalog if appDiscovery.getBackend().launchable(catalog[k], package)]
+    found = []
+    for job in jobs:
+        for key in keys:
+            if job in key and key not in found:
+                found.append(key)
+    naive = dict([(k, catalog[keys[keys.index(k)]]) for k in found if not [f for f in package['filter'] if f in k]])
+    naiveSeconds = time.time() - start
+
+    if naive != matched:
+        logger.error('Matcher and nested loops do not agree')
+    logger.info('%s shortcuts, %s matched: %.4f seconds (nested loops %.4f seconds)' % (
+                count, len(matched), seconds, naiveSeconds))
+    return dict(matched=len(matched), seconds=seconds, naive=naiveSeconds)
 
 if __name__=='__main__':
-    initialize(PACKAGE, NAMES)
+    if 'benchmark' in sys.argv[1:]:
+        benchmark()
+    else:
+        initialize(PACKAGE, NAMES)
 
 # ----------------------------------------------------------------------------------------------------------- #
 """                                             END OF CODE                                                 """
@@ -0,0 +1,96 @@
+# coding=utf-8
+"""
+Script Name: importBenchmark.py
+Author: Do Trinh/Jimmy - 3D artist.
+
+Description:
+    Measure how long it takes to import a module of the tool with python -X importtime (python 3.7 or later),
+    and check that the import does not write anything in the data folder.
+
+        python3 -m tk.importBenchmark --module tk.defaultVariable --runs 10
+
+    Every run is a new interpreter with an empty PROGRAMDATA, the median of cumulative import time is reported.
+"""
+# -------------------------------------------------------------------------------------------------------------
+# IMPORT PYTHON MODULES
+# -------------------------------------------------------------------------------------------------------------
+import os, sys, shutil, logging, argparse, tempfile, subprocess
+
+logging.basicConfig()
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+# ------------------------------------------------------
+# DEFAULT VARIABLES
+# ------------------------------------------------------
+MODULE = 'tk.defaultVariable'
+RUNS = 10
+
+def importTime(python, module, root, *args):
+    """
+    Import a module in a new interpreter
+    :return: (cumulative import time of module in microseconds, list of files written in data folder)
+    """
+    dataDir = tempfile.mkdtemp(prefix='importBenchmark')
+    env = dict(os.environ, PROGRAMDATA=dataDir)
+    try:
+        proc = subprocess.Popen([python, '-X', 'importtime', '-c', 'import %s' % module], cwd=root, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        out, err = proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError('Can not import %s:\n%s' % (module, err))
+
+        cumulative = None
+        for line in err.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            parts = [p.strip() for p in line[len('import time:'):].split('|')]
+            if len(parts) == 3 and parts[2] == module:
+                cumulative = int(parts[1])
+
+        written = []
+        for dirpath, dirnames, filenames in os.walk(dataDir):
+            written += [os.path.relpath(os.path.join(dirpath, n), dataDir) for n in dirnames + filenames]
+        return cumulative, written
+    finally:
+        shutil.rmtree(dataDir, ignore_errors=True)
+
+def benchmark(python=sys.executable, module=MODULE, runs=RUNS, root=None, *args):
+    """
+    :return: dictionary of median, best (microseconds) and written (files made in data folder by import)
+    """
+    root = root or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    times = []
+    written = []
+    for i in range(runs):
+        cumulative, files = importTime(python, module, root)
+        if cumulative is None:
+            raise RuntimeError('%s does not report -X importtime, python 3.7 or later is needed' % python)
+        times.append(cumulative)
+        written = files
+
+    times.sort()
+    result = dict(median=times[len(times) // 2], best=times[0], written=written)
+    logger.info('import %s: median %.1f ms, best %.1f ms over %s runs' % (module, result['median'] / 1000.0,
+                                                                          result['best'] / 1000.0, runs))
+    if written:
+        logger.warning('import %s wrote in data folder: %s' % (module, ', '.join(written)))
+    return result
+
+def main(argv=None, *args):
+    parser = argparse.ArgumentParser(description='Measure import time of a module of the tool')
+    parser.add_argument('--module', default=MODULE, help='module to import (default: %s)' % MODULE)
+    parser.add_argument('--runs', type=int, default=RUNS, help='number of runs (default: %s)' % RUNS)
+    parser.add_argument('--python', default=sys.executable, help='python 3.7+ interpreter (default: this one)')
+    parser.add_argument('--root', default=None, help='root of the tool (default: this checkout)')
+    options = parser.parse_args(argv)
+
+    result = benchmark(options.python, options.module, options.runs, options.root)
+    return 1 if result['written'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# ----------------------------------------------------------------------------------------------------------- #
+"""                                             END OF CODE                                                 """
+# ----------------------------------------------------------------------------------------------------------- #
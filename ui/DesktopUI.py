@@ -11,11 +11,14 @@ for any question or feedback, feel free to email me: dot@damgteam.com or damgtea
 # -------------------------------------------------------------------------------------------------------------
 # IMPORT PYTHON MODULES
 # -------------------------------------------------------------------------------------------------------------
-import json, logging, os, subprocess, sys, webbrowser
+import json, logging, os, sys, webbrowser
 from functools import partial
 from tk import appFuncs as func
+from tk import appDiscovery
 from tk import defaultVariable as var
 from tk import getData
+from tk import eventLog
+from sql_tk import pipelineStore
 
 # -------------------------------------------------------------------------------------------------------------
 # IMPORT PTQT5 ELEMENT TO MAKE UI
@@ -32,6 +35,8 @@ logger.setLevel(logging.DEBUG)
 # GET INFO DATA BEFORE START
 # Update local pc info
 getData.initialize()
+# Bring pipeline store up to date with info files once apps are rescanned, only files which changed are imported
+pipelineStore.update()
 
 # logger.info('Updating data')
 
@@ -78,33 +83,27 @@ infoData = NAMES['info']
 
 filePath = os.path.join(pthInfo, infoData)
 
-info = func.dataHandle(filePath, 'r')
-
-# with open(os.path.join(pthInfo, infoData), 'r') as f:
-#     info = json.load(f)
-
-# Get app path
+# Get app path, from pipeline store, apps.pipeline is read when the store has not got them
 logger.info('Loading information...')
-APPINFO = info['pipeline']
+APPINFO = pipelineStore.lookup('appInfo', 'pipeline')
+if not APPINFO:
+    info = func.dataHandle(filePath, 'r')
+    APPINFO = info['pipeline']
 logger.info('Loading pipeline manager UI')
 
-userDataPth = os.path.join(os.getenv('PROGRAMDATA'), 'PipelineTool/scrInfo/user.info')
-
-userData = func.dataHandle(userDataPth, 'r')
-
-# with open(userDataPth, 'r') as f:
-#     userData = json.load(f)
+prodLst = pipelineStore.lookup('productionTitles')
 
-prodInfoFolder = os.path.join(os.getenv('PROGRAMDATA'), 'PipelineTool/scrInfo/prodInfo')
+if not prodLst:
+    prodInfoFolder = os.path.join(os.getenv('PROGRAMDATA'), 'PipelineTool/scrInfo/prodInfo')
 
-prodContent = [f for f in os.listdir(prodInfoFolder) if f.endswith('.prod')]
+    prodContent = [f for f in os.listdir(prodInfoFolder) if f.endswith('.prod')]
 
-prodLst = []
+    prodLst = []
 
-for f in prodContent:
-    with open(os.path.join(prodInfoFolder, f), 'r') as f:
-        info = json.load(f)
-    prodLst.append(info['name'])
+    for f in prodContent:
+        with open(os.path.join(prodInfoFolder, f), 'r') as f:
+            info = json.load(f)
+        prodLst.append(info['name'])
 
 # ----------------------------------------------------------------------------------------------------------- #
 """                                       SUB CLASS: USER LOGIN UI                                          """
@@ -237,10 +236,11 @@ class LoginUI(QDialog):
     def checkLogin(self, *args):
         user_name = str(self.userName.text())
         pass_word = str(func.encoding(self.passWord.text()))
+        user_data = func.userInfo(user_name) if user_name else None
 
         if user_name == "":
             QMessageBox.information(self, 'Login Failed', 'Username can not be blank')
-        elif userData[user_name] != None and pass_word == userData[user_name][1]:
+        elif user_data != None and pass_word == user_data[1]:
             QMessageBox.information(self, 'Login Successful', "Welcome %s\n "
                                     "Now it's the time to make amazing thing to the world !!!" % user_name)
             self.close()
@@ -461,11 +461,12 @@ class TabWidget( QWidget ):
         iconBtn.setIcon(icon)
         iconBtn.setFixedSize(ICON_SIZE, ICON_SIZE)
         iconBtn.setIconSize(QSize(ICON_SIZE-BUFFER, ICON_SIZE-BUFFER))
-        iconBtn.clicked.connect(partial(self.openApps, APPINFO[name][2]))
+        iconBtn.clicked.connect(partial(self.openApps, APPINFO[name][2], APPINFO[name][0]))
         return iconBtn
 
-    def openApps(self, pth):
-        subprocess.Popen(pth)
+    def openApps(self, pth, name=None, *args):
+        appDiscovery.launch(pth)
+        eventLog.logEvent('launch', app=name or os.path.basename(pth), user=USERNAME)
 
     def englishDict(self):
         from ui import englishDict
@@ -722,7 +723,7 @@ class DesktopUI( QMainWindow ):
     def createAction(self, appInfo, key):
         action = QAction(QIcon(appInfo[key][1]), appInfo[key][0], self)
         action.setStatusTip(appInfo[key][0])
-        action.triggered.connect(partial(self.openApplication, appInfo[key][2]))
+        action.triggered.connect(partial(self.openApplication, appInfo[key][2], appInfo[key][0]))
         return action
 
     def createSeparatorAction(self, appInfo):
@@ -730,8 +731,9 @@ class DesktopUI( QMainWindow ):
         separator.setSeparator(True)
         return separator
 
-    def openApplication(self, path):
-        subprocess.Popen(path)
+    def openApplication(self, path, name=None, *args):
+        appDiscovery.launch(path)
+        eventLog.logEvent('launch', app=name or os.path.basename(path), user=USERNAME)
 
     def subWindow(self, id, message, icon):
         dlg = WindowDialog(id, message, icon)